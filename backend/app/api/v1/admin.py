@@ -1,47 +1,37 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from app.models.schemas import MetricsResponse
 from app.core.auth import require_role, get_current_user
-from app.core.database import get_supabase_admin
-from typing import Dict, Any
-from datetime import datetime, timedelta
+from app.services.metrics_service import metrics_service
+from app.services.export_service import export_service, EXPORT_FORMATS
+from app.core.etag import make_etag, conditional_response
+from app.core.slow_requests import TimedRoute
+from typing import Dict, Any, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/metrics", response_model=MetricsResponse)
 async def get_metrics(
+    request: Request,
+    response: Response,
     from_date: str = Query(None),
     to_date: str = Query(None),
     user: Dict[str, Any] = Depends(require_role(["admin", "supervisor"]))
 ) -> MetricsResponse:
-    supabase = get_supabase_admin()
+    try:
+        snapshot = await metrics_service.get_snapshot(from_date, to_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date range")
 
-    if not from_date:
-        from_date = (datetime.utcnow() - timedelta(days=30)).isoformat()
-    if not to_date:
-        to_date = datetime.utcnow().isoformat()
+    not_modified = conditional_response(request, response, make_etag("admin_metrics", snapshot["etag"]))
+    if not_modified:
+        return not_modified
 
-
-    interactions_result = supabase.table("chat_interactions")\
-        .select("*")\
-        .gte("created_at", from_date)\
-        .lte("created_at", to_date)\
-        .execute()
-
-    interactions = interactions_result.data if interactions_result.data else []
-    total_requests = len(interactions)
-
-    auto_resolved_interactions = [
-        i for i in interactions 
-        if not i.get("ticket_created") or i.get("ticket_created") is False
-    ]
-    total_auto_resolved = len(auto_resolved_interactions)
-
-    tickets_result = supabase.table("tickets").select("*").gte("created_at", from_date).lte("created_at", to_date).execute()
-    tickets = tickets_result.data if tickets_result.data else []
-    total_tickets_created = len(tickets)
-
-    auto_resolved_tickets = len([t for t in tickets if t.get("auto_resolved")])
+    totals = snapshot["kpi"]
+    total_requests = totals["interactions"]
+    total_auto_resolved = totals["auto_resolved"]
+    total_tickets_created = totals["tickets_created"]
 
     auto_resolve_rate = (total_auto_resolved / total_requests * 100) if total_requests > 0 else 0.0
 
@@ -51,29 +41,14 @@ async def get_metrics(
     print(f"  - Tickets created: {total_tickets_created}")
     print(f"  - Auto-resolve rate: {auto_resolve_rate:.2f}%")
 
-    sla_compliant_tickets = len([t for t in tickets if t.get("status") in ["resolved", "auto_resolved", "closed"]])
-
-    sla_compliant_interactions = total_auto_resolved
-
-    total_sla_compliant = sla_compliant_tickets + sla_compliant_interactions
+    total_sla_compliant = totals["tickets_closed"] + total_auto_resolved
     sla_compliance = (total_sla_compliant / total_requests * 100) if total_requests > 0 else 0.0
 
-    response_times = [
-        i.get("response_time_ms", 0) / 1000.0 
-        for i in interactions 
-        if i.get("response_time_ms") is not None
-    ]
-    avg_response_time = sum(response_times) / len(response_times) if response_times else None
-
-    feedback_result = supabase.table("classification_feedback")\
-        .select("*")\
-        .gte("feedback_at", from_date)\
-        .lte("feedback_at", to_date)\
-        .execute()
+    chat_response_count = totals["chat_response_count"]
+    avg_response_time = totals["chat_response_sum"] / chat_response_count if chat_response_count else None
 
-    feedbacks = feedback_result.data if feedback_result.data else []
-    total_classifications = len(feedbacks)
-    correct_classifications = len([f for f in feedbacks if f.get("is_correct")])
+    total_classifications = totals["feedback_total"]
+    correct_classifications = totals["feedback_correct"]
     classification_accuracy = (correct_classifications / total_classifications * 100) if total_classifications > 0 else None
 
     print(f"[ADMIN METRICS] Classification accuracy:")
@@ -87,7 +62,28 @@ async def get_metrics(
         sla_compliance=sla_compliance,
         classification_accuracy=classification_accuracy,
         avg_response_time=avg_response_time,
-        period_from=datetime.fromisoformat(from_date.replace('Z', '+00:00')),
-        period_to=datetime.fromisoformat(to_date.replace('Z', '+00:00'))
+        period_from=snapshot["period_from"],
+        period_to=snapshot["period_to"]
     )
 
+
+@router.get("/export/{table}")
+async def export_table(
+    table: str,
+    export_format: str = Query("ndjson", alias="format"),
+    from_date: Optional[str] = Query(None),
+    to_date: Optional[str] = Query(None),
+    gzip: bool = Query(False),
+    user: Dict[str, Any] = Depends(require_role(["admin", "supervisor"]))
+) -> StreamingResponse:
+    try:
+        export_service.validate(table, export_format, from_date, to_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = export_service.filename(table, export_format, gzip)
+    return StreamingResponse(
+        export_service.stream(table, export_format, from_date, to_date, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+    )
@@ -3,9 +3,10 @@ from app.models.schemas import AIProcessRequest, AIProcessResponse, AISearchRequ
 from app.services.ticket_service import ticket_service
 from app.services.ai_service import ai_service
 from app.core.auth import get_current_user
+from app.core.slow_requests import TimedRoute
 from typing import Dict, Any, List
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/process", response_model=AIProcessResponse)
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
 from app.core.auth import require_role, get_current_user
+from app.core.slow_requests import TimedRoute
 from typing import Dict, Any, List
 import subprocess
 import os
 import psutil
 from pathlib import Path
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 BOT_PATHS = {
     "telegram": "telegram_bot",
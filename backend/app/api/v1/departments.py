@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
-from app.core.auth import require_role
+from app.core.auth import require_role, invalidate_principal
 from app.core.database import get_supabase_admin
+from app.core.slow_requests import TimedRoute
 from app.models.schemas import DepartmentCreate, DepartmentResponse
 from typing import Dict, Any, List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("", response_model=List[DepartmentResponse])
@@ -89,6 +90,7 @@ async def update_department(
             update_data["description"] = department_data.description
 
         result = supabase.table("departments").update(update_data).eq("id", department_id).execute()
+        invalidate_principal()
 
         if result.data:
             dept_dict = dict(result.data[0])
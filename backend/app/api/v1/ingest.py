@@ -2,9 +2,10 @@ from fastapi import APIRouter, HTTPException, Depends
 from app.models.schemas import IngestRequest
 from app.services.ticket_service import ticket_service
 from app.core.auth import get_current_user
+from app.core.slow_requests import TimedRoute
 from typing import Dict, Any
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("")
@@ -23,6 +24,13 @@ async def ingest_ticket(
 
         ticket = await ticket_service.create_ticket(ticket_data)
 
+        if ticket.get("is_duplicate"):
+            return {
+                "ticket_id": ticket["id"],
+                "status": "duplicate",
+                "duplicate_of": ticket["duplicate_of"]
+            }
+
         ai_result = await ticket_service.process_with_ai(ticket["id"])
 
         return {
@@ -3,13 +3,17 @@ from app.models.schemas import PublicChatRequest, PublicChatResponse, PublicChat
 from app.services.ticket_service import ticket_service
 from app.services.ai_service import get_openai_client
 from app.core.database import get_supabase_admin
+from app.core.telemetry import track_openai
+from app.core.tracing import tracer, current_trace_id
+from app.repositories.chat_interactions import get_chat_interaction_repository
 from app.core.config import settings
+from app.core.slow_requests import TimedRoute
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import json
 import re
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 async def embed_query(query: str) -> List[float]:
@@ -19,10 +23,11 @@ async def embed_query(query: str) -> List[float]:
     query = query.encode('utf-8', errors='ignore').decode('utf-8')
 
     client = get_openai_client()
-    resp = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query
-    )
+    with track_openai("public_chat_embedding"):
+        resp = client.embeddings.create(
+            model="text-embedding-3-small",
+            input=query
+        )
     return resp.data[0].embedding
 
 
@@ -121,6 +126,7 @@ def categorize_ticket(
     return {"category": category, "subcategory": subcategory, "department": department, "priority": priority}
 
 
+@tracer.start_as_current_span("chat.create_ticket")
 async def create_ticket_from_chat(
     user_id: str,
     client_type: str,
@@ -156,6 +162,7 @@ async def create_ticket_from_chat(
 
 
 @router.post("/chat", response_model=PublicChatResponse)
+@tracer.start_as_current_span("chat.public_chat")
 async def public_chat(request: PublicChatRequest) -> PublicChatResponse:
 
     import time
@@ -308,12 +315,13 @@ async def public_chat(request: PublicChatRequest) -> PublicChatResponse:
         })
 
         client = get_openai_client()
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0.4,
-            messages=messages,
-            max_tokens=2000
-        )
+        with track_openai("public_chat"):
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                temperature=0.4,
+                messages=messages,
+                max_tokens=2000
+            )
 
         answer = completion.choices[0].message.content or ""
 
@@ -442,10 +450,15 @@ async def public_chat(request: PublicChatRequest) -> PublicChatResponse:
                 )
 
                 ticket_id_value = ticket_result.get("id")
-                print(f"[TICKET CREATION] Ticket created successfully: {ticket_id_value}")
-
-                if ticket_id_value and "зарегистрирован" not in answer.lower() and "тикет" not in answer.lower():
-                    answer += "\n\n✅ Ваш запрос зарегистрирован как тикет. Наши специалисты свяжутся с вами в ближайшее время."
+                if ticket_result.get("is_duplicate"):
+                    print(f"[TICKET CREATION] Attached as duplicate of ticket {ticket_result['duplicate_of']}")
+                    if "зарегистрирован" not in answer.lower() and "тикет" not in answer.lower():
+                        answer += "\n\n✅ По этой проблеме уже открыт тикет, ваше обращение добавлено к нему. Наши специалисты свяжутся с вами в ближайшее время."
+                else:
+                    print(f"[TICKET CREATION] Ticket created successfully: {ticket_id_value}")
+
+                    if ticket_id_value and "зарегистрирован" not in answer.lower() and "тикет" not in answer.lower():
+                        answer += "\n\n✅ Ваш запрос зарегистрирован как тикет. Наши специалисты свяжутся с вами в ближайшее время."
             except Exception as e:
                 print(f"[TICKET CREATION] ERROR creating ticket: {e}")
                 import traceback
@@ -498,11 +511,12 @@ async def public_chat(request: PublicChatRequest) -> PublicChatResponse:
                     }
                     for s in sources[:5]
                 ],
-                "session_id": session_id
+                "session_id": session_id,
+                "trace_id": current_trace_id()
             }
 
-            supabase = get_supabase_admin()
-            supabase.table("chat_interactions").insert(interaction_data).execute()
+            with tracer.start_as_current_span("chat.save_interaction"):
+                await get_chat_interaction_repository().insert(interaction_data)
             print(f"[CHAT_INTERACTION] Saved interaction: ticket_created={needs_ticket}, response_time={response_time_ms}ms, ticket_id={ticket_id_value}")
         except Exception as e:
             print(f"[CHAT_INTERACTION] Error saving interaction: {e}")
@@ -581,7 +595,15 @@ async def create_ticket_from_chat_endpoint(ticket_draft: Dict[str, Any]) -> Dict
         }
 
         result = await ticket_service.create_ticket(ticket_data)
-        return {"success": True, "ticket_id": result.get("id"), "message": "Тикет успешно создан"}
+        if result.get("is_duplicate"):
+            return {
+                "success": True,
+                "ticket_id": result["id"],
+                "status": "duplicate",
+                "duplicate_of": result["duplicate_of"],
+                "message": "Обращение добавлено к уже открытому тикету по этой проблеме"
+            }
+        return {"success": True, "ticket_id": result.get("id"), "status": "created", "message": "Тикет успешно создан"}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при создании тикета: {str(e)}")
@@ -1,75 +1,80 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Body
-from app.models.schemas import TicketUpdateRequest, TicketResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
+from app.models.schemas import TicketUpdateRequest, TicketResponse, TicketBulkUpdateRequest, TicketBulkUpdateResponse
 from app.services.ticket_service import ticket_service
 from app.services.ai_service import ai_service, get_openai_client
-from app.core.auth import get_current_user, require_role
+from app.services.change_feed import change_feed
+from app.core.auth import get_current_user, get_current_principal, get_stream_principal, require_role, Principal
 from app.core.database import get_supabase_admin
+from app.core.config import settings
+from app.core.pagination import decode_cursor, next_cursor
+from app.core.etag import make_etag, conditional_response
+from app.core.cache import TTLCache
+from app.core.telemetry import track_openai
+from app.core.slow_requests import TimedRoute
+from app.repositories.tickets import resolve_list_fields
+from app.repositories.chat_interactions import get_chat_interaction_repository, COUNT_METHODS
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+import asyncio
 import json
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+TICKET_DETAIL_SECTIONS = ["messages", "chat_history", "recommendations"]
+
+_recommendation_cache = TTLCache(
+    "ai_recommendations",
+    ttl_seconds=settings.AI_RECOMMENDATIONS_CACHE_TTL_SECONDS,
+    max_size=settings.AI_RECOMMENDATIONS_CACHE_MAX_SIZE
+)
 
 
 @router.get("/auto-resolved")
 async def get_auto_resolved_tickets(
+    response: Response,
     user: Dict[str, Any] = Depends(get_current_user),
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None)
 ) -> List[Dict[str, Any]]:
-    supabase = get_supabase_admin()
-
     try:
-        all_interactions_result = supabase.table("chat_interactions")\
-            .select("id, ticket_created, message, ai_response, created_at")\
-            .order("created_at", desc=True)\
-            .limit(1000)\
-            .execute()
-
-        all_interactions = all_interactions_result.data or []
-        print(f"[AUTO_RESOLVED] Total interactions in DB: {len(all_interactions)}")
-
-        interactions = [
-            i for i in all_interactions 
-            if i.get("ticket_created") is False or i.get("ticket_created") is None
-        ]
-
-        print(f"[AUTO_RESOLVED] Filtered auto-resolved interactions: {len(interactions)}")
-
-        interactions = interactions[offset:offset + limit]
-
-        if interactions:
-            interaction_ids = [i.get("id") for i in interactions]
-            full_interactions_result = supabase.table("chat_interactions")\
-                .select("*")\
-                .in_("id", interaction_ids)\
-                .execute()
+        cursor_position = decode_cursor(cursor) if cursor else None
+        if count and count not in COUNT_METHODS:
+            raise ValueError(f"count must be one of: {', '.join(sorted(COUNT_METHODS))}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-            interactions = full_interactions_result.data or []
+    repository = get_chat_interaction_repository()
+    try:
+        interactions = await repository.list_auto_resolved(limit=limit, offset=offset, cursor=cursor_position)
     except Exception as e:
         print(f"[AUTO_RESOLVED] Error fetching interactions: {e}")
         import traceback
         traceback.print_exc()
         interactions = []
 
+    if count:
+        # A failed count only drops the header, the page itself is still served
+        try:
+            response.headers["X-Total-Count"] = str(await repository.count_auto_resolved(count))
+        except Exception as e:
+            print(f"[AUTO_RESOLVED] Error counting interactions: {e}")
+
+    cursor_value = next_cursor(interactions, limit)
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
+
     auto_resolved = []
     for interaction in interactions:
-        ticket_created = interaction.get("ticket_created")
-        if ticket_created is True:
-            continue
-
         message = interaction.get("message", "")
-        ai_response = interaction.get("ai_response", "")
-
-        if not message or not ai_response:
-            continue
-
         auto_resolved.append({
             "id": f"auto_{interaction.get('id')}",
             "type": "auto_resolved",
             "subject": message[:50] + "..." if len(message) > 50 else message,
             "description": message,
-            "ai_response": ai_response,
+            "ai_response": interaction.get("ai_response", ""),
             "category": interaction.get("category"),
             "subcategory": interaction.get("subcategory"),
             "department": interaction.get("department"),
@@ -87,65 +92,116 @@ async def get_auto_resolved_tickets(
             "sources": interaction.get("sources", [])
         })
 
-    print(f"[AUTO_RESOLVED] Returning {len(auto_resolved)} formatted auto-resolved tickets")
     return auto_resolved
 
 
+@router.get("/stream")
+async def stream_ticket_changes(
+    request: Request,
+    last_event_id: Optional[str] = Query(None),
+    principal: Principal = Depends(get_stream_principal)
+) -> StreamingResponse:
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    try:
+        after_id = int(resume_from) if resume_from else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    try:
+        subscription = await change_feed.subscribe(principal)
+    except Exception as e:
+        print(f"[CHANGE_FEED] Error subscribing user {principal.user_id}: {e}")
+        raise HTTPException(status_code=503, detail="Ticket change feed is unavailable")
+
+    return StreamingResponse(
+        change_feed.events(subscription, after_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/bulk", response_model=TicketBulkUpdateResponse)
+async def bulk_update_tickets(
+    payload: TicketBulkUpdateRequest,
+    user: Dict[str, Any] = Depends(require_role(["admin", "supervisor"]))
+) -> TicketBulkUpdateResponse:
+    if (payload.ticket_ids is None) == (payload.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either ticket_ids or filter")
+    if payload.ticket_ids is not None and len(payload.ticket_ids) > settings.TICKETS_BULK_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {settings.TICKETS_BULK_MAX_SIZE} tickets per request")
+
+    updates = payload.updates.model_dump(exclude_unset=True, mode="json")
+    if not updates:
+        raise HTTPException(status_code=400, detail="No updates provided")
+
+    filters = payload.filter.model_dump(exclude_none=True, mode="json") if payload.filter else None
+    if filters is not None and not filters:
+        raise HTTPException(status_code=400, detail="Filter must include at least one field")
+
+    try:
+        result = await ticket_service.bulk_update_tickets(
+            updates,
+            ticket_ids=payload.ticket_ids,
+            filters=filters,
+            changed_by=user.get("id")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return TicketBulkUpdateResponse(**result)
+
+
+@router.post("/claim-next")
+async def claim_next_ticket(
+    department_id: Optional[str] = Query(None),
+    principal: Principal = Depends(get_current_principal)
+) -> Dict[str, Any]:
+    category = None
+    if principal.role == "engineer":
+        if not principal.engineer_category:
+            raise HTTPException(status_code=403, detail="Engineer has no ticket category assigned")
+        category = principal.engineer_category
+        department_id = None
+    elif not principal.is_privileged:
+        if not principal.department_id:
+            raise HTTPException(status_code=403, detail="User has no department assigned")
+        department_id = principal.department_id
+
+    ticket = await ticket_service.claim_next_ticket(principal.user_id, department_id=department_id, category=category)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="No tickets available to claim")
+    return ticket
+
+
+async def load_scoped_ticket(ticket_id: str, principal: Principal, version_only: bool = False) -> Dict[str, Any]:
+    scoped = await ticket_service.get_scoped_ticket(ticket_id, principal, version_only=version_only)
+    if not scoped:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+
+    if not scoped.get("allowed"):
+        if principal.role == "engineer":
+            detail = f"You don't have permission to view this ticket. You can only see '{principal.engineer_category}' tickets."
+        else:
+            detail = "You don't have permission to view this ticket. It belongs to a different department."
+        raise HTTPException(status_code=403, detail=detail)
+
+    return scoped["ticket"]
+
+
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: str,
-    user: Dict[str, Any] = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    principal: Principal = Depends(get_current_principal)
 ) -> TicketResponse:
-    ticket = await ticket_service.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    version = await load_scoped_ticket(ticket_id, principal, version_only=True)
 
-    supabase_admin = get_supabase_admin()
-    user_id = user.get("id")
-    if user_id:
-        try:
-            user_result = supabase_admin.table("users").select("role, department_id").eq("id", user_id).single().execute()
-            if user_result.data:
-                user_role = user_result.data.get("role")
-                user_department_id = user_result.data.get("department_id")
-
-                if user_role == "engineer":
-                    ticket_category = ticket.get("category", "").lower()
-                    if user_department_id:
-                        try:
-                            dept_result = supabase_admin.table("departments").select("name").eq("id", user_department_id).single().execute()
-                            if dept_result.data:
-                                dept_name = dept_result.data.get("name", "").lower()
-                                if "network" in dept_name:
-                                    user_category = "network"
-                                elif "billing" in dept_name:
-                                    user_category = "billing"
-                                elif "tech" in dept_name or "support" in dept_name:
-                                    user_category = "technical"
-                                else:
-                                    user_category = dept_name
-
-                                if ticket_category != user_category:
-                                    raise HTTPException(
-                                        status_code=403,
-                                        detail=f"You don't have permission to view this ticket. It belongs to category '{ticket_category}', but you can only see '{user_category}' tickets."
-                                    )
-                        except HTTPException:
-                            raise
-                        except Exception as e:
-                            print(f"[GET_TICKET] Error checking engineer category: {e}")
-                elif user_role not in ["admin", "supervisor"]:
-                    ticket_department_id = ticket.get("department_id")
-                    if ticket_department_id != user_department_id:
-                        raise HTTPException(
-                            status_code=403,
-                            detail="You don't have permission to view this ticket. It belongs to a different department."
-                        )
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"[GET_TICKET] Error checking permissions: {e}")
+    not_modified = conditional_response(request, response, make_etag("ticket", ticket_id, version.get("updated_at")))
+    if not_modified:
+        return not_modified
 
+    ticket = await load_scoped_ticket(ticket_id, principal)
     return TicketResponse(**ticket)
 
 
@@ -226,77 +282,99 @@ async def request_on_site(
 @router.get("/{ticket_id}/messages")
 async def get_messages(
     ticket_id: str,
-    user: Dict[str, Any] = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal)
 ) -> List[Dict[str, Any]]:
+    await load_scoped_ticket(ticket_id, principal, version_only=True)
+    return fetch_messages(ticket_id)
+
+
+def fetch_messages(ticket_id: str) -> List[Dict[str, Any]]:
     supabase = get_supabase_admin()
     result = supabase.table("messages").select("*").eq("ticket_id", ticket_id).order("created_at").execute()
     return result.data if result.data else []
 
 
+@router.get("/{ticket_id}/full")
+async def get_ticket_full(
+    ticket_id: str,
+    include: Optional[str] = Query(None),
+    principal: Principal = Depends(get_current_principal)
+) -> Dict[str, Any]:
+    sections = [section.strip() for section in include.split(",") if section.strip()] if include else list(TICKET_DETAIL_SECTIONS)
+    unknown = [section for section in sections if section not in TICKET_DETAIL_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported include sections: {', '.join(unknown)}")
+
+    ticket = await load_scoped_ticket(ticket_id, principal)
+
+    loaders = {
+        "messages": lambda: fetch_messages(ticket_id),
+        "chat_history": lambda: build_chat_history(ticket),
+        # Never wait on a completion here: a cold cache yields null and the page asks /ai-recommendations
+        "recommendations": lambda: cached_ai_recommendations(ticket),
+    }
+    selected = list(dict.fromkeys(sections))
+    results = await asyncio.gather(*(asyncio.to_thread(loaders[section]) for section in selected))
+
+    full = {"ticket": TicketResponse(**ticket)}
+    full.update(zip(selected, results))
+    return full
+
+
 @router.get("")
 async def list_tickets(
+    request: Request,
+    response: Response,
     department_id: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
-    user: Dict[str, Any] = Depends(get_current_user)
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    principal: Principal = Depends(get_current_principal)
 ) -> List[Dict[str, Any]]:
-    from app.core.auth import get_user_role_from_db
-    from app.core.database import get_supabase
-
-    supabase = get_supabase_admin()
-    user_id = user.get("id")
-    user_role = None
-
-    if user_id:
-        try:
-            user_result = supabase.table("users").select("role, department_id").eq("id", user_id).single().execute()
-            if user_result.data:
-                user_role = user_result.data.get("role")
-                user_department_id = user_result.data.get("department_id")
-        except Exception as e:
-            print(f"[LIST_TICKETS] Error getting user role: {e}")
-            user_department_id = None
-    else:
-        user_department_id = None
+    try:
+        cursor_position = decode_cursor(cursor) if cursor else None
+        selected_fields = resolve_list_fields([f.strip() for f in fields.split(",") if f.strip()] if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if user_role == "engineer":
-        if user_department_id:
-            try:
-                dept_result = supabase.table("departments").select("name").eq("id", user_department_id).single().execute()
-                if dept_result.data:
-                    dept_name = dept_result.data.get("name", "").lower()
-                    if "network" in dept_name:
-                        category = "network"
-                    elif "billing" in dept_name:
-                        category = "billing"
-                    elif "tech" in dept_name or "support" in dept_name:
-                        category = "technical"
-                    else:
-                        category = dept_name
-                    print(f"[LIST_TICKETS] Engineer {user_id} from department {dept_name} can only see tickets with category {category}")
-            except Exception as e:
-                print(f"[LIST_TICKETS] Error getting department name: {e}")
-                return []
-        else:
-            print(f"[LIST_TICKETS] Engineer {user_id} has no department_id, returning empty list")
+    if principal.role == "engineer":
+        if not principal.engineer_category:
             return []
-    elif user_role not in ["admin", "supervisor"]:
-        if user_department_id:
-            department_id = user_department_id
-            print(f"[LIST_TICKETS] User {user_id} (role: {user_role}) can only see tickets from department {department_id}")
-        else:
-            print(f"[LIST_TICKETS] User {user_id} (role: {user_role}) has no department_id, returning empty list")
+        category = principal.engineer_category
+    elif not principal.is_privileged:
+        if not principal.department_id:
             return []
+        department_id = principal.department_id
+
+    version = await ticket_service.get_list_version(
+        department_id=department_id,
+        category=category,
+        status=status
+    )
+    etag = make_etag(
+        "tickets", version.get("version"), version.get("change_id"),
+        department_id, category, status, limit, offset, cursor, selected_fields
+    )
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
 
     tickets = await ticket_service.list_tickets(
         department_id=department_id,
         category=category,
         status=status,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor_position,
+        fields=selected_fields
     )
+
+    cursor_value = next_cursor(tickets, limit)
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
     return tickets
 
 
@@ -309,6 +387,7 @@ async def delete_ticket(
     try:
         supabase.table("messages").delete().eq("ticket_id", ticket_id).execute()
         result = supabase.table("tickets").delete().eq("id", ticket_id).execute()
+        ticket_service.invalidate_ticket(ticket_id)
         return {"success": True, "message": "Ticket deleted"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to delete ticket: {str(e)}")
@@ -336,11 +415,22 @@ async def assign_ticket(
 @router.get("/{ticket_id}/ai-recommendations")
 async def get_ai_recommendations(
     ticket_id: str,
-    user: Dict[str, Any] = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal)
 ) -> Dict[str, Any]:
-    ticket = await ticket_service.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    ticket = await load_scoped_ticket(ticket_id, principal)
+    return await asyncio.to_thread(build_ai_recommendations, ticket)
+
+
+def cached_ai_recommendations(ticket: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return _recommendation_cache.get((ticket["id"], ticket.get("updated_at")))
+
+
+def build_ai_recommendations(ticket: Dict[str, Any]) -> Dict[str, Any]:
+    ticket_id = ticket["id"]
+    cache_key = (ticket_id, ticket.get("updated_at"))
+    cached = _recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     supabase = get_supabase_admin()
     chat_interactions = []
@@ -375,24 +465,27 @@ async def get_ai_recommendations(
 - support_solutions: массив строк с шагами решения проблемы
 - confidence: уверенность в рекомендациях (0-1)"""
 
-        response = client.chat.completions.create(
-            model=ai_service.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": ticket_text}
-            ],
-            temperature=0.5,
-            response_format={"type": "json_object"}
-        )
+        with track_openai("ai_recommendations"):
+            response = client.chat.completions.create(
+                model=ai_service.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": ticket_text}
+                ],
+                temperature=0.5,
+                response_format={"type": "json_object"}
+            )
 
         result = json.loads(response.choices[0].message.content)
 
-        return {
+        recommendations = {
             "ticket_id": ticket_id,
             "user_response": result.get("user_response", ""),
             "support_solutions": result.get("support_solutions", []),
             "confidence": float(result.get("confidence", 0.5))
         }
+        _recommendation_cache.set(cache_key, recommendations)
+        return recommendations
     except Exception as e:
         print(f"Error generating AI recommendations: {e}")
         return {
@@ -406,12 +499,14 @@ async def get_ai_recommendations(
 @router.get("/{ticket_id}/chat-history")
 async def get_chat_history(
     ticket_id: str,
-    user: Dict[str, Any] = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal)
 ) -> List[Dict[str, Any]]:
-    ticket = await ticket_service.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
+    ticket = await load_scoped_ticket(ticket_id, principal)
+    return build_chat_history(ticket)
+
 
+def build_chat_history(ticket: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ticket_id = ticket["id"]
     supabase = get_supabase_admin()
 
     interactions_result = supabase.table("chat_interactions")\
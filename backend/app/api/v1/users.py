@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
-from app.core.auth import require_role, get_current_user
+from app.core.auth import require_role, get_current_user, invalidate_principal
 from app.core.database import get_supabase_admin
+from app.core.slow_requests import TimedRoute
 from app.models.schemas import UserCreate, UserResponse
 from typing import Dict, Any, List
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/users", response_model=List[UserResponse])
@@ -62,6 +63,8 @@ async def create_user(
         if not profile_response.data:
             print(f"Warning: User {auth_response.user.id} created but profile not created")
 
+        invalidate_principal(auth_response.user.id)
+
         return UserResponse(
             id=auth_response.user.id,
             email=user_data.email,
@@ -92,6 +95,7 @@ async def delete_user(
             )
 
         supabase_admin.table("users").delete().eq("id", user_id).execute()
+        invalidate_principal(user_id)
 
         supabase_admin.auth.admin.delete_user(user_id)
 
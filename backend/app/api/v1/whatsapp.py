@@ -4,12 +4,15 @@ from typing import Optional, Dict, Any, List
 from app.services.ticket_service import ticket_service
 from app.core.config import settings
 from app.core.database import get_supabase_admin
+from app.core.telemetry import track_openai
+from app.core.tracing import tracer
+from app.core.slow_requests import TimedRoute
 from app.api.v1.public_chat import embed_query, extract_client_type, categorize_ticket
 from datetime import datetime
 import time
 from openai import OpenAI
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 _openai_client = None
 
@@ -61,6 +64,7 @@ def verify_whatsapp_api_key(api_key: Optional[str] = Header(None, alias="X-Whats
 
 
 @router.post("/analyze", response_model=AnalyzeWhatsAppMessageResponse)
+@tracer.start_as_current_span("whatsapp.analyze")
 async def analyze_whatsapp_message(
     request: AnalyzeWhatsAppMessageRequest,
     api_key: Optional[str] = Header(None, alias="X-WhatsApp-API-Key")
@@ -137,15 +141,16 @@ async def analyze_whatsapp_message(
 
             try:
                 client = get_openai_client()
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"{context}\n\nВопрос пользователя: {message}"}
-                    ],
-                    temperature=0.3,
-                    max_tokens=500
-                )
+                with track_openai("whatsapp"):
+                    response = client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": f"{context}\n\nВопрос пользователя: {message}"}
+                        ],
+                        temperature=0.3,
+                        max_tokens=500
+                    )
 
                 answer_text = response.choices[0].message.content.strip()
                 confidence = max_similarity if max_similarity > 0.2 else 0.1
@@ -246,6 +251,15 @@ async def create_whatsapp_ticket(
 
         ticket = await ticket_service.create_ticket(ticket_data)
 
+        if ticket.get("is_duplicate"):
+            return {
+                "ticket_id": ticket["id"],
+                "status": "duplicate",
+                "duplicate_of": ticket["duplicate_of"],
+                "priority": ticket.get("priority", "medium"),
+                "department": ticket.get("department_id")
+            }
+
         ai_result = await ticket_service.process_with_ai(ticket["id"])
 
         return {
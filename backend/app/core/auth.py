@@ -1,87 +1,281 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import Client
-from app.core.database import get_supabase
-from typing import Optional
+from jose import jwt
+from app.core.database import get_supabase, get_supabase_admin
+from app.core.config import settings
+from app.core.cache import TTLCache
+from typing import Optional, Dict, Any
+from dataclasses import dataclass
+import hashlib
+import threading
+import time
+import httpx
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+ALLOWED_JWT_ALGORITHMS = {"HS256", "RS256", "ES256"}
+JWKS_MIN_REFRESH_SECONDS = 60
+
+_claims_cache = TTLCache(
+    "auth_claims",
+    ttl_seconds=settings.AUTH_CLAIMS_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_CLAIMS_CACHE_MAX_SIZE
+)
+_principal_cache = TTLCache(
+    "principals",
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_CLAIMS_CACHE_MAX_SIZE
+)
+_jwks: Dict[str, Any] = {"keys": [], "fetched_at": float("-inf")}
+_jwks_lock = threading.Lock()
+
+
+def _get_jwks_keys(force_refresh: bool = False) -> list:
+    with _jwks_lock:
+        age = time.monotonic() - _jwks["fetched_at"]
+        if age > settings.AUTH_JWKS_CACHE_TTL_SECONDS or (force_refresh and age > JWKS_MIN_REFRESH_SECONDS):
+            jwks_url = settings.SUPABASE_JWKS_URL or f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+            response = httpx.get(jwks_url, timeout=5.0)
+            response.raise_for_status()
+            _jwks["keys"] = response.json().get("keys", [])
+            _jwks["fetched_at"] = time.monotonic()
+        return _jwks["keys"]
+
+
+def _find_jwk(kid: Optional[str]) -> Optional[dict]:
+    for refresh in (False, True):
+        for key in _get_jwks_keys(force_refresh=refresh):
+            if key.get("kid") == kid:
+                return key
+    return None
+
+
+def _verify_token_locally(token: str) -> Optional[Dict[str, Any]]:
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm not in ALLOWED_JWT_ALGORITHMS:
+        raise ValueError(f"Unsupported token algorithm: {algorithm}")
+
+    if algorithm == "HS256":
+        if not settings.SUPABASE_JWT_SECRET:
+            return None
+        key = settings.SUPABASE_JWT_SECRET
+    else:
+        try:
+            key = _find_jwk(header.get("kid"))
+        except httpx.HTTPError as e:
+            print(f"[AUTH] JWKS unavailable, falling back to auth server: {e}")
+            return None
+        if key is None:
+            raise ValueError("Signing key not found")
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE
+    )
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": claims.get("sub"),
+        "aud": claims.get("aud"),
+        "role": claims.get("role"),
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+        "session_id": claims.get("session_id"),
+    }
+
+
+def _fetch_user_remotely(token: str, supabase: Client) -> Dict[str, Any]:
+    user = supabase.auth.get_user(token)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+    return user.user.model_dump() if hasattr(user.user, 'model_dump') else user.user
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     supabase: Client = Depends(get_supabase)
 ) -> dict:
+    return _authenticate_token(credentials.credentials, supabase)
+
+
+def _authenticate_token(token: str, supabase: Client) -> dict:
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+
+    cached_user = _claims_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
     try:
-        token = credentials.credentials
-        user = supabase.auth.get_user(token)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-        user_dict = user.user.model_dump() if hasattr(user.user, 'model_dump') else user.user
-        return user_dict
+        claims = _verify_token_locally(token) if settings.AUTH_LOCAL_JWT_VERIFICATION else None
+        if claims is not None:
+            user_dict = _user_from_claims(claims)
+            if settings.AUTH_REVOCATION_CHECK:
+                _fetch_user_remotely(token, supabase)
+        else:
+            claims = jwt.get_unverified_claims(token)
+            user_dict = _fetch_user_remotely(token, supabase)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Could not validate credentials: {str(e)}"
         )
 
+    ttl = settings.AUTH_CLAIMS_CACHE_TTL_SECONDS
+    if claims.get("exp"):
+        ttl = min(ttl, float(claims["exp"]) - time.time())
+    _claims_cache.set(cache_key, user_dict, ttl_seconds=ttl)
+    return user_dict
+
+
+@dataclass
+class Principal:
+    user_id: str
+    role: Optional[str]
+    department_id: Optional[str] = None
+    department_name: Optional[str] = None
+    engineer_category: Optional[str] = None
+
+    @property
+    def is_privileged(self) -> bool:
+        return self.role in ("admin", "supervisor")
+
+    def can_view_ticket(self, ticket: Dict[str, Any]) -> bool:
+        # Same rules as get_scoped_ticket() in migration 016
+        if self.is_privileged:
+            return True
+        if self.role == "engineer":
+            return not self.engineer_category or (ticket.get("category") or "").lower() == self.engineer_category
+        return ticket.get("department_id") == self.department_id
+
+    def in_list_scope(self, ticket: Dict[str, Any]) -> bool:
+        if self.role == "engineer":
+            return bool(self.engineer_category) and ticket.get("category") == self.engineer_category
+        if self.is_privileged:
+            return True
+        return bool(self.department_id) and str(ticket.get("department_id")) == str(self.department_id)
+
+
+def derive_engineer_category(department_name: Optional[str]) -> Optional[str]:
+    if not department_name:
+        return None
+    dept_name = department_name.lower()
+    if "network" in dept_name:
+        return "network"
+    if "billing" in dept_name:
+        return "billing"
+    if "tech" in dept_name or "support" in dept_name:
+        return "technical"
+    return dept_name
+
+
+def _load_principal(user_id: str, user: dict) -> Principal:
+    fallback_role = user.get("role") or user.get("user_metadata", {}).get("role")
+    supabase_admin = get_supabase_admin()
 
-async def get_user_role_from_db(user_id: str, supabase: Client) -> Optional[str]:
     try:
-        from app.core.database import get_supabase_admin
-        try:
-            admin_client = get_supabase_admin()
-            result = admin_client.table("users").select("role").eq("id", user_id).single().execute()
-            if result.data:
-                role = result.data.get("role")
-                print(f"✅ Role loaded from DB: {role} for user {user_id}")
-                return role
-        except Exception as admin_error:
-            print(f"Admin client not available, trying regular client: {admin_error}")
-
-        result = supabase.table("users").select("role").eq("id", user_id).single().execute()
-        if result.data:
-            role = result.data.get("role")
-            print(f"✅ Role loaded from DB (regular): {role} for user {user_id}")
-            return role
+        user_result = supabase_admin.table("users").select("role, department_id").eq("id", user_id).limit(1).execute()
     except Exception as e:
-        print(f"❌ Error loading user role from DB: {e}")
-        import traceback
-        traceback.print_exc()
-    return None
+        print(f"[AUTH] Error loading principal for user {user_id}: {e}")
+        return Principal(user_id=user_id, role=fallback_role)
+
+    if not user_result.data:
+        principal = Principal(user_id=user_id, role=fallback_role)
+        _principal_cache.set(user_id, principal)
+        return principal
+
+    role = user_result.data[0].get("role") or fallback_role
+    department_id = user_result.data[0].get("department_id")
+    department_name = None
+
+    if department_id:
+        try:
+            dept_result = supabase_admin.table("departments").select("name").eq("id", department_id).limit(1).execute()
+            if dept_result.data:
+                department_name = dept_result.data[0].get("name")
+        except Exception as e:
+            print(f"[AUTH] Error loading department {department_id} for user {user_id}: {e}")
+            return Principal(user_id=user_id, role=role, department_id=department_id)
+
+    principal = Principal(
+        user_id=user_id,
+        role=role,
+        department_id=department_id,
+        department_name=department_name,
+        engineer_category=derive_engineer_category(department_name) if role == "engineer" else None
+    )
+    _principal_cache.set(user_id, principal)
+    return principal
+
+
+async def get_current_principal(user: dict = Depends(get_current_user)) -> Principal:
+    return _resolve_principal(user)
+
+
+async def get_stream_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None),
+    supabase: Client = Depends(get_supabase)
+) -> Principal:
+    # EventSource cannot send an Authorization header, so the stream also accepts ?token=
+    access_token = credentials.credentials if credentials else token
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    return _resolve_principal(_authenticate_token(access_token, supabase))
+
+
+def _resolve_principal(user: dict) -> Principal:
+    user_id = user.get("id")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User ID not found"
+        )
+
+    principal = _principal_cache.get(user_id)
+    if principal is None:
+        principal = _load_principal(user_id, user)
+    return principal
+
+
+def invalidate_principal(user_id: Optional[str] = None):
+    if user_id is None:
+        _principal_cache.clear()
+    else:
+        _principal_cache.delete(user_id)
 
 
 def require_role(allowed_roles: list[str]):
     async def role_checker(
         user: dict = Depends(get_current_user),
-        supabase: Client = Depends(get_supabase)
+        principal: Principal = Depends(get_current_principal)
     ) -> dict:
-        user_id = user.get("id")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User ID not found"
-            )
-
-        user_role = await get_user_role_from_db(user_id, supabase)
-
-        if not user_role:
-            user_role = user.get("role") or user.get("user_metadata", {}).get("role")
-
-        if not user_role:
+        if not principal.role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User role not found"
             )
 
-        if user_role not in allowed_roles:
+        if principal.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Required roles: {allowed_roles}, but user has: {user_role}"
+                detail=f"Required roles: {allowed_roles}, but user has: {principal.role}"
             )
 
         return user
     return role_checker
-
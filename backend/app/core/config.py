@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Literal
 import json
 
 
@@ -10,6 +10,20 @@ class Settings(BaseSettings):
     SUPABASE_SERVICE_KEY: str
     DATABASE_URL: str
 
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 50
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
+    POSTGRES_POOL_MIN_SIZE: int = 1
+    POSTGRES_POOL_MAX_SIZE: int = 10
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 100
+
+    TICKETS_REPOSITORY_BACKEND: Literal["postgrest", "postgres"] = "postgrest"
+    CHAT_INTERACTIONS_REPOSITORY_BACKEND: Literal["postgrest", "postgres"] = "postgrest"
+    MONITORING_REPOSITORY_BACKEND: Literal["postgrest", "postgres"] = "postgrest"
+    EXPORTS_REPOSITORY_BACKEND: Literal["postgrest", "postgres"] = "postgrest"
+
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
@@ -17,12 +31,68 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
 
     SECRET_KEY: str
+
+    SUPABASE_JWT_SECRET: Optional[str] = None
+    SUPABASE_JWKS_URL: Optional[str] = None
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    AUTH_LOCAL_JWT_VERIFICATION: bool = True
+    AUTH_JWKS_CACHE_TTL_SECONDS: int = 3600
+    AUTH_CLAIMS_CACHE_TTL_SECONDS: int = 60
+    AUTH_CLAIMS_CACHE_MAX_SIZE: int = 10000
+    AUTH_REVOCATION_CHECK: bool = False
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
     ENVIRONMENT: str = "development"
     CORS_ORIGINS: Union[str, List[str]] = "http://localhost:3000,http://localhost:5173"
 
     DEFAULT_SLA_ACCEPT_MINUTES: int = 15
     DEFAULT_SLA_REMOTE_MINUTES: int = 60
 
+    KNN_ROUTING_ENABLED: bool = True
+    KNN_ROUTING_NEIGHBOURS: int = 10
+    KNN_ROUTING_MIN_NEIGHBOURS: int = 3
+    KNN_ROUTING_MIN_SIMILARITY: float = 0.8
+    KNN_ROUTING_MIN_AGREEMENT: float = 0.8
+
+    DUPLICATE_DETECTION_ENABLED: bool = True
+    DUPLICATE_WINDOW_MINUTES: int = 120
+    DUPLICATE_MIN_SIMILARITY: float = 0.92
+    DUPLICATE_SAME_CONTACT_MIN_SIMILARITY: float = 0.85
+
+    TICKET_CACHE_TTL_SECONDS: int = 30
+    TICKET_CACHE_MAX_SIZE: int = 5000
+    AI_RECOMMENDATIONS_CACHE_TTL_SECONDS: int = 3600
+    AI_RECOMMENDATIONS_CACHE_MAX_SIZE: int = 1000
+    TICKETS_BULK_MAX_SIZE: int = 1000
+    TICKETS_BULK_CHUNK_SIZE: int = 200
+
+    METRICS_BUCKET_SECONDS: int = 60
+    METRICS_CACHE_TTL_SECONDS: int = 60
+    METRICS_CACHE_MAX_SIZE: int = 256
+    METRICS_TIMESERIES_MAX_POINTS: int = 500
+
+    COUNT_ESTIMATE_EXACT_THRESHOLD: int = 10000
+
+    EXPORT_FETCH_SIZE: int = 500
+    EXPORT_CHUNK_BYTES: int = 65536
+
+    CHANGE_FEED_QUEUE_SIZE: int = 500
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0
+    CHANGE_FEED_REPLAY_LIMIT: int = 1000
+    CHANGE_FEED_REPLAY_LAG_IDS: int = 200
+    CHANGE_FEED_SEEN_WINDOW: int = 5000
+    CHANGE_FEED_RETENTION_DAYS: int = 7
+    CHANGE_FEED_PRUNE_INTERVAL_SECONDS: int = 3600
+
+    TELEMETRY_ENABLED: bool = True
+    TELEMETRY_MAX_LABEL_VALUES: int = 100
+    TELEMETRY_LOOP_LAG_INTERVAL_SECONDS: float = 1.0
+    SLOW_REQUEST_THRESHOLD_MS: int = 1000
+    SLOW_REQUEST_BUFFER_SIZE: int = 200
+
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_SERVICE_NAME: str = "tkm-backend"
+
     TELEGRAM_BOT_API_KEY: Union[str, None] = None
 
     WHATSAPP_BOT_API_KEY: Union[str, None] = None
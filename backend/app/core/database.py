@@ -1,19 +1,84 @@
-from supabase import create_client, Client
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+from postgrest import SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.utils import SyncClient
 from app.core.config import settings
-from typing import Optional
+from app.core.telemetry import POSTGREST_EVENT_HOOKS
+from typing import Optional, Dict, Union
+import importlib.util
+import threading
+import httpx
 
 _supabase_client: Optional[Client] = None
+_supabase_admin_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    return settings.SUPABASE_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, httpx.Timeout],
+    ) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            http2=_http2_enabled(),
+            event_hooks=POSTGREST_EVENT_HOOKS,
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+
+class PooledClient(Client):
+
+    @staticmethod
+    def _init_postgrest_client(
+        rest_url: str,
+        headers: Dict[str, str],
+        schema: str,
+        timeout: Union[int, float, httpx.Timeout] = DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+    ) -> SyncPostgrestClient:
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+
+def _create_pooled_client(key: str) -> Client:
+    # Fresh options per client: the library default is a shared mutable instance,
+    # so the anon and service-role clients would otherwise overwrite each other's headers.
+    options = ClientOptions(auto_refresh_token=False, persist_session=False)
+    client = PooledClient(settings.SUPABASE_URL, key, options)
+    # Build the PostgREST session eagerly so concurrent first use cannot race on it.
+    client.postgrest
+    return client
 
 
 def get_supabase() -> Client:
     global _supabase_client
     if _supabase_client is None:
-        _supabase_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        with _client_lock:
+            if _supabase_client is None:
+                _supabase_client = _create_pooled_client(settings.SUPABASE_KEY)
     return _supabase_client
 
 
 def get_supabase_admin() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    global _supabase_admin_client
+    if _supabase_admin_client is None:
+        with _client_lock:
+            if _supabase_admin_client is None:
+                _supabase_admin_client = _create_pooled_client(settings.SUPABASE_SERVICE_KEY)
+    return _supabase_admin_client
 
 
 async def init_db():
@@ -22,5 +87,18 @@ async def init_db():
         client.table("departments").select("id").limit(1).execute()
     except Exception as e:
         print(f"Database connection warning: {e}")
-    print("Database initialized")
+    get_supabase_admin()
+    print(f"Database initialized (http2={_http2_enabled()})")
+
 
+async def close_db():
+    global _supabase_client, _supabase_admin_client
+    with _client_lock:
+        for client in (_supabase_client, _supabase_admin_client):
+            if client is not None:
+                try:
+                    client.postgrest.aclose()
+                except Exception as e:
+                    print(f"Error closing Supabase client: {e}")
+        _supabase_client = None
+        _supabase_admin_client = None
@@ -0,0 +1,28 @@
+from fastapi import Request, Response
+from typing import Any, Optional
+import hashlib
+import json
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return f'"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
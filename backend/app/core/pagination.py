@@ -0,0 +1,32 @@
+from typing import Any, Dict, Optional, Tuple
+from app.core.postgres import parse_timestamp
+import base64
+import json
+import uuid
+
+
+def encode_cursor(row: Dict[str, Any], sort_column: str = "created_at") -> str:
+    payload = json.dumps({"t": row.get(sort_column), "id": row.get("id")}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        sort_value, row_id = payload["t"], payload["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not sort_value or not row_id:
+        raise ValueError("Invalid cursor")
+    # Cursor values end up inside PostgREST filter strings: only canonical forms go through
+    try:
+        return parse_timestamp(str(sort_value)).isoformat(), str(uuid.UUID(str(row_id)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def next_cursor(rows: list, limit: int, sort_column: str = "created_at") -> Optional[str]:
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(rows[-1], sort_column)
@@ -0,0 +1,92 @@
+from app.core.config import settings
+from app.core.slow_requests import record_stage
+from typing import Optional, Dict, Any, Iterable
+from datetime import datetime, date, timezone
+from decimal import Decimal
+import asyncio
+import asyncpg
+import json
+import re
+import uuid
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _log_query_time(record):
+    record_stage("postgres", record.elapsed)
+
+
+async def _init_connection(connection: asyncpg.Connection):
+    connection.add_query_logger(_log_query_time)
+    for json_type in ("json", "jsonb"):
+        await connection.set_type_codec(
+            json_type,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog"
+        )
+
+
+async def get_pool() -> asyncpg.Pool:
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    dsn=settings.DATABASE_URL,
+                    min_size=settings.POSTGRES_POOL_MIN_SIZE,
+                    max_size=settings.POSTGRES_POOL_MAX_SIZE,
+                    statement_cache_size=settings.POSTGRES_STATEMENT_CACHE_SIZE,
+                    init=_init_connection
+                )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def quote_identifier(name: str) -> str:
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid identifier: {name}")
+    return f'"{name}"'
+
+
+def quote_identifiers(names: Iterable[str]) -> str:
+    return ", ".join(quote_identifier(name) for name in names)
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_uuid(value: Any) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def record_to_dict(record: asyncpg.Record) -> Dict[str, Any]:
+    return {key: _to_json_value(value) for key, value in record.items()}
@@ -0,0 +1,160 @@
+from fastapi.routing import APIRoute
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Deque
+from urllib.parse import parse_qsl
+from app.core.config import settings
+import asyncio
+import functools
+import threading
+import time
+
+STAGES = ("supabase", "postgres", "openai")
+REDACTED = "***"
+SENSITIVE_PARAM_PARTS = ("token", "key", "secret", "password", "auth", "phone", "email", "session")
+MAX_PARAM_LENGTH = 100
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is None:
+        return
+    timings[f"{stage}_seconds"] = timings.get(f"{stage}_seconds", 0.0) + seconds
+    timings[f"{stage}_calls"] = timings.get(f"{stage}_calls", 0) + 1
+
+
+def _mark_handler_done():
+    timings = _request_timings.get()
+    if timings is not None:
+        timings["handler_done_at"] = time.perf_counter()
+
+
+def redact_params(params: Dict[str, Any]) -> Dict[str, str]:
+    redacted = {}
+    for name, value in params.items():
+        if any(part in name.lower() for part in SENSITIVE_PARAM_PARTS):
+            redacted[name] = REDACTED
+        else:
+            redacted[name] = str(value)[:MAX_PARAM_LENGTH]
+    return redacted
+
+
+class SlowRequestLog:
+
+    def __init__(self, capacity: int):
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self._entries.maxlen
+
+    def add(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            newest_first = list(reversed(self._entries))
+        return newest_first[:limit] if limit else newest_first
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_request_log = SlowRequestLog(settings.SLOW_REQUEST_BUFFER_SIZE)
+
+
+def _timed_endpoint(endpoint):
+    if getattr(endpoint, "__timed_endpoint__", False):
+        return endpoint
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _mark_handler_done()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _mark_handler_done()
+
+    wrapper.__timed_endpoint__ = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    # Marks when the endpoint returns so the recorder can tell handler time from response serialization
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class SlowRequestMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        response = {"status": 500, "bytes": 0, "started_at": None, "streaming": False}
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["started_at"] = time.perf_counter()
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                response["streaming"] = content_type.startswith(b"text/event-stream")
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        token = _request_timings.set(timings)
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _request_timings.reset(token)
+            duration = time.perf_counter() - started_at
+            # Event streams stay open by design and would fill the buffer
+            if not response["streaming"] and duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                slow_request_log.add(self._entry(scope, timings, response, duration))
+
+    def _entry(self, scope, timings: Dict[str, float], response: Dict[str, Any], duration: float) -> Dict[str, Any]:
+        handler_done_at = timings.get("handler_done_at")
+        serialization = None
+        if handler_done_at is not None and response["started_at"] is not None:
+            serialization = max(response["started_at"] - handler_done_at, 0.0)
+
+        entry = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "method": scope["method"],
+            "route": getattr(scope.get("route"), "path", None) or "unmatched",
+            "path_params": redact_params(scope.get("path_params") or {}),
+            "query_params": redact_params(dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))),
+            "status": response["status"],
+            "duration_ms": _milliseconds(duration),
+            "serialization_ms": _milliseconds(serialization),
+            "response_bytes": response["bytes"],
+        }
+        for stage in STAGES:
+            entry[f"{stage}_ms"] = _milliseconds(timings.get(f"{stage}_seconds", 0.0))
+            entry[f"{stage}_calls"] = int(timings.get(f"{stage}_calls", 0))
+        return entry
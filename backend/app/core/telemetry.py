@@ -0,0 +1,188 @@
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, disable_created_metrics
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from fastapi import Response
+from contextlib import contextmanager
+from typing import Dict, Set, Iterator
+from app.core.config import settings
+from app.core.cache import get_cache_stats
+from app.core.tracing import tracer
+from app.core.slow_requests import record_stage
+from opentelemetry import trace
+import threading
+import time
+import httpx
+
+disable_created_metrics()
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+OTHER = "other"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served"
+)
+OPENAI_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "OpenAI API call latency by call site",
+    ["call_site"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+)
+OPENAI_ERRORS = Counter(
+    "openai_request_errors_total",
+    "Failed OpenAI API calls by call site and error type",
+    ["call_site", "error"]
+)
+SUPABASE_DURATION = Histogram(
+    "supabase_request_duration_seconds",
+    "PostgREST request latency by table or RPC",
+    ["target", "method", "status"]
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of scheduled event loop wakeups beyond their interval",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+_label_values: Dict[str, Set[str]] = {}
+_label_lock = threading.Lock()
+
+
+def bounded_label(name: str, value: str) -> str:
+    with _label_lock:
+        seen = _label_values.setdefault(name, set())
+        if value in seen:
+            return value
+        if len(seen) >= settings.TELEMETRY_MAX_LABEL_VALUES:
+            return OTHER
+        seen.add(value)
+        return value
+
+
+@contextmanager
+def track_openai(call_site: str) -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(f"openai.{call_site}"):
+            yield
+    except Exception as e:
+        OPENAI_ERRORS.labels(call_site, bounded_label("openai_error", type(e).__name__)).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started_at
+        OPENAI_DURATION.labels(call_site).observe(elapsed)
+        record_stage("openai", elapsed)
+
+
+def _postgrest_target(path: str) -> str:
+    parts = [part for part in path.split("/") if part]
+    if "v1" in parts:
+        parts = parts[parts.index("v1") + 1:]
+    if not parts:
+        return "root"
+    target = "/".join(parts[:2]) if parts[0] == "rpc" else parts[0]
+    return bounded_label("supabase_target", target)
+
+
+def _on_postgrest_request(request: httpx.Request):
+    request.extensions["telemetry_started_at"] = time.perf_counter()
+    # Child of the caller's current span; the sync client runs in the caller's context
+    request.extensions["telemetry_span"] = tracer.start_span(
+        f"supabase.{_postgrest_target(request.url.path)}",
+        kind=trace.SpanKind.CLIENT,
+        attributes={"http.method": request.method}
+    )
+
+
+def _on_postgrest_response(response: httpx.Response):
+    request = response.request
+    started_at = request.extensions.get("telemetry_started_at")
+    if started_at is None:
+        return
+    # Response hooks fire once headers arrive; read the body so timings cover the transfer.
+    # httpx keeps the content, the client does not download it twice
+    try:
+        response.read()
+    finally:
+        _finish_postgrest_request(request, response, started_at)
+
+
+def _finish_postgrest_request(request: httpx.Request, response: httpx.Response, started_at: float):
+    span = request.extensions.get("telemetry_span")
+    if span is not None:
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 400:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end()
+    elapsed = time.perf_counter() - started_at
+    SUPABASE_DURATION.labels(
+        _postgrest_target(request.url.path),
+        request.method if request.method in HTTP_METHODS else OTHER,
+        str(response.status_code)
+    ).observe(elapsed)
+    record_stage("supabase", elapsed)
+
+
+POSTGREST_EVENT_HOOKS = {
+    "request": [_on_postgrest_request],
+    "response": [_on_postgrest_response],
+}
+
+
+class CacheCollector(Collector):
+
+    def collect(self):
+        hits = CounterMetricFamily("app_cache_hits", "In-process cache hits", labels=["cache"])
+        misses = CounterMetricFamily("app_cache_misses", "In-process cache misses", labels=["cache"])
+        size = GaugeMetricFamily("app_cache_size", "In-process cache entries", labels=["cache"])
+        hit_ratio = GaugeMetricFamily("app_cache_hit_ratio", "In-process cache hit ratio since start", labels=["cache"])
+        for name, stats in get_cache_stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            size.add_metric([name], stats["size"])
+            hit_ratio.add_metric([name], stats["hit_ratio"])
+        yield hits
+        yield misses
+        yield size
+        yield hit_ratio
+
+
+REGISTRY.register(CacheCollector())
+
+
+class TelemetryMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Label by route template (/api/tickets/{ticket_id}), never the raw path, to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"] if scope["method"] in HTTP_METHODS else OTHER
+            REQUEST_DURATION.labels(method, route, str(status["code"])).observe(time.perf_counter() - started_at)
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
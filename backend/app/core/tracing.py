@@ -0,0 +1,55 @@
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from typing import Optional
+from app.core.config import settings
+
+TRACING_EXPORTERS = {"none", "console", "file"}
+
+tracer = trace.get_tracer("tkm.backend")
+
+_provider: Optional[TracerProvider] = None
+_trace_file = None
+
+
+def _span_line(span) -> str:
+    return span.to_json(indent=None) + "\n"
+
+
+def init_tracing():
+    global _provider, _trace_file
+    exporter_name = settings.TRACING_EXPORTER
+    if exporter_name not in TRACING_EXPORTERS:
+        raise ValueError(f"Unknown TRACING_EXPORTER: {exporter_name}")
+    if exporter_name == "none" or _provider is not None:
+        return
+
+    if exporter_name == "file":
+        # One JSON span per line, readable without a collector
+        _trace_file = open(settings.TRACING_FILE_PATH, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=_trace_file, formatter=_span_line)
+    else:
+        exporter = ConsoleSpanExporter()
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    print(f"[TRACING] Exporting spans to {settings.TRACING_FILE_PATH if exporter_name == 'file' else 'console'}")
+
+
+def shutdown_tracing():
+    global _provider, _trace_file
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
+
+
+def current_trace_id() -> Optional[str]:
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid:
+        return None
+    return format(context.trace_id, "032x")
@@ -64,6 +64,30 @@ class TicketUpdateRequest(BaseModel):
     engineer_id: Optional[str] = None
 
 
+class TicketBulkFilter(BaseModel):
+    department_id: Optional[str] = None
+    category: Optional[str] = None
+    status: Optional[TicketStatus] = None
+
+
+class TicketBulkUpdateRequest(BaseModel):
+    ticket_ids: Optional[List[str]] = None
+    filter: Optional[TicketBulkFilter] = None
+    updates: TicketUpdateRequest
+
+
+class TicketBulkResult(BaseModel):
+    ticket_id: str
+    status: str
+    changes: Dict[str, Any] = {}
+
+
+class TicketBulkUpdateResponse(BaseModel):
+    matched: int
+    updated: int
+    results: List[TicketBulkResult]
+
+
 class AISearchRequest(BaseModel):
     query: str
     k: int = 5
@@ -159,13 +183,42 @@ class RoutingErrorStats(BaseModel):
     by_category: Optional[Dict[str, int]] = {}
 
 
+class DuplicateStats(BaseModel):
+    total_merged: int
+    parent_tickets: int
+    by_category: Dict[str, int]
+    by_source: Dict[str, int]
+
+
 class MonitoringMetrics(BaseModel):
     classification_accuracy: ClassificationAccuracy
     auto_resolve_stats: AutoResolveStats
     response_time_stats: ResponseTimeStats
     routing_error_stats: RoutingErrorStats
+    duplicate_stats: Optional[DuplicateStats] = None
+    period_from: datetime
+    period_to: datetime
+
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    interactions: int
+    auto_resolved: int
+    auto_resolve_rate: float
+    tickets_created: int
+    tickets_closed: int
+    sla_compliance: float
+    avg_response_time_seconds: Optional[float] = None
+    median_response_time_seconds: Optional[float] = None
+    p95_response_time_seconds: Optional[float] = None
+
+
+class MonitoringTimeseries(BaseModel):
+    interval: str
+    requested_interval: str
     period_from: datetime
     period_to: datetime
+    points: List[TimeseriesPoint]
 
 
 class UserCreate(BaseModel):
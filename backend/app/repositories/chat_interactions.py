@@ -0,0 +1,155 @@
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_admin
+from app.core.postgres import get_pool, record_to_dict, quote_identifiers, parse_uuid, parse_timestamp
+import json
+import uuid
+
+CHAT_INTERACTION_COLUMNS = {
+    "user_id",
+    "client_type",
+    "message",
+    "ai_response",
+    "conversation_history",
+    "ticket_created",
+    "ticket_id",
+    "confidence",
+    "max_similarity",
+    "is_technical_issue",
+    "ai_explicitly_requested_ticket",
+    "category",
+    "subcategory",
+    "department",
+    "priority",
+    "language",
+    "response_time_ms",
+    "sources",
+    "session_id",
+    "trace_id",
+}
+
+AUTO_RESOLVED_FIELDS = [
+    "id", "message", "ai_response", "category", "subcategory", "department", "priority",
+    "confidence", "max_similarity", "client_type", "language", "response_time_ms",
+    "created_at", "user_id", "session_id", "sources",
+]
+
+COUNT_METHODS = {"exact", "estimated"}
+
+# ticket_created = FALSE matches the partial index idx_chat_interactions_auto_resolve
+# (NULLs are backfilled and forbidden by migration 023, so this equals the metrics' IS NOT TRUE)
+AUTO_RESOLVED_CONDITIONS = ["ticket_created = FALSE", "message <> ''", "ai_response <> ''"]
+
+
+class PostgrestChatInteractionRepository:
+
+    def __init__(self):
+        self.supabase_admin = get_supabase_admin()
+
+    async def insert(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = self.supabase_admin.table("chat_interactions").insert(data).execute()
+        return result.data[0] if result.data else None
+
+    async def list_auto_resolved(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        query = self._auto_resolved_query(self.supabase_admin.table("chat_interactions").select(",".join(AUTO_RESOLVED_FIELDS)))
+
+        if cursor:
+            created_at, interaction_id = cursor
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{interaction_id})')
+
+        query = query.order("created_at", desc=True).order("id", desc=True).limit(limit)
+        if not cursor:
+            query = query.offset(offset)
+
+        result = query.execute()
+        return result.data if result.data else []
+
+    async def count_auto_resolved(self, method: str = "exact") -> int:
+        query = self._auto_resolved_query(self.supabase_admin.table("chat_interactions").select("id", count=method))
+        result = query.limit(1).execute()
+        return result.count or 0
+
+    def _auto_resolved_query(self, query):
+        return query.eq("ticket_created", False).neq("message", "").neq("ai_response", "")
+
+
+class PostgresChatInteractionRepository:
+
+    async def insert(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        columns = sorted(key for key in data if key in CHAT_INTERACTION_COLUMNS)
+        values = [data[column] for column in columns]
+        if "ticket_id" in columns:
+            index = columns.index("ticket_id")
+            values[index] = parse_uuid(values[index]) if values[index] else None
+
+        placeholders = ", ".join(f"${i + 1}" for i in range(len(columns)))
+        sql = (
+            f"INSERT INTO public.chat_interactions ({quote_identifiers(columns)})"
+            f" VALUES ({placeholders}) RETURNING *"
+        )
+
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            record = await connection.fetchrow(sql, *values)
+        return record_to_dict(record) if record else None
+
+    async def list_auto_resolved(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        params: List[Any] = []
+        conditions = list(AUTO_RESOLVED_CONDITIONS)
+
+        if cursor:
+            params.extend([parse_timestamp(cursor[0]), uuid.UUID(cursor[1])])
+            conditions.append(f"(created_at, id) < (${len(params) - 1}, ${len(params)})")
+
+        params.append(limit)
+        sql = (
+            f"SELECT {quote_identifiers(AUTO_RESOLVED_FIELDS)} FROM public.chat_interactions"
+            f" WHERE {' AND '.join(conditions)} ORDER BY created_at DESC, id DESC LIMIT ${len(params)}"
+        )
+        if not cursor:
+            params.append(offset)
+            sql += f" OFFSET ${len(params)}"
+
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            records = await connection.fetch(sql, *params)
+        return [record_to_dict(record) for record in records]
+
+    async def count_auto_resolved(self, method: str = "exact") -> int:
+        sql = f"SELECT count(*) FROM public.chat_interactions WHERE {' AND '.join(AUTO_RESOLVED_CONDITIONS)}"
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            if method == "estimated":
+                # Like PostgREST's estimated count: exact while cheap, the planner's row estimate above
+                # the threshold. The estimate is not a count and can be off by a wide margin
+                plan = await connection.fetchval(f"EXPLAIN (FORMAT JSON) {sql.replace('count(*)', '1')}")
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = int(plan[0]["Plan"]["Plan Rows"])
+                if estimate > settings.COUNT_ESTIMATE_EXACT_THRESHOLD:
+                    return estimate
+            return await connection.fetchval(sql)
+
+
+_repositories = {
+    "postgrest": PostgrestChatInteractionRepository,
+    "postgres": PostgresChatInteractionRepository,
+}
+_instances: Dict[str, Any] = {}
+
+
+def get_chat_interaction_repository():
+    backend = settings.CHAT_INTERACTIONS_REPOSITORY_BACKEND
+    if backend not in _instances:
+        _instances[backend] = _repositories[backend]()
+    return _instances[backend]
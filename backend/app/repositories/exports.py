@@ -0,0 +1,115 @@
+from typing import Optional, Dict, Any, AsyncIterator
+from app.core.config import settings
+from app.core.database import get_supabase_admin
+from app.core.postgres import get_pool, record_to_dict, quote_identifier, parse_timestamp
+import asyncio
+
+# Exportable tables and the column that bounds the export range
+EXPORT_TABLES = {
+    "tickets": "created_at",
+    "chat_interactions": "created_at",
+    "classification_feedback": "feedback_at",
+}
+
+# Explicit column lists: stable column order, and a CSV header even for an empty range
+EXPORT_COLUMNS = {
+    "tickets": [
+        "id", "client_id", "source", "source_meta", "subject", "description", "language", "summary",
+        "category", "subcategory", "department_id", "assigned_to", "priority", "status",
+        "auto_assigned", "auto_resolved", "need_on_site", "local_office_id", "engineer_id",
+        "sla_accept_deadline", "sla_remote_deadline", "created_at", "updated_at", "closed_at",
+        "first_response_at", "classification_confidence", "ai_processing_time_ms", "duplicate_count",
+    ],
+    "chat_interactions": [
+        "id", "user_id", "client_type", "message", "ai_response", "conversation_history",
+        "ticket_created", "ticket_id", "confidence", "max_similarity", "is_technical_issue",
+        "ai_explicitly_requested_ticket", "category", "subcategory", "department", "priority",
+        "language", "response_time_ms", "sources", "session_id", "created_at", "trace_id",
+    ],
+    "classification_feedback": [
+        "id", "ticket_id", "predicted_category", "predicted_department", "predicted_priority",
+        "actual_category", "actual_department", "actual_priority", "confidence_score",
+        "feedback_by", "feedback_at", "is_correct", "notes",
+    ],
+}
+
+
+class PostgrestExportRepository:
+
+    def __init__(self):
+        self.supabase_admin = get_supabase_admin()
+
+    async def stream_rows(
+        self,
+        table: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        time_column = EXPORT_TABLES[table]
+        cursor = None
+
+        # PostgREST has no cursors: keyset pages on (time, id) keep each request cheap
+        while True:
+            query = self.supabase_admin.table(table).select(",".join(EXPORT_COLUMNS[table]))
+            if from_date:
+                query = query.gte(time_column, from_date)
+            if to_date:
+                query = query.lte(time_column, to_date)
+            if cursor:
+                sort_value, row_id = cursor
+                query = query.or_(f'{time_column}.gt."{sort_value}",and({time_column}.eq."{sort_value}",id.gt.{row_id})')
+
+            query = query.order(time_column).order("id").limit(settings.EXPORT_FETCH_SIZE)
+            # The client is synchronous: fetch pages off the event loop so an export does not stall other requests
+            result = await asyncio.to_thread(query.execute)
+            rows = result.data or []
+            for row in rows:
+                yield row
+
+            if len(rows) < settings.EXPORT_FETCH_SIZE:
+                return
+            cursor = (rows[-1][time_column], rows[-1]["id"])
+
+
+class PostgresExportRepository:
+
+    async def stream_rows(
+        self,
+        table: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        time_column = quote_identifier(EXPORT_TABLES[table])
+        params = []
+        conditions = []
+        if from_date:
+            params.append(parse_timestamp(from_date))
+            conditions.append(f"{time_column} >= ${len(params)}")
+        if to_date:
+            params.append(parse_timestamp(to_date))
+            conditions.append(f"{time_column} <= ${len(params)}")
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = ", ".join(quote_identifier(column) for column in EXPORT_COLUMNS[table])
+        sql = f"SELECT {columns} FROM public.{quote_identifier(table)}{where} ORDER BY {time_column}, id"
+
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            # Server-side cursor: only EXPORT_FETCH_SIZE rows are held in memory at a time
+            async with connection.transaction(readonly=True):
+                async for record in connection.cursor(sql, *params, prefetch=settings.EXPORT_FETCH_SIZE):
+                    yield record_to_dict(record)
+
+
+_repositories = {
+    "postgrest": PostgrestExportRepository,
+    "postgres": PostgresExportRepository,
+}
+_instances: Dict[str, Any] = {}
+
+
+def get_export_repository():
+    backend = settings.EXPORTS_REPOSITORY_BACKEND
+    if backend not in _instances:
+        _instances[backend] = _repositories[backend]()
+    return _instances[backend]
@@ -0,0 +1,99 @@
+from typing import Optional, Dict, Any, List
+from app.core.config import settings
+from app.core.database import get_supabase_admin
+from app.core.postgres import get_pool, record_to_dict, parse_timestamp
+
+KPI_COUNTERS = [
+    "interactions",
+    "auto_resolved",
+    "auto_confidence_count",
+    "auto_confidence_sum",
+    "chat_response_count",
+    "chat_response_sum",
+    "tickets_created",
+    "tickets_closed",
+    "ticket_response_count",
+    "ticket_response_sum",
+    "feedback_total",
+    "feedback_correct",
+]
+
+
+def kpi_counters_from(row: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    return {counter: (row or {}).get(counter) or 0 for counter in KPI_COUNTERS}
+
+
+class PostgrestMonitoringRepository:
+
+    def __init__(self):
+        self.supabase_admin = get_supabase_admin()
+
+    async def aggregate_metrics(self, from_date: str, to_date: str) -> Dict[str, Any]:
+        result = self.supabase_admin.rpc("monitoring_metrics", {
+            "p_from": from_date,
+            "p_to": to_date
+        }).execute()
+        return result.data or {}
+
+    async def kpi_totals(self, from_date: str, to_date: str) -> Dict[str, float]:
+        result = self.supabase_admin.rpc("kpi_totals", {
+            "p_from": from_date,
+            "p_to": to_date
+        }).execute()
+        return kpi_counters_from(result.data[0] if result.data else None)
+
+    async def kpi_timeseries(self, from_date: str, to_date: str, interval: str) -> List[Dict[str, Any]]:
+        result = self.supabase_admin.rpc("kpi_timeseries", {
+            "p_from": from_date,
+            "p_to": to_date,
+            "p_interval": interval
+        }).execute()
+        return result.data if result.data else []
+
+
+class PostgresMonitoringRepository:
+
+    async def aggregate_metrics(self, from_date: str, to_date: str) -> Dict[str, Any]:
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            metrics = await connection.fetchval(
+                "SELECT public.monitoring_metrics($1, $2)",
+                parse_timestamp(from_date),
+                parse_timestamp(to_date)
+            )
+        return metrics or {}
+
+    async def kpi_totals(self, from_date: str, to_date: str) -> Dict[str, float]:
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            record = await connection.fetchrow(
+                "SELECT * FROM public.kpi_totals($1, $2)",
+                parse_timestamp(from_date),
+                parse_timestamp(to_date)
+            )
+        return kpi_counters_from(record_to_dict(record) if record else None)
+
+    async def kpi_timeseries(self, from_date: str, to_date: str, interval: str) -> List[Dict[str, Any]]:
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            records = await connection.fetch(
+                "SELECT * FROM public.kpi_timeseries($1, $2, $3)",
+                parse_timestamp(from_date),
+                parse_timestamp(to_date),
+                interval
+            )
+        return [record_to_dict(record) for record in records]
+
+
+_repositories = {
+    "postgrest": PostgrestMonitoringRepository,
+    "postgres": PostgresMonitoringRepository,
+}
+_instances: Dict[str, Any] = {}
+
+
+def get_monitoring_repository():
+    backend = settings.MONITORING_REPOSITORY_BACKEND
+    if backend not in _instances:
+        _instances[backend] = _repositories[backend]()
+    return _instances[backend]
@@ -0,0 +1,236 @@
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.config import settings
+from app.core.database import get_supabase_admin
+from app.core.postgres import get_pool, record_to_dict, parse_uuid, parse_timestamp, quote_identifiers
+import uuid
+
+TICKET_LIST_FIELDS = {
+    "id", "client_id", "source", "subject", "description", "language", "summary",
+    "category", "subcategory", "department_id", "assigned_to", "priority", "status",
+    "auto_assigned", "auto_resolved", "need_on_site", "local_office_id", "engineer_id",
+    "sla_accept_deadline", "sla_remote_deadline", "first_response_at",
+    "classification_confidence", "ai_processing_time_ms", "duplicate_count",
+    "created_at", "updated_at", "closed_at",
+}
+
+TICKET_CARD_FIELDS = [
+    "id", "subject", "description", "summary", "source", "status", "priority",
+    "category", "subcategory", "department_id", "assigned_to", "auto_resolved",
+    "need_on_site", "language", "duplicate_count", "sla_accept_deadline",
+    "sla_remote_deadline", "created_at", "updated_at", "closed_at",
+]
+
+REQUIRED_LIST_FIELDS = ["id", "created_at"]
+
+
+def resolve_list_fields(fields: Optional[List[str]]) -> List[str]:
+    if not fields:
+        return list(TICKET_CARD_FIELDS)
+    unknown = [field for field in fields if field not in TICKET_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unsupported ticket fields: {', '.join(unknown)}")
+    selected = list(dict.fromkeys(fields))
+    return selected + [field for field in REQUIRED_LIST_FIELDS if field not in selected]
+
+
+class PostgrestTicketRepository:
+
+    def __init__(self):
+        self.supabase_admin = get_supabase_admin()
+
+    async def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        result = self.supabase_admin.table("tickets").select("*").eq("id", ticket_id).execute()
+        return result.data[0] if result.data else None
+
+    async def get_scoped(
+        self,
+        ticket_id: str,
+        role: Optional[str],
+        department_id: Optional[str] = None,
+        engineer_category: Optional[str] = None,
+        version_only: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        result = self.supabase_admin.rpc("get_scoped_ticket", {
+            "p_ticket_id": ticket_id,
+            "p_role": role,
+            "p_department_id": department_id,
+            "p_engineer_category": engineer_category,
+            "p_version_only": version_only
+        }).execute()
+        return result.data[0] if result.data else None
+
+    async def list_version(
+        self,
+        department_id: Optional[str] = None,
+        category: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        query = self.supabase_admin.table("tickets").select("updated_at")
+        query = self._apply_filters(query, department_id, category, status)
+        result = query.order("updated_at", desc=True).limit(1).execute()
+        # Deletes and moves out of the scope leave max(updated_at) as is; the change log id catches them
+        change = self.supabase_admin.table("ticket_change_log").select("id").order("id", desc=True).limit(1).execute()
+        return {
+            "version": result.data[0].get("updated_at") if result.data else None,
+            "change_id": change.data[0].get("id") if change.data else None
+        }
+
+    def _apply_filters(self, query, department_id: Optional[str], category: Optional[str], status: Optional[str]):
+        if department_id:
+            query = query.eq("department_id", department_id)
+        if category:
+            query = query.eq("category", category)
+        if status:
+            query = query.eq("status", status)
+        return query
+
+    async def list(
+        self,
+        department_id: Optional[str] = None,
+        category: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        query = self.supabase_admin.table("tickets").select(",".join(resolve_list_fields(fields)))
+        query = self._apply_filters(query, department_id, category, status)
+
+        if cursor:
+            created_at, ticket_id = cursor
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{ticket_id})')
+
+        query = query.order("created_at", desc=True).order("id", desc=True).limit(limit)
+        if not cursor:
+            query = query.offset(offset)
+
+        result = query.execute()
+        return result.data if result.data else []
+
+
+class PostgresTicketRepository:
+
+    async def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        ticket_uuid = parse_uuid(ticket_id)
+        if ticket_uuid is None:
+            return None
+
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            record = await connection.fetchrow("SELECT * FROM public.tickets WHERE id = $1", ticket_uuid)
+        return record_to_dict(record) if record else None
+
+    async def get_scoped(
+        self,
+        ticket_id: str,
+        role: Optional[str],
+        department_id: Optional[str] = None,
+        engineer_category: Optional[str] = None,
+        version_only: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        ticket_uuid = parse_uuid(ticket_id)
+        if ticket_uuid is None:
+            return None
+
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            record = await connection.fetchrow(
+                "SELECT allowed, ticket FROM public.get_scoped_ticket($1, $2, $3, $4, $5)",
+                ticket_uuid,
+                role,
+                parse_uuid(department_id) if department_id else None,
+                engineer_category,
+                version_only
+            )
+        return record_to_dict(record) if record else None
+
+    async def list_version(
+        self,
+        department_id: Optional[str] = None,
+        category: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        params: List[Any] = []
+        conditions = self._filter_conditions(department_id, category, status, params)
+        if conditions is None:
+            return {"version": None, "change_id": None}
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Both are index lookups; the change log id covers deletes and moves out of the scope
+        sql = (
+            f"SELECT (SELECT max(updated_at) FROM public.tickets{where}) AS version, "
+            "(SELECT max(id) FROM public.ticket_change_log) AS change_id"
+        )
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            record = await connection.fetchrow(sql, *params)
+        return record_to_dict(record)
+
+    def _filter_conditions(
+        self,
+        department_id: Optional[str],
+        category: Optional[str],
+        status: Optional[str],
+        params: List[Any]
+    ) -> Optional[List[str]]:
+        conditions = []
+        if department_id:
+            department_uuid = parse_uuid(department_id)
+            if department_uuid is None:
+                return None
+            params.append(department_uuid)
+            conditions.append(f"department_id = ${len(params)}")
+        if category:
+            params.append(category)
+            conditions.append(f"category = ${len(params)}")
+        if status:
+            params.append(status)
+            conditions.append(f"status = ${len(params)}")
+        return conditions
+
+    async def list(
+        self,
+        department_id: Optional[str] = None,
+        category: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[Tuple[str, str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        columns = quote_identifiers(resolve_list_fields(fields))
+        params: List[Any] = []
+        conditions = self._filter_conditions(department_id, category, status, params)
+        if conditions is None:
+            return []
+
+        if cursor:
+            params.extend([parse_timestamp(cursor[0]), uuid.UUID(cursor[1])])
+            conditions.append(f"(created_at, id) < (${len(params) - 1}, ${len(params)})")
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        sql = f"SELECT {columns} FROM public.tickets{where} ORDER BY created_at DESC, id DESC LIMIT ${len(params)}"
+        if not cursor:
+            params.append(offset)
+            sql += f" OFFSET ${len(params)}"
+
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            records = await connection.fetch(sql, *params)
+        return [record_to_dict(record) for record in records]
+
+
+_repositories = {
+    "postgrest": PostgrestTicketRepository,
+    "postgres": PostgresTicketRepository,
+}
+_instances: Dict[str, Any] = {}
+
+
+def get_ticket_repository():
+    backend = settings.TICKETS_REPOSITORY_BACKEND
+    if backend not in _instances:
+        _instances[backend] = _repositories[backend]()
+    return _instances[backend]
@@ -3,6 +3,8 @@ from typing import Dict, Any, Optional, List
 from openai import OpenAI
 from app.core.config import settings
 from app.core.database import get_supabase
+from app.core.telemetry import track_openai
+from app.core.tracing import tracer
 from langdetect import detect, LangDetectException
 
 _client = None
@@ -31,10 +33,11 @@ class AIService:
 
     def get_embedding(self, text: str) -> List[float]:
         client = get_openai_client()
-        response = client.embeddings.create(
-            model=self.embedding_model,
-            input=text
-        )
+        with track_openai("get_embedding"):
+            response = client.embeddings.create(
+                model=self.embedding_model,
+                input=text
+            )
         return response.data[0].embedding
 
     async def classify_ticket(self, ticket_text: str, subject: str = "") -> Dict[str, Any]:
@@ -57,15 +60,16 @@ class AIService:
 
         try:
             client = get_openai_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
+            with track_openai("classify_ticket"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.3,
+                    response_format={"type": "json_object"}
+                )
 
             result = json.loads(response.choices[0].message.content)
 
@@ -117,15 +121,16 @@ class AIService:
 Отвечай ТОЛЬКО описанием проблемы, без дополнительных комментариев."""
 
             client = get_openai_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": history_text}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
+            with track_openai("generate_ticket_summary"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": history_text}
+                    ],
+                    temperature=0.3,
+                    max_tokens=200
+                )
 
             summary = response.choices[0].message.content.strip()
             return summary
@@ -134,6 +139,7 @@ class AIService:
             print(f"Error generating ticket summary: {e}")
             return user_message[:200] + ("..." if len(user_message) > 200 else "")
 
+    @tracer.start_as_current_span("ai.retrieve_kb")
     async def retrieve_kb(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         supabase = get_supabase()
 
@@ -182,15 +188,16 @@ class AIService:
 
         try:
             client = get_openai_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.5,
-                response_format={"type": "json_object"}
-            )
+            with track_openai("generate_answer"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.5,
+                    response_format={"type": "json_object"}
+                )
 
             result = json.loads(response.choices[0].message.content)
             return {
@@ -212,12 +219,13 @@ class AIService:
 
         try:
             client = get_openai_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=150
-            )
+            with track_openai("generate_summary"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,
+                    max_tokens=150
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             return ticket_text[:200] + "..." if len(ticket_text) > 200 else ticket_text
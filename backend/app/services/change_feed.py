@@ -0,0 +1,206 @@
+from app.core.config import settings
+from app.core.postgres import get_pool, record_to_dict
+from app.core.auth import Principal
+from typing import Optional, Dict, Any, List, Set, Deque, AsyncIterator, Callable, Awaitable
+from collections import deque
+import asyncio
+import asyncpg
+import json
+import time
+
+CHANNEL = "ticket_changes"
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class SeenIds:
+    # Change log ids are taken at insert, not commit, so events arrive out of id order.
+    # Dedupe on the ids themselves within a bounded window instead of a high-water mark.
+
+    def __init__(self, capacity: int):
+        self._order: Deque[int] = deque()
+        self._ids: Set[int] = set()
+        self._capacity = capacity
+
+    def add(self, event_id: int) -> bool:
+        if event_id in self._ids:
+            return False
+        self._ids.add(event_id)
+        self._order.append(event_id)
+        if len(self._order) > self._capacity:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+class FeedSubscription:
+
+    def __init__(self, principal: Principal):
+        self.principal = principal
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHANGE_FEED_QUEUE_SIZE)
+        self.needs_resync = False
+
+    def matches(self, change: Dict[str, Any]) -> bool:
+        if self.principal.in_list_scope(change):
+            return True
+        # A ticket moved out of the subscriber's scope: still send the event so the row is dropped
+        if change.get("operation") != "UPDATE":
+            return False
+        return self.principal.in_list_scope({
+            "department_id": change.get("old_department_id"),
+            "category": change.get("old_category")
+        })
+
+    def push(self, change: Dict[str, Any]):
+        if self.needs_resync:
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            print(f"[CHANGE_FEED] Queue overflow for user {self.principal.user_id}, forcing resync")
+            self.needs_resync = True
+
+    def invalidate(self):
+        self.needs_resync = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class ChangeFeed:
+
+    def __init__(self):
+        self._subscriptions: Set[FeedSubscription] = set()
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+        self._last_pruned_at = float("-inf")
+
+    async def subscribe(self, principal: Principal) -> FeedSubscription:
+        await self._ensure_listening()
+        subscription = FeedSubscription(principal)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription):
+        self._subscriptions.discard(subscription)
+
+    async def events(
+        self,
+        subscription: FeedSubscription,
+        after_id: Optional[int],
+        is_disconnected: Callable[[], Awaitable[bool]]
+    ) -> AsyncIterator[str]:
+        try:
+            seen = SeenIds(settings.CHANGE_FEED_SEEN_WINDOW)
+            yield f"retry: {int(settings.CHANGE_FEED_HEARTBEAT_SECONDS * 1000)}\n\n"
+
+            if after_id is not None:
+                missed = await self.replay(subscription, after_id)
+                if missed is None:
+                    yield format_event("resync", {"reason": "cursor_expired"})
+                    return
+                for change in missed:
+                    if seen.add(change["id"]):
+                        yield format_event("ticket", change, change["id"])
+
+            while True:
+                if subscription.needs_resync:
+                    yield format_event("resync", {"reason": "backlog_dropped"})
+                    return
+                try:
+                    change = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=settings.CHANGE_FEED_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+
+                if change is None or not seen.add(change["id"]):
+                    continue
+                yield format_event("ticket", change, change["id"])
+        finally:
+            self.unsubscribe(subscription)
+
+    async def replay(self, subscription: FeedSubscription, after_id: int) -> Optional[List[Dict[str, Any]]]:
+        limit = settings.CHANGE_FEED_REPLAY_LIMIT
+        lag = settings.CHANGE_FEED_REPLAY_LAG_IDS
+        pool = await get_pool()
+        async with pool.acquire() as connection:
+            oldest_id = await connection.fetchval("SELECT min(id) FROM public.ticket_change_log")
+            if oldest_id is not None and oldest_id > after_id + 1:
+                return None
+            # Rows just below the cursor may have committed after it was sent: re-read a lag
+            # window. Repeats are harmless, clients only invalidate cached tickets on an event
+            records = await connection.fetch(
+                "SELECT * FROM public.ticket_change_log WHERE id > $1 ORDER BY id LIMIT $2",
+                max(after_id - lag, 0),
+                limit + lag + 1
+            )
+
+        if sum(1 for record in records if record["id"] > after_id) > limit:
+            return None
+        changes = [record_to_dict(record) for record in records]
+        return [change for change in changes if subscription.matches(change)]
+
+    async def close(self):
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+        for subscription in list(self._subscriptions):
+            subscription.invalidate()
+
+    async def _ensure_listening(self):
+        if self._connection is None or self._connection.is_closed():
+            async with self._lock:
+                if self._connection is None or self._connection.is_closed():
+                    connection = await asyncpg.connect(dsn=settings.DATABASE_URL)
+                    connection.add_termination_listener(self._on_terminated)
+                    await connection.add_listener(CHANNEL, self._on_notify)
+                    self._connection = connection
+                    print(f"[CHANGE_FEED] Listening on channel {CHANNEL}")
+        await self._prune_if_due()
+
+    async def _prune_if_due(self):
+        if time.monotonic() - self._last_pruned_at < settings.CHANGE_FEED_PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_pruned_at = time.monotonic()
+        try:
+            pool = await get_pool()
+            async with pool.acquire() as connection:
+                result = await connection.execute(
+                    "DELETE FROM public.ticket_change_log WHERE changed_at < NOW() - make_interval(days => $1)",
+                    settings.CHANGE_FEED_RETENTION_DAYS
+                )
+            print(f"[CHANGE_FEED] Pruned change log: {result}")
+        except Exception as e:
+            print(f"[CHANGE_FEED] Error pruning change log: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            print(f"[CHANGE_FEED] Ignoring malformed payload: {payload[:200]}")
+            return
+        for subscription in list(self._subscriptions):
+            if subscription.matches(change):
+                subscription.push(change)
+
+    def _on_terminated(self, connection):
+        print("[CHANGE_FEED] Listener connection lost, subscribers will resync")
+        if self._connection is connection:
+            self._connection = None
+        for subscription in list(self._subscriptions):
+            subscription.invalidate()
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,96 @@
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta
+from app.core.database import get_supabase_admin
+from app.core.config import settings
+
+CONTACT_KEYS = [
+    "telegram_user_id",
+    "whatsapp_number",
+    "email_address",
+    "phone",
+    "user_id",
+]
+
+
+def get_channel_contact(incoming_meta: Dict[str, Any]) -> Optional[str]:
+    for key in CONTACT_KEYS:
+        value = incoming_meta.get(key)
+        if value:
+            return str(value)
+
+    contact_info = incoming_meta.get("contact_info")
+    if isinstance(contact_info, dict):
+        for key in CONTACT_KEYS:
+            value = contact_info.get(key)
+            if value:
+                return str(value)
+    return None
+
+
+class DuplicateService:
+
+    def __init__(self):
+        self.supabase_admin = get_supabase_admin()
+
+    async def find_parent(
+        self,
+        embedding: List[float],
+        source: str,
+        category: Optional[str],
+        channel_contact: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        if not settings.DUPLICATE_DETECTION_ENABLED:
+            return None
+
+        since = datetime.utcnow() - timedelta(minutes=settings.DUPLICATE_WINDOW_MINUTES)
+        try:
+            result = self.supabase_admin.rpc(
+                "find_duplicate_ticket",
+                {
+                    "query_embedding": embedding,
+                    "p_source": source,
+                    "p_category": category,
+                    "p_channel_contact": channel_contact,
+                    "p_since": since.isoformat(),
+                    "match_threshold": settings.DUPLICATE_MIN_SIMILARITY,
+                    "contact_match_threshold": settings.DUPLICATE_SAME_CONTACT_MIN_SIMILARITY
+                }
+            ).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"[DUPLICATES] Duplicate lookup failed: {e}")
+            return None
+
+    async def attach(
+        self,
+        parent_ticket_id: str,
+        data: Dict[str, Any],
+        channel_contact: Optional[str],
+        similarity: float
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            result = self.supabase_admin.rpc(
+                "attach_duplicate_ticket",
+                {
+                    "p_parent_ticket_id": parent_ticket_id,
+                    "p_source": data["source"],
+                    "p_subject": data.get("subject"),
+                    "p_description": data["text"],
+                    "p_channel_contact": channel_contact,
+                    "p_source_meta": data.get("incoming_meta", {}),
+                    "p_similarity": similarity
+                }
+            ).execute()
+        except Exception as e:
+            print(f"[DUPLICATES] Failed to attach duplicate to {parent_ticket_id}: {e}")
+            return None
+
+        if not result.data:
+            return None
+
+        parent = result.data[0]
+        print(f"[DUPLICATES] Attached duplicate to ticket {parent_ticket_id} (similarity={similarity:.3f}, total={parent.get('duplicate_count')})")
+        return {**parent, "is_duplicate": True, "duplicate_of": parent_ticket_id}
+
+
+duplicate_service = DuplicateService()
@@ -0,0 +1,99 @@
+from app.core.config import settings
+from app.repositories.exports import EXPORT_TABLES, EXPORT_COLUMNS, get_export_repository
+from app.core.postgres import parse_timestamp
+from typing import Optional, Dict, Any, List, AsyncIterator
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class ExportService:
+
+    def validate(self, table: str, export_format: str, from_date: Optional[str], to_date: Optional[str]):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"table must be one of: {', '.join(EXPORT_TABLES)}")
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        # Fail before the response starts; errors mid-stream would truncate the file
+        for value in (from_date, to_date):
+            if value:
+                parse_timestamp(value)
+
+    def filename(self, table: str, export_format: str, compress: bool) -> str:
+        return f"{table}.{export_format}" + (".gz" if compress else "")
+
+    async def stream(
+        self,
+        table: str,
+        export_format: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
+        rows = get_export_repository().stream_rows(table, from_date, to_date)
+        encoded = self._ndjson(rows) if export_format == "ndjson" else self._csv(rows, EXPORT_COLUMNS[table])
+        chunks = self._buffer(encoded)
+        if compress:
+            chunks = self._gzip(chunks)
+
+        exported = 0
+        async for chunk in chunks:
+            exported += len(chunk)
+            yield chunk
+        print(f"[EXPORT] Streamed {table} as {export_format}{' (gzip)' if compress else ''}: {exported} bytes")
+
+    async def _ndjson(self, rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+        async for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+    async def _csv(self, rows: AsyncIterator[Dict[str, Any]], columns: List[str]) -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # Header goes out before the first row so an empty range is still a valid table
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        async for row in rows:
+            writer.writerow([_csv_value(row.get(column)) for column in columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    async def _buffer(self, parts: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        # Coalesce per-row strings into chunks so the response is not sent one row per write
+        pending: List[bytes] = []
+        size = 0
+        async for part in parts:
+            data = part.encode("utf-8")
+            pending.append(data)
+            size += len(data)
+            if size >= settings.EXPORT_CHUNK_BYTES:
+                yield b"".join(pending)
+                pending = []
+                size = 0
+        if pending:
+            yield b"".join(pending)
+
+    async def _gzip(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(level=6, wbits=16 + zlib.MAX_WBITS)
+        async for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+
+export_service = ExportService()
@@ -0,0 +1,161 @@
+from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.etag import make_etag
+from app.repositories.monitoring import get_monitoring_repository
+from typing import Optional, Dict, Any, Tuple, List, Callable, Awaitable
+from datetime import datetime, timedelta, timezone
+import asyncio
+import math
+
+GLOBAL_SCOPE = "global"
+
+# Ordered finest to coarsest; long ranges fall through to a coarser interval
+TIMESERIES_INTERVALS = {"5m": 300, "1h": 3600, "1d": 86400, "1w": 604800}
+
+_snapshot_cache = TTLCache(
+    "metrics",
+    ttl_seconds=settings.METRICS_CACHE_TTL_SECONDS,
+    max_size=settings.METRICS_CACHE_MAX_SIZE
+)
+
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _floor_to_bucket(value: datetime) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=value.tzinfo)
+    return value - (value - epoch) % timedelta(seconds=settings.METRICS_BUCKET_SECONDS)
+
+
+def _timeseries_point(row: Dict[str, Any]) -> Dict[str, Any]:
+    interactions = row.get("interactions") or 0
+    auto_resolved = row.get("auto_resolved") or 0
+    tickets_closed = row.get("tickets_closed") or 0
+    response_count = (row.get("chat_response_count") or 0) + (row.get("ticket_response_count") or 0)
+    response_sum = (row.get("chat_response_sum") or 0) + (row.get("ticket_response_sum") or 0)
+    quantiles: List[Optional[float]] = row.get("response_quantiles") or [None, None]
+
+    return {
+        "bucket_start": row["bucket_start"],
+        "interactions": interactions,
+        "auto_resolved": auto_resolved,
+        "auto_resolve_rate": (auto_resolved / interactions * 100) if interactions > 0 else 0.0,
+        "tickets_created": row.get("tickets_created") or 0,
+        "tickets_closed": tickets_closed,
+        "sla_compliance": ((tickets_closed + auto_resolved) / interactions * 100) if interactions > 0 else 0.0,
+        "avg_response_time_seconds": response_sum / response_count if response_count else None,
+        "median_response_time_seconds": quantiles[0],
+        "p95_response_time_seconds": quantiles[1]
+    }
+
+
+class MetricsService:
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, ...], asyncio.Task] = {}
+
+    def bucket_range(self, from_date: Optional[str], to_date: Optional[str]) -> Tuple[datetime, datetime]:
+        period_to = _parse_datetime(to_date) if to_date else datetime.now(timezone.utc)
+        period_from = _parse_datetime(from_date) if from_date else period_to - timedelta(days=30)
+        return _floor_to_bucket(period_from), _floor_to_bucket(period_to)
+
+    async def get_snapshot(
+        self,
+        from_date: Optional[str],
+        to_date: Optional[str],
+        scope: str = GLOBAL_SCOPE
+    ) -> Dict[str, Any]:
+        period_from, period_to = self.bucket_range(from_date, to_date)
+        key = (scope, period_from.isoformat(), period_to.isoformat())
+        return await self._load(key, lambda: self._compute(key, period_from, period_to))
+
+    def resolve_interval(self, requested: str, period_from: datetime, period_to: datetime) -> str:
+        if requested not in TIMESERIES_INTERVALS:
+            raise ValueError(f"interval must be one of: {', '.join(TIMESERIES_INTERVALS)}")
+        span_seconds = (period_to - period_from).total_seconds()
+        for interval, seconds in TIMESERIES_INTERVALS.items():
+            if seconds < TIMESERIES_INTERVALS[requested]:
+                continue
+            if math.ceil(span_seconds / seconds) + 1 <= settings.METRICS_TIMESERIES_MAX_POINTS:
+                return interval
+        return interval
+
+    async def get_timeseries(
+        self,
+        from_date: Optional[str],
+        to_date: Optional[str],
+        interval: str,
+        scope: str = GLOBAL_SCOPE
+    ) -> Dict[str, Any]:
+        period_from, period_to = self.bucket_range(from_date, to_date)
+        if period_from > period_to:
+            raise ValueError("from_date must not be after to_date")
+        effective_interval = self.resolve_interval(interval, period_from, period_to)
+        key = (scope, f"timeseries:{effective_interval}", period_from.isoformat(), period_to.isoformat())
+        series = await self._load(key, lambda: self._compute_timeseries(key, period_from, period_to, effective_interval))
+        return {**series, "requested_interval": interval}
+
+    async def _load(self, key: Tuple[str, ...], compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        cached = _snapshot_cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Tuple[str, ...], period_from: datetime, period_to: datetime) -> Dict[str, Any]:
+        repository = get_monitoring_repository()
+        from_date = period_from.isoformat()
+        to_date = period_to.isoformat()
+
+        kpi = await repository.kpi_totals(from_date, to_date)
+        monitoring = await repository.aggregate_metrics(from_date, to_date)
+
+        snapshot = {
+            "period_from": period_from,
+            "period_to": period_to,
+            "kpi": kpi,
+            "monitoring": monitoring,
+            "etag": make_etag("metrics", key, kpi, monitoring),
+            "computed_at": datetime.utcnow()
+        }
+        _snapshot_cache.set(key, snapshot)
+        print(f"[METRICS] Computed snapshot for {key[0]} {from_date} - {to_date}")
+        return snapshot
+
+    async def _compute_timeseries(
+        self,
+        key: Tuple[str, ...],
+        period_from: datetime,
+        period_to: datetime,
+        interval: str
+    ) -> Dict[str, Any]:
+        rows = await get_monitoring_repository().kpi_timeseries(period_from.isoformat(), period_to.isoformat(), interval)
+        points = [_timeseries_point(row) for row in rows]
+
+        series = {
+            "interval": interval,
+            "period_from": period_from,
+            "period_to": period_to,
+            "points": points,
+            "etag": make_etag("metrics_timeseries", key, points),
+            "computed_at": datetime.utcnow()
+        }
+        _snapshot_cache.set(key, series)
+        print(f"[METRICS] Computed {len(points)} {interval} points for {key[0]} {key[2]} - {key[3]}")
+        return series
+
+    def _finish(self, key: Tuple[str, ...], task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[METRICS] Error computing {' '.join(key)}: {task.exception()}")
+
+
+metrics_service = MetricsService()
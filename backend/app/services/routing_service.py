@@ -0,0 +1,103 @@
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from app.core.database import get_supabase_admin
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.services.ai_service import ai_service
+
+
+class RoutingService:
+
+    def __init__(self):
+        self.supabase_admin = get_supabase_admin()
+
+    def embed_ticket_text(self, text: str) -> Optional[List[float]]:
+        try:
+            return ai_service.get_embedding(text)
+        except Exception as e:
+            print(f"[ROUTING] Failed to embed ticket text: {e}")
+            return None
+
+    def store_ticket_embedding(self, ticket_id: str, text: str, embedding: Optional[List[float]] = None) -> bool:
+        try:
+            if embedding is None:
+                embedding = ai_service.get_embedding(text)
+            self.supabase_admin.table("ticket_embeddings").upsert({
+                "ticket_id": ticket_id,
+                "embedding": embedding,
+                "text_excerpt": text[:500],
+                "created_at": datetime.utcnow().isoformat()
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"[ROUTING] Failed to store embedding for ticket {ticket_id}: {e}")
+            return False
+
+    async def find_neighbours(self, ticket_id: str) -> List[Dict[str, Any]]:
+        try:
+            result = self.supabase_admin.rpc(
+                "match_ticket_neighbours",
+                {
+                    "p_ticket_id": ticket_id,
+                    "match_count": settings.KNN_ROUTING_NEIGHBOURS,
+                    "match_threshold": settings.KNN_ROUTING_MIN_SIMILARITY
+                }
+            ).execute()
+            return result.data or []
+        except Exception as e:
+            print(f"[ROUTING] Neighbour lookup failed for ticket {ticket_id}: {e}")
+            return []
+
+    @tracer.start_as_current_span("routing.propose")
+    async def propose(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        if not settings.KNN_ROUTING_ENABLED:
+            return None
+
+        neighbours = await self.find_neighbours(ticket_id)
+        if len(neighbours) < settings.KNN_ROUTING_MIN_NEIGHBOURS:
+            return None
+
+        category, category_agreement = _weighted_vote(neighbours, "category")
+        department, department_agreement = _weighted_vote(neighbours, "department")
+        priority, _ = _weighted_vote(neighbours, "priority")
+        subcategory, _ = _weighted_vote(neighbours, "subcategory")
+        auto_resolved, auto_resolved_agreement = _weighted_vote(neighbours, "auto_resolved")
+
+        agreement = min(category_agreement, department_agreement)
+        if not category or not department or agreement < settings.KNN_ROUTING_MIN_AGREEMENT:
+            print(f"[ROUTING] Neighbours disagree for ticket {ticket_id}: agreement={agreement:.2f}")
+            return None
+
+        print(f"[ROUTING] kNN routed ticket {ticket_id}: category={category}, department={department}, agreement={agreement:.2f}, neighbours={len(neighbours)}")
+
+        return {
+            "category": category,
+            "subcategory": subcategory or "general",
+            "department": department,
+            "priority": priority or "medium",
+            "auto_resolve_candidate": auto_resolved is True and auto_resolved_agreement >= settings.KNN_ROUTING_MIN_AGREEMENT,
+            "confidence": agreement,
+            "routed_by": "knn",
+            "neighbours": len(neighbours)
+        }
+
+
+def _weighted_vote(neighbours: List[Dict[str, Any]], field: str):
+    weights: Dict[Any, float] = {}
+    total = 0.0
+    for neighbour in neighbours:
+        weight = float(neighbour.get("similarity") or 0.0)
+        total += weight
+        label = neighbour.get(field)
+        if label is None:
+            continue
+        weights[label] = weights.get(label, 0.0) + weight
+
+    if not weights or total <= 0:
+        return None, 0.0
+
+    label, weight = max(weights.items(), key=lambda item: item[1])
+    return label, weight / total
+
+
+routing_service = RoutingService()
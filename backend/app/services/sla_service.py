@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from app.core.database import get_supabase_admin
 from app.models.schemas import TicketStatus
+from app.services.ticket_service import ticket_service
 
 
 class SLAService:
@@ -46,6 +47,7 @@ class SLAService:
         }
 
         self.supabase.table("tickets").update(update_data).eq("id", ticket_id).execute()
+        ticket_service.invalidate_ticket(ticket_id)
 
         self._log_ticket_history(ticket_id, "status", TicketStatus.IN_PROGRESS.value, TicketStatus.ESCALATED.value, reason)
 
@@ -57,6 +59,7 @@ class SLAService:
         }
 
         self.supabase.table("tickets").update(update_data).eq("id", ticket_id).execute()
+        ticket_service.invalidate_ticket(ticket_id)
 
     def _log_ticket_history(self, ticket_id: str, field_name: str, old_value: str, new_value: str, changed_by: str = "system"):
         history_data = {
@@ -1,11 +1,24 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 from app.core.database import get_supabase, get_supabase_admin
 from app.core.config import settings
 from app.models.schemas import TicketStatus, TicketPriority
 from app.services.ai_service import ai_service
+from app.services.routing_service import routing_service
+from app.services.duplicate_service import duplicate_service, get_channel_contact
+from app.repositories.tickets import get_ticket_repository
+from app.core.auth import Principal
+from app.core.cache import TTLCache
+from app.core.tracing import tracer
+from app.core.postgres import parse_timestamp
 import uuid
 
+_ticket_cache = TTLCache(
+    "tickets",
+    ttl_seconds=settings.TICKET_CACHE_TTL_SECONDS,
+    max_size=settings.TICKET_CACHE_MAX_SIZE
+)
+
 
 class TicketService:
 
@@ -23,6 +36,16 @@ class TicketService:
         language = incoming_meta.get("language")
         summary = incoming_meta.get("summary")
         department_name = incoming_meta.get("department")
+        channel_contact = get_channel_contact(incoming_meta)
+
+        embedding = routing_service.embed_ticket_text(data["text"])
+        if embedding is not None:
+            parent = await duplicate_service.find_parent(embedding, data["source"], category, channel_contact)
+            if parent:
+                duplicate = await duplicate_service.attach(parent["ticket_id"], data, channel_contact, parent["similarity"])
+                if duplicate:
+                    self.invalidate_ticket(parent["ticket_id"])
+                    return duplicate
 
         department_id = None
         if department_name:
@@ -34,7 +57,7 @@ class TicketService:
             "id": ticket_id,
             "client_id": data.get("client_id"),
             "source": data["source"],
-            "source_meta": incoming_meta,
+            "source_meta": {**incoming_meta, "channel_contact": channel_contact} if channel_contact else incoming_meta,
             "subject": data["subject"],
             "description": data["text"],
             "status": TicketStatus.NEW.value,
@@ -58,6 +81,8 @@ class TicketService:
 
             if result.data:
                 print(f"[TICKET_SERVICE] Ticket created successfully: {result.data[0].get('id')}")
+                if embedding is not None:
+                    routing_service.store_ticket_embedding(ticket_id, data["text"], embedding=embedding)
                 return result.data[0]
             else:
                 print(f"[TICKET_SERVICE] No data returned from insert")
@@ -68,6 +93,7 @@ class TicketService:
             traceback.print_exc()
             raise
 
+    @tracer.start_as_current_span("ticket.process_with_ai")
     async def process_with_ai(self, ticket_id: str) -> Dict[str, Any]:
         ticket_result = self.supabase_admin.table("tickets").select("*").eq("id", ticket_id).execute()
 
@@ -76,10 +102,14 @@ class TicketService:
 
         ticket = ticket_result.data[0]
 
-        classification = await ai_service.classify_ticket(
-            ticket["description"],
-            ticket.get("subject", "")
-        )
+        classification = await routing_service.propose(ticket_id)
+        if classification:
+            classification["language"] = ai_service.detect_language(ticket["description"])
+        else:
+            classification = await ai_service.classify_ticket(
+                ticket["description"],
+                ticket.get("subject", "")
+            )
 
         dept_result = self.supabase_admin.table("departments").select("id, sla_accept_minutes").eq("name", classification["department"]).execute()
         department_id = None
@@ -133,6 +163,7 @@ class TicketService:
             update_data["need_on_site"] = True
 
         self.supabase_admin.table("tickets").update(update_data).eq("id", ticket_id).execute()
+        self.invalidate_ticket(ticket_id)
 
         await self._log_classification(ticket_id, classification, department_id)
 
@@ -214,14 +245,188 @@ class TicketService:
         updates["updated_at"] = datetime.utcnow().isoformat()
 
         result = self.supabase_admin.table("tickets").update(updates).eq("id", ticket_id).execute()
+        self.invalidate_ticket(ticket_id)
 
         if result.data:
+            self._cache_ticket(result.data[0])
             return result.data[0]
         raise ValueError(f"Ticket {ticket_id} not found")
 
+    async def bulk_update_tickets(
+        self,
+        updates: Dict[str, Any],
+        ticket_ids: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        changed_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        columns = ", ".join(dict.fromkeys(["id", "department_id", *updates]))
+        results: List[Dict[str, Any]] = []
+
+        if ticket_ids is not None:
+            requested = []
+            for ticket_id in dict.fromkeys(ticket_ids):
+                try:
+                    requested.append(str(uuid.UUID(ticket_id)))
+                except ValueError:
+                    results.append({"ticket_id": ticket_id, "status": "invalid_id"})
+            current = []
+            for chunk in _chunks(requested, settings.TICKETS_BULK_CHUNK_SIZE):
+                result = self.supabase_admin.table("tickets").select(columns).in_("id", chunk).execute()
+                current.extend(result.data or [])
+        else:
+            query = self.supabase_admin.table("tickets").select(columns)
+            for column, value in (filters or {}).items():
+                if value is not None:
+                    query = query.eq(column, value)
+            result = query.limit(settings.TICKETS_BULK_MAX_SIZE + 1).execute()
+            current = result.data or []
+            if len(current) > settings.TICKETS_BULK_MAX_SIZE:
+                raise ValueError(f"Filter matches more than {settings.TICKETS_BULK_MAX_SIZE} tickets")
+            requested = [ticket["id"] for ticket in current]
+
+        current_by_id = {ticket["id"]: ticket for ticket in current}
+        changes_by_id = {
+            ticket_id: {field: value for field, value in updates.items() if ticket.get(field) != value}
+            for ticket_id, ticket in current_by_id.items()
+        }
+        # Tickets already in the target state are not written: no new updated_at, no change feed event
+        changed_ids = [ticket_id for ticket_id, changes in changes_by_id.items() if changes]
+        updated_ids = set()
+        now = datetime.utcnow().isoformat()
+        for chunk in _chunks(changed_ids, settings.TICKETS_BULK_CHUNK_SIZE):
+            result = self.supabase_admin.table("tickets")\
+                .update({**updates, "updated_at": now})\
+                .in_("id", chunk)\
+                .execute()
+            updated_ids.update(row["id"] for row in result.data or [])
+            for ticket_id in chunk:
+                self.invalidate_ticket(ticket_id)
+
+        history_rows = []
+        routing_error_rows = []
+        for ticket_id in requested:
+            ticket = current_by_id.get(ticket_id)
+            changes = changes_by_id.get(ticket_id)
+            if ticket is None or (changes and ticket_id not in updated_ids):
+                results.append({"ticket_id": ticket_id, "status": "not_found"})
+                continue
+
+            for field, value in changes.items():
+                history_rows.append({
+                    "ticket_id": ticket_id,
+                    "changed_by": changed_by,
+                    "field_name": field,
+                    "old_value": None if ticket.get(field) is None else str(ticket.get(field)),
+                    "new_value": None if value is None else str(value),
+                    "created_at": now
+                })
+            if "department_id" in changes:
+                routing_error_rows.append({
+                    "ticket_id": ticket_id,
+                    "initial_department_id": ticket.get("department_id"),
+                    "correct_department_id": changes["department_id"],
+                    "routed_by": changed_by,
+                    "error_type": "wrong_department"
+                })
+            results.append({
+                "ticket_id": ticket_id,
+                "status": "updated" if changes else "unchanged",
+                "changes": changes
+            })
+
+        self._insert_batch("ticket_history", history_rows)
+        self._insert_batch("routing_errors", routing_error_rows)
+
+        print(f"[BULK_UPDATE] {len(updated_ids)} of {len(requested)} tickets updated by {changed_by}: {list(updates)}")
+        return {"matched": len(current_by_id), "updated": len(updated_ids), "results": results}
+
+    async def claim_next_ticket(
+        self,
+        user_id: str,
+        department_id: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        result = self.supabase_admin.rpc("claim_next_ticket", {
+            "p_user_id": user_id,
+            "p_department_id": department_id,
+            "p_category": category
+        }).execute()
+
+        if not result.data:
+            return None
+        ticket = result.data[0]
+        self.invalidate_ticket(ticket["id"])
+        self._cache_ticket(ticket)
+        print(f"[CLAIM] Ticket {ticket['id']} claimed by {user_id}")
+        return ticket
+
+    def _insert_batch(self, table: str, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        try:
+            self.supabase_admin.table(table).insert(rows).execute()
+        except Exception as e:
+            print(f"Failed to log {len(rows)} rows to {table}: {e}")
+
     async def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
-        result = self.supabase_admin.table("tickets").select("*").eq("id", ticket_id).execute()
-        return result.data[0] if result.data else None
+        ticket = _ticket_cache.get(ticket_id)
+        if ticket is not None:
+            return dict(ticket)
+
+        ticket = await get_ticket_repository().get(ticket_id)
+        if ticket:
+            self._cache_ticket(ticket)
+        return ticket
+
+    async def get_scoped_ticket(
+        self,
+        ticket_id: str,
+        principal: Principal,
+        version_only: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        ticket = _ticket_cache.get(ticket_id)
+        if ticket is not None:
+            allowed = principal.can_view_ticket(ticket)
+            return {"allowed": allowed, "ticket": dict(ticket) if allowed else None}
+
+        scoped = await get_ticket_repository().get_scoped(
+            ticket_id,
+            role=principal.role,
+            department_id=principal.department_id,
+            engineer_category=principal.engineer_category,
+            version_only=version_only
+        )
+        if scoped and scoped.get("allowed") and not version_only:
+            self._cache_ticket(scoped["ticket"])
+        return scoped
+
+    def invalidate_ticket(self, ticket_id: Optional[str] = None):
+        if ticket_id is None:
+            _ticket_cache.clear()
+        else:
+            _ticket_cache.delete(ticket_id)
+
+    def _cache_ticket(self, ticket: Dict[str, Any]):
+        # Never replace a newer version, e.g. when a slow read returns after a write
+        cached = _ticket_cache.peek(ticket["id"])
+        if cached is not None:
+            cached_version = parse_timestamp(cached.get("updated_at"))
+            new_version = parse_timestamp(ticket.get("updated_at"))
+            if cached_version and new_version and cached_version > new_version:
+                return
+        _ticket_cache.set(ticket["id"], ticket)
+
+    async def get_list_version(
+        self,
+        department_id: Optional[str] = None,
+        category: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return await get_ticket_repository().list_version(
+            department_id=department_id,
+            category=category,
+            status=status
+        )
 
     async def list_tickets(
         self,
@@ -229,21 +434,24 @@ class TicketService:
         category: Optional[str] = None,
         status: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[str, str]] = None,
+        fields: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        query = self.supabase_admin.table("tickets").select("*")
-
-        if department_id:
-            query = query.eq("department_id", department_id)
-        if category:
-            query = query.eq("category", category)
-        if status:
-            query = query.eq("status", status)
+        return await get_ticket_repository().list(
+            department_id=department_id,
+            category=category,
+            status=status,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            fields=fields
+        )
 
-        query = query.order("created_at", desc=True).limit(limit).offset(offset)
 
-        result = query.execute()
-        return result.data if result.data else []
+def _chunks(items: List[str], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 ticket_service = TicketService()
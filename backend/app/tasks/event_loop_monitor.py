@@ -0,0 +1,12 @@
+from app.core.config import settings
+from app.core.telemetry import EVENT_LOOP_LAG
+import asyncio
+
+
+async def monitor_event_loop_lag():
+    interval = settings.TELEMETRY_LOOP_LAG_INTERVAL_SECONDS
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled_at = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - scheduled_at - interval))
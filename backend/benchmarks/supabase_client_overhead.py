@@ -0,0 +1,83 @@
+"""Per-request Supabase client overhead: a new client per call vs the pooled singleton.
+
+Replays the PostgREST calls made by ``GET /api/tickets`` and ``POST /api/public/chat``
+against the configured project (reads ``backend/.env``). The public_chat replay reads
+``chat_interactions`` instead of inserting so the benchmark leaves no rows behind.
+
+    cd backend
+    python -m benchmarks.supabase_client_overhead --iterations 50
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+
+from app.core.config import settings
+from app.core.database import get_supabase_admin
+
+
+def per_call_client() -> Client:
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY, ClientOptions())
+
+
+def list_tickets_request(get_client: Callable[[], Client]) -> None:
+    get_client().table("users").select("role, department_id").limit(1).execute()
+    get_client().table("departments").select("name").limit(1).execute()
+    get_client().table("tickets").select("*").order("created_at", desc=True).limit(50).execute()
+
+
+def public_chat_request(get_client: Callable[[], Client]) -> None:
+    get_client().rpc(
+        "match_documents",
+        {
+            "query_embedding": [0.0] * 1536,
+            "match_count": 6,
+            "filter": {"source_type": "kazakhtelecom"}
+        }
+    ).execute()
+    get_client().table("chat_interactions").select("id").order("created_at", desc=True).limit(1).execute()
+
+
+def measure(request: Callable[[Callable[[], Client]], None], get_client: Callable[[], Client], iterations: int) -> List[float]:
+    request(get_client)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        request(get_client)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    requests = {"list_tickets": list_tickets_request, "public_chat": public_chat_request}
+    modes = {"per_call": per_call_client, "pooled": get_supabase_admin}
+
+    print(f"{'request':<14} {'client':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for request_name, request in requests.items():
+        results = {}
+        for mode_name, get_client in modes.items():
+            results[mode_name] = summarize(measure(request, get_client, args.iterations))
+            stats = results[mode_name]
+            print(f"{request_name:<14} {mode_name:<10} {stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p95']:>9.1f}")
+        saved = results["per_call"]["mean"] - results["pooled"]["mean"]
+        print(f"{request_name:<14} {'saved':<10} {saved:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
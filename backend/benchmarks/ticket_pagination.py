@@ -0,0 +1,120 @@
+"""OFFSET vs keyset pagination for the ticket list on a synthetic 1M-ticket table.
+
+Builds ``bench_pagination.tickets`` in the database at DATABASE_URL (a local Postgres
+is enough). It has the columns and composite indexes from migration 013. The script
+then times deep pages for a busy department with both strategies. The schema is
+dropped afterwards unless ``--keep`` is given.
+
+    cd backend
+    python -m benchmarks.ticket_pagination --rows 1000000 --page-size 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import asyncpg
+
+SCHEMA = "bench_pagination"
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.tickets (
+    id UUID PRIMARY KEY,
+    department_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    status TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL
+);
+INSERT INTO {SCHEMA}.tickets
+SELECT
+    md5(g::text)::uuid,
+    CASE WHEN g % 10 < 6 THEN 1 ELSE (g % 10) END,
+    (ARRAY['network', 'telephony', 'tv', 'billing', 'equipment', 'other'])[1 + g % 6],
+    (ARRAY['new', 'accepted', 'in_progress', 'resolved', 'closed'])[1 + g % 5],
+    'Synthetic ticket ' || g,
+    NOW() - (g || ' seconds')::interval
+FROM generate_series(1, $ROWS) AS g;
+CREATE INDEX ON {SCHEMA}.tickets(created_at DESC, id DESC);
+CREATE INDEX ON {SCHEMA}.tickets(department_id, created_at DESC, id DESC);
+CREATE INDEX ON {SCHEMA}.tickets(department_id, status, created_at DESC, id DESC);
+ANALYZE {SCHEMA}.tickets;
+"""
+
+OFFSET_SQL = f"""
+SELECT * FROM {SCHEMA}.tickets
+WHERE department_id = $1
+ORDER BY created_at DESC, id DESC
+LIMIT $2 OFFSET $3
+"""
+
+KEYSET_SQL = f"""
+SELECT * FROM {SCHEMA}.tickets
+WHERE department_id = $1 AND (created_at, id) < ($2, $3)
+ORDER BY created_at DESC, id DESC
+LIMIT $4
+"""
+
+CURSOR_AT_DEPTH_SQL = f"""
+SELECT created_at, id FROM {SCHEMA}.tickets
+WHERE department_id = $1
+ORDER BY created_at DESC, id DESC
+LIMIT 1 OFFSET $2
+"""
+
+
+async def timed(connection: asyncpg.Connection, sql: str, *args, repeat: int) -> float:
+    await connection.fetch(sql, *args)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await connection.fetch(sql, *args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def run(args):
+    connection = await asyncpg.connect(args.dsn)
+    try:
+        print(f"Building {args.rows} synthetic tickets in schema {SCHEMA}...")
+        start = time.perf_counter()
+        await connection.execute(SETUP_SQL.replace("$ROWS", str(int(args.rows))))
+        print(f"Setup took {time.perf_counter() - start:.1f}s")
+
+        print(f"{'depth':>10} {'offset ms':>11} {'keyset ms':>11}")
+        for depth in args.depths:
+            position = await connection.fetchrow(CURSOR_AT_DEPTH_SQL, args.department, depth)
+            if position is None:
+                break
+            offset_ms = await timed(connection, OFFSET_SQL, args.department, args.page_size, depth + 1, repeat=args.repeat)
+            keyset_ms = await timed(
+                connection, KEYSET_SQL, args.department, position["created_at"], position["id"], args.page_size,
+                repeat=args.repeat
+            )
+            print(f"{depth:>10} {offset_ms:>11.2f} {keyset_ms:>11.2f}")
+    finally:
+        if not args.keep:
+            await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--department", type=int, default=1)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1_000, 10_000, 100_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 from app.core.config import settings
 from app.api.v1 import router as api_router
-from app.core.database import init_db
+from app.core.database import init_db, close_db
+from app.core.postgres import close_pool
+from app.core.telemetry import TelemetryMiddleware, metrics_response
+from app.core.tracing import init_tracing, shutdown_tracing
+from app.core.slow_requests import SlowRequestMiddleware
+from app.services.change_feed import change_feed
+from app.tasks.event_loop_monitor import monitor_event_loop_lag
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    init_tracing()
+    loop_monitor = asyncio.create_task(monitor_event_loop_lag()) if settings.TELEMETRY_ENABLED else None
     yield
-    pass
+    if loop_monitor is not None:
+        loop_monitor.cancel()
+    await change_feed.close()
+    await close_pool()
+    await close_db()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -27,8 +41,13 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
+if settings.TELEMETRY_ENABLED:
+    app.add_middleware(TelemetryMiddleware)
+    app.add_middleware(SlowRequestMiddleware)
+
 app.include_router(api_router, prefix="/api")
 
 
@@ -42,6 +61,12 @@ async def health():
     return {"status": "healthy"}
 
 
+if settings.TELEMETRY_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return metrics_response()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -232,12 +232,12 @@ export default function AIChat({ contactInfo }: AIChatProps) {
             }))
           }
 
-          await createTicketFromChat(ticketDraftWithHistory)
+          const ticketResult = await createTicketFromChat(ticketDraftWithHistory)
           setTicketCreated(true)
 
           const ticketMessage: Message = {
             role: 'assistant',
-            content: t('support.ticketSent'),
+            content: ticketResult?.status === 'duplicate' ? t('support.ticketAttached') : t('support.ticketSent'),
             timestamp: new Date().toISOString()
           }
 
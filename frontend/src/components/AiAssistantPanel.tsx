@@ -5,11 +5,12 @@ import '../styles/AiAssistantPanel.css'
 
 interface AiAssistantPanelProps {
   ticket: any
+  initialRecommendations?: any
   onClassificationUpdate?: () => void
 }
 
-export default function AiAssistantPanel({ ticket, onClassificationUpdate }: AiAssistantPanelProps) {
-  const [recommendations, setRecommendations] = useState<any>(null)
+export default function AiAssistantPanel({ ticket, initialRecommendations, onClassificationUpdate }: AiAssistantPanelProps) {
+  const [recommendations, setRecommendations] = useState<any>(initialRecommendations || null)
   const [loading, setLoading] = useState(false)
   const [submitting, setSubmitting] = useState(false)
   const [showEditForm, setShowEditForm] = useState(false)
@@ -20,8 +21,12 @@ export default function AiAssistantPanel({ ticket, onClassificationUpdate }: AiA
   })
 
   useEffect(() => {
-    loadRecommendations()
-  }, [ticket.id])
+    if (initialRecommendations) {
+      setRecommendations(initialRecommendations)
+    } else {
+      loadRecommendations()
+    }
+  }, [ticket.id, initialRecommendations])
 
   const loadRecommendations = async () => {
     setLoading(true)
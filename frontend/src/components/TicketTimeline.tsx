@@ -4,14 +4,19 @@ import '../styles/TicketTimeline.css'
 
 interface TicketTimelineProps {
   ticketId: string
+  initialMessages?: any[]
 }
 
-export default function TicketTimeline({ ticketId }: TicketTimelineProps) {
-  const [messages, setMessages] = useState<any[]>([])
+export default function TicketTimeline({ ticketId, initialMessages }: TicketTimelineProps) {
+  const [messages, setMessages] = useState<any[]>(initialMessages || [])
 
   useEffect(() => {
-    loadMessages()
-  }, [ticketId])
+    if (initialMessages) {
+      setMessages(initialMessages)
+    } else {
+      loadMessages()
+    }
+  }, [ticketId, initialMessages])
 
   const loadMessages = async () => {
     try {
@@ -1,5 +1,6 @@
+import { useEffect } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { getTickets, deleteTicket, assignTicket, updateTicket } from '../services/api'
+import { getTickets, deleteTicket, assignTicket, updateTicket, getTicketStreamUrl } from '../services/api'
 
 export const ticketKeys = {
   all: ['tickets'] as const,
@@ -20,6 +21,51 @@ export function useTickets(filters?: any) {
   })
 }
 
+export function useTicketStream(enabled: boolean = true) {
+  const queryClient = useQueryClient()
+
+  useEffect(() => {
+    if (!enabled) return
+
+    let source: EventSource | null = null
+    let lastEventId: string | null = null
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined
+    let closed = false
+
+    const connect = async () => {
+      const url = await getTicketStreamUrl(lastEventId)
+      if (closed) return
+      source = new EventSource(url)
+
+      source.addEventListener('ticket', (event) => {
+        lastEventId = (event as MessageEvent).lastEventId || lastEventId
+        const change = JSON.parse((event as MessageEvent).data)
+        queryClient.invalidateQueries({ queryKey: ticketKeys.lists() })
+        queryClient.invalidateQueries({ queryKey: ticketKeys.detail(change.ticket_id) })
+      })
+
+      source.addEventListener('resync', () => {
+        lastEventId = null
+        queryClient.invalidateQueries({ queryKey: ticketKeys.all })
+      })
+
+      source.onerror = () => {
+        // Reconnect with a fresh token; the stream resumes from lastEventId
+        source?.close()
+        if (!closed) reconnectTimer = setTimeout(connect, 5000)
+      }
+    }
+
+    connect()
+
+    return () => {
+      closed = true
+      clearTimeout(reconnectTimer)
+      source?.close()
+    }
+  }, [enabled, queryClient])
+}
+
 export function useTicket(id: string) {
   return useQuery({
     queryKey: ticketKeys.detail(id),
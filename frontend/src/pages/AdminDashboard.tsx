@@ -1,7 +1,7 @@
 import { useState } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { useAuth } from '../contexts/AuthContext'
-import { useTickets } from '../hooks/useTickets'
+import { useTickets, useTicketStream } from '../hooks/useTickets'
 import { useMetrics } from '../hooks/useMetrics'
 import { useDepartments } from '../hooks/useDepartments'
 import { useTranslation } from 'react-i18next'
@@ -27,6 +27,7 @@ export default function AdminDashboard() {
   const [activeTab, setActiveTab] = useState<'tickets' | 'auto-resolved' | 'users' | 'departments' | 'bots' | 'monitoring' | 'settings'>('tickets')
 
   const { data: tickets = [], isLoading: ticketsLoading, refetch: refetchTickets } = useTickets()
+  useTicketStream()
   const { data: metrics, isLoading: metricsLoading } = useMetrics()
   const { data: departments = [], isLoading: departmentsLoading } = useDepartments()
 
@@ -1,6 +1,6 @@
 import { useNavigate } from 'react-router-dom'
 import { useAuth } from '../contexts/AuthContext'
-import { useTickets } from '../hooks/useTickets'
+import { useTickets, useTicketStream } from '../hooks/useTickets'
 import { useTranslation } from 'react-i18next'
 import TicketCard from '../components/TicketCard'
 import { LogOut, RefreshCw, FileText, User } from 'lucide-react'
@@ -16,6 +16,7 @@ export default function DepartmentDashboard() {
     department_id: userProfile?.department_id,
     status: 'in_progress'
   })
+  useTicketStream()
 
   const loadTickets = () => {
     refetchTickets()
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useTranslation } from 'react-i18next'
 import { MessageCircle, Phone, Mail, Globe, User, History, X } from 'lucide-react'
-import { getTicket, acceptTicket, completeRemote, getChatHistory } from '../services/api'
+import { getTicketFull, acceptTicket, completeRemote, getChatHistory } from '../services/api'
 import TicketTimeline from '../components/TicketTimeline'
 import AiAssistantPanel from '../components/AiAssistantPanel'
 import SLAClock from '../components/SLAClock'
@@ -17,6 +17,8 @@ export default function TicketDetail() {
   const [showChatHistory, setShowChatHistory] = useState(false)
   const [chatHistory, setChatHistory] = useState<any[]>([])
   const [loadingHistory, setLoadingHistory] = useState(false)
+  const [messages, setMessages] = useState<any[] | undefined>(undefined)
+  const [recommendations, setRecommendations] = useState<any>(undefined)
 
   const getSourceIcon = (source: string) => {
     switch (source) {
@@ -49,8 +51,11 @@ export default function TicketDetail() {
 
   const loadTicket = async () => {
     try {
-      const data = await getTicket(id!)
-      setTicket(data)
+      const data = await getTicketFull(id!, ['messages', 'chat_history', 'recommendations'])
+      setTicket(data.ticket)
+      setMessages(data.messages)
+      setChatHistory(data.chat_history || [])
+      setRecommendations(data.recommendations)
     } catch (error: any) {
       console.error('Failed to load ticket:', error)
       if (error?.response?.status === 403) {
@@ -82,6 +87,7 @@ export default function TicketDetail() {
 
   const handleShowChatHistory = async () => {
     setShowChatHistory(true)
+    if (chatHistory.length > 0) return
     setLoadingHistory(true)
     try {
       const history = await getChatHistory(id!)
@@ -145,7 +151,7 @@ export default function TicketDetail() {
             </div>
           </div>
 
-          <TicketTimeline ticketId={id!} />
+          <TicketTimeline ticketId={id!} initialMessages={messages} />
 
           <div className="ticket-actions">
             {(ticket.source === 'chat' || ticket.source === 'portal') && (
@@ -164,7 +170,7 @@ export default function TicketDetail() {
         </div>
 
         <div className="ticket-sidebar">
-          <AiAssistantPanel ticket={ticket} onClassificationUpdate={handleClassificationUpdate} />
+          <AiAssistantPanel ticket={ticket} initialRecommendations={recommendations} onClassificationUpdate={handleClassificationUpdate} />
         </div>
       </div>
 
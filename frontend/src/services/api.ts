@@ -38,6 +38,14 @@ export const getTickets = async (params?: any) => {
   return response.data
 }
 
+export const getTicketStreamUrl = async (lastEventId?: string | null) => {
+  const { data: { session } } = await supabase.auth.getSession()
+  const params = new URLSearchParams()
+  if (session?.access_token) params.set('token', session.access_token)
+  if (lastEventId) params.set('last_event_id', lastEventId)
+  return `${API_BASE_URL}/api/tickets/stream?${params.toString()}`
+}
+
 export const getAutoResolvedTickets = async (params?: { limit?: number; offset?: number }) => {
   const response = await api.get('/api/tickets/auto-resolved', { params })
   return response.data
@@ -68,6 +76,12 @@ export const requestOnSite = async (id: string) => {
   return response.data
 }
 
+export const getTicketFull = async (id: string, include?: string[]) => {
+  const params = include ? { include: include.join(',') } : undefined
+  const response = await api.get(`/api/tickets/${id}/full`, { params })
+  return response.data
+}
+
 export const getMessages = async (ticketId: string) => {
   const response = await api.get(`/api/tickets/${ticketId}/messages`)
   return response.data
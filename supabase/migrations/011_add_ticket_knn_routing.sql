@@ -0,0 +1,116 @@
+-- Маршрутизация тикетов по ближайшим соседям (kNN)
+-- Описание каждого нового тикета сохраняется в public.ticket_embeddings,
+-- а категория, отдел и приоритет предлагаются по меткам похожих решённых тикетов.
+-- Текст обращений клиентов хранится отдельно от базы знаний (public.embeddings):
+-- таблица закрыта RLS и доступна только service role, а в поиск по базе знаний
+-- (match_embeddings) тикеты не попадают.
+
+CREATE TABLE IF NOT EXISTS public.ticket_embeddings (
+    ticket_id UUID PRIMARY KEY REFERENCES public.tickets(id) ON DELETE CASCADE,
+    embedding vector(1536) NOT NULL,
+    text_excerpt TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE public.ticket_embeddings ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow service role full access to ticket_embeddings" ON public.ticket_embeddings
+    FOR ALL
+    USING (auth.role() = 'service_role');
+
+-- Перенос векторов тикетов, ранее записанных в общую таблицу
+INSERT INTO public.ticket_embeddings (ticket_id, embedding, text_excerpt, created_at)
+SELECT DISTINCT ON (e.source_id) e.source_id, e.embedding, e.text_excerpt, e.created_at
+FROM public.embeddings e
+JOIN public.tickets t ON t.id = e.source_id
+WHERE e.source_table = 'tickets' AND e.embedding IS NOT NULL
+ORDER BY e.source_id, e.created_at DESC
+ON CONFLICT (ticket_id) DO NOTHING;
+
+DELETE FROM public.embeddings WHERE source_table = 'tickets';
+DROP INDEX IF EXISTS idx_embeddings_tickets_embedding;
+
+-- Индекс для векторного поиска по тикетам
+CREATE INDEX IF NOT EXISTS idx_ticket_embeddings_embedding ON public.ticket_embeddings
+    USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+
+-- Поиск по базе знаний без тикетов
+CREATE OR REPLACE FUNCTION match_embeddings(
+    query_embedding vector(1536),
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 5
+)
+RETURNS TABLE (
+    id uuid,
+    source_table text,
+    source_id uuid,
+    text_excerpt text,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        e.id,
+        e.source_table,
+        e.source_id,
+        e.text_excerpt,
+        1 - (e.embedding <=> query_embedding) as similarity
+    FROM public.embeddings e
+    WHERE e.source_table <> 'tickets'
+        AND 1 - (e.embedding <=> query_embedding) > match_threshold
+    ORDER BY e.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+-- Функция для поиска похожих решённых тикетов по embedding исходного тикета
+CREATE OR REPLACE FUNCTION match_ticket_neighbours(
+    p_ticket_id uuid,
+    match_count int DEFAULT 10,
+    match_threshold float DEFAULT 0.8
+)
+RETURNS TABLE (
+    ticket_id uuid,
+    category text,
+    subcategory text,
+    department text,
+    priority text,
+    auto_resolved boolean,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    query_embedding vector(1536);
+BEGIN
+    SELECT e.embedding INTO query_embedding
+    FROM public.ticket_embeddings e
+    WHERE e.ticket_id = p_ticket_id;
+
+    IF query_embedding IS NULL THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        t.id,
+        t.category,
+        t.subcategory,
+        d.name,
+        t.priority,
+        t.auto_resolved,
+        1 - (e.embedding <=> query_embedding) AS similarity
+    FROM public.ticket_embeddings e
+    JOIN public.tickets t ON t.id = e.ticket_id
+    LEFT JOIN public.departments d ON d.id = t.department_id
+    WHERE
+        e.ticket_id <> p_ticket_id
+        AND t.status IN ('resolved', 'auto_resolved', 'closed')
+        AND t.category IS NOT NULL
+        AND 1 - (e.embedding <=> query_embedding) > match_threshold
+    ORDER BY e.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,105 @@
+-- Обнаружение дубликатов тикетов при приёме обращения
+-- Почти одинаковые обращения (например, при массовой аварии) не создают новых тикетов,
+-- а прикрепляются к уже открытому родительскому тикету.
+
+ALTER TABLE public.tickets
+ADD COLUMN IF NOT EXISTS duplicate_count INTEGER DEFAULT 0;
+
+-- Таблица прикреплённых дубликатов
+CREATE TABLE IF NOT EXISTS public.ticket_duplicates (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    parent_ticket_id UUID NOT NULL REFERENCES public.tickets(id) ON DELETE CASCADE,
+    source TEXT NOT NULL,
+    subject TEXT,
+    description TEXT NOT NULL,
+    category TEXT,
+    channel_contact TEXT,
+    source_meta JSONB DEFAULT '{}',
+    similarity FLOAT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_duplicates_parent ON public.ticket_duplicates(parent_ticket_id);
+CREATE INDEX IF NOT EXISTS idx_ticket_duplicates_created ON public.ticket_duplicates(created_at DESC);
+
+-- Индекс для выборки недавних открытых тикетов по каналу
+CREATE INDEX IF NOT EXISTS idx_tickets_source_created ON public.tickets(source, created_at DESC);
+
+ALTER TABLE public.ticket_duplicates ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow service role full access to ticket_duplicates" ON public.ticket_duplicates
+    FOR ALL
+    USING (auth.role() = 'service_role');
+
+-- Поиск открытого тикета-родителя среди недавних обращений того же канала
+-- Для того же контакта в канале используется более мягкий порог похожести.
+-- Без категории совпадение только по тексту слишком размыто: такие обращения
+-- склеиваются лишь с тикетами того же контакта
+CREATE OR REPLACE FUNCTION find_duplicate_ticket(
+    query_embedding vector(1536),
+    p_source text,
+    p_category text DEFAULT NULL,
+    p_channel_contact text DEFAULT NULL,
+    p_since timestamptz DEFAULT NOW() - INTERVAL '2 hours',
+    match_threshold float DEFAULT 0.92,
+    contact_match_threshold float DEFAULT 0.85
+)
+RETURNS TABLE (
+    ticket_id uuid,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        t.id,
+        1 - (e.embedding <=> query_embedding) AS similarity
+    FROM public.tickets t
+    JOIN public.ticket_embeddings e ON e.ticket_id = t.id
+    WHERE
+        t.source = p_source
+        AND t.created_at >= p_since
+        AND t.status IN ('new', 'accepted', 'in_progress', 'escalated', 'on_site')
+        AND CASE
+            WHEN p_channel_contact IS NOT NULL AND t.source_meta->>'channel_contact' = p_channel_contact
+                THEN (p_category IS NULL OR t.category = p_category)
+                    AND 1 - (e.embedding <=> query_embedding) > contact_match_threshold
+            ELSE p_category IS NOT NULL
+                AND t.category = p_category
+                AND 1 - (e.embedding <=> query_embedding) > match_threshold
+        END
+    ORDER BY e.embedding <=> query_embedding
+    LIMIT 1;
+END;
+$$;
+
+-- Атомарно прикрепить дубликат к родителю и увеличить счётчик
+CREATE OR REPLACE FUNCTION attach_duplicate_ticket(
+    p_parent_ticket_id uuid,
+    p_source text,
+    p_subject text,
+    p_description text,
+    p_channel_contact text,
+    p_source_meta jsonb,
+    p_similarity float
+)
+RETURNS SETOF public.tickets
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.ticket_duplicates (
+        parent_ticket_id, source, subject, description, category, channel_contact, source_meta, similarity
+    )
+    SELECT p_parent_ticket_id, p_source, p_subject, p_description, t.category, p_channel_contact, p_source_meta, p_similarity
+    FROM public.tickets t
+    WHERE t.id = p_parent_ticket_id;
+
+    RETURN QUERY
+    UPDATE public.tickets
+    SET duplicate_count = COALESCE(duplicate_count, 0) + 1,
+        updated_at = NOW()
+    WHERE id = p_parent_ticket_id
+    RETURNING *;
+END;
+$$;
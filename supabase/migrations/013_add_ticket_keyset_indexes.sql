@@ -0,0 +1,14 @@
+-- Составные индексы для курсорной (keyset) пагинации списка тикетов
+-- Порядок сортировки: created_at DESC, id DESC; фильтры дашбордов: отдел, категория, статус
+
+CREATE INDEX IF NOT EXISTS idx_tickets_created_id ON public.tickets(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_department_created_id ON public.tickets(department_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_category_created_id ON public.tickets(category, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created_id ON public.tickets(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_department_status_created_id ON public.tickets(department_id, status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_category_status_created_id ON public.tickets(category, status, created_at DESC, id DESC);
+
+-- Одноколоночные индексы покрываются составными индексами выше
+DROP INDEX IF EXISTS public.idx_tickets_created;
+DROP INDEX IF EXISTS public.idx_tickets_department;
+DROP INDEX IF EXISTS public.idx_tickets_status;
@@ -0,0 +1,18 @@
+-- Версия тикетов для условных GET (ETag / If-None-Match)
+-- ETag строится из max(updated_at) по разрезу и последнего id журнала ticket_change_log (015),
+-- поэтому updated_at должен меняться при любом UPDATE
+
+UPDATE public.tickets SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE public.tickets ALTER COLUMN updated_at SET NOT NULL;
+
+-- Функция update_updated_at_column() создана в миграции 005
+DROP TRIGGER IF EXISTS update_tickets_updated_at ON public.tickets;
+CREATE TRIGGER update_tickets_updated_at
+    BEFORE UPDATE ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Быстрый max(updated_at) для проверки версии списка: без фильтров и в разрезе отдела / категории
+CREATE INDEX IF NOT EXISTS idx_tickets_updated_at ON public.tickets(updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_department_updated_at ON public.tickets(department_id, updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_category_updated_at ON public.tickets(category, updated_at DESC);
@@ -0,0 +1,78 @@
+-- Лента изменений тикетов для дашбордов (SSE /api/tickets/stream)
+-- Каждое INSERT/UPDATE/DELETE пишется в журнал и отправляется через pg_notify;
+-- id журнала служит курсором для продолжения после переподключения (Last-Event-ID)
+-- и частью ETag списка тикетов (014): удаление тоже меняет версию
+
+CREATE TABLE IF NOT EXISTS public.ticket_change_log (
+    id BIGSERIAL PRIMARY KEY,
+    ticket_id UUID NOT NULL,
+    operation TEXT NOT NULL CHECK (operation IN ('INSERT', 'UPDATE', 'DELETE')),
+    department_id UUID,
+    category TEXT,
+    -- Прежний разрез при UPDATE: подписчики старого отдела/категории тоже получают
+    -- событие и убирают тикет, ушедший из их списка
+    old_department_id UUID,
+    old_category TEXT,
+    status TEXT,
+    priority TEXT,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Журнал мог быть создан раньше, без DELETE и прежнего разреза
+ALTER TABLE public.ticket_change_log ADD COLUMN IF NOT EXISTS old_department_id UUID;
+ALTER TABLE public.ticket_change_log ADD COLUMN IF NOT EXISTS old_category TEXT;
+ALTER TABLE public.ticket_change_log DROP CONSTRAINT IF EXISTS ticket_change_log_operation_check;
+ALTER TABLE public.ticket_change_log ADD CONSTRAINT ticket_change_log_operation_check
+    CHECK (operation IN ('INSERT', 'UPDATE', 'DELETE'));
+
+CREATE INDEX IF NOT EXISTS idx_ticket_change_log_changed_at ON public.ticket_change_log(changed_at);
+
+ALTER TABLE public.ticket_change_log ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION notify_ticket_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_change public.ticket_change_log;
+    v_ticket public.tickets;
+BEGIN
+    -- При DELETE NEW пуст: в журнал идёт удалённая строка, чтобы событие дошло до её разреза
+    IF TG_OP = 'DELETE' THEN
+        v_ticket := OLD;
+    ELSE
+        v_ticket := NEW;
+    END IF;
+
+    INSERT INTO public.ticket_change_log (
+        ticket_id, operation, department_id, category, old_department_id, old_category, status, priority
+    )
+    VALUES (
+        v_ticket.id, TG_OP, v_ticket.department_id, v_ticket.category,
+        CASE WHEN TG_OP = 'UPDATE' THEN OLD.department_id END,
+        CASE WHEN TG_OP = 'UPDATE' THEN OLD.category END,
+        v_ticket.status, v_ticket.priority
+    )
+    RETURNING * INTO v_change;
+
+    -- В уведомлении только ключевые поля: лимит payload у NOTIFY 8000 байт
+    PERFORM pg_notify('ticket_changes', json_build_object(
+        'id', v_change.id,
+        'ticket_id', v_change.ticket_id,
+        'operation', v_change.operation,
+        'department_id', v_change.department_id,
+        'category', v_change.category,
+        'old_department_id', v_change.old_department_id,
+        'old_category', v_change.old_category,
+        'status', v_change.status,
+        'priority', v_change.priority,
+        'changed_at', v_change.changed_at
+    )::text);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_tickets_change ON public.tickets;
+CREATE TRIGGER notify_tickets_change
+    AFTER INSERT OR UPDATE OR DELETE ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_ticket_change();
@@ -0,0 +1,43 @@
+-- Получение тикета вместе с проверкой прав в одном запросе
+-- Область видимости передаётся из закэшированного профиля пользователя (роль, отдел, категория инженера):
+--   admin/supervisor — все тикеты; engineer — тикеты своей категории; остальные — тикеты своего отдела
+-- 0 строк — тикет не найден (404); allowed = FALSE — нет доступа (403), сам тикет не возвращается
+-- p_version_only = TRUE возвращает только поля для ETag, не читая тяжёлые JSONB-колонки
+
+CREATE OR REPLACE FUNCTION get_scoped_ticket(
+    p_ticket_id UUID,
+    p_role TEXT,
+    p_department_id UUID DEFAULT NULL,
+    p_engineer_category TEXT DEFAULT NULL,
+    p_version_only BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+    allowed BOOLEAN,
+    ticket JSONB
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        scoped.allowed,
+        CASE
+            WHEN NOT scoped.allowed THEN NULL
+            WHEN p_version_only THEN jsonb_build_object(
+                'id', t.id,
+                'updated_at', t.updated_at,
+                'department_id', t.department_id,
+                'category', t.category
+            )
+            ELSE to_jsonb(t)
+        END AS ticket
+    FROM public.tickets t
+    CROSS JOIN LATERAL (
+        SELECT CASE
+            WHEN p_role IN ('admin', 'supervisor') THEN TRUE
+            WHEN p_role = 'engineer' THEN
+                p_engineer_category IS NULL OR lower(COALESCE(t.category, '')) = p_engineer_category
+            ELSE t.department_id IS NOT DISTINCT FROM p_department_id
+        END AS allowed
+    ) scoped
+    WHERE t.id = p_ticket_id;
+$$;
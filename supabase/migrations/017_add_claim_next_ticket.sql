@@ -0,0 +1,63 @@
+-- Очередь работы для агентов: атомарный захват следующего тикета
+-- FOR UPDATE SKIP LOCKED — параллельные вызовы никогда не получают один и тот же тикет
+-- Порядок: приоритет, затем дедлайн SLA на принятие, затем время создания
+-- В той же транзакции тикет принимается и записывается время ответа в response_times
+
+CREATE INDEX IF NOT EXISTS idx_tickets_claim_queue
+    ON public.tickets(department_id, sla_accept_deadline)
+    WHERE status = 'new' AND assigned_to IS NULL;
+
+CREATE OR REPLACE FUNCTION claim_next_ticket(
+    p_user_id UUID,
+    p_department_id UUID DEFAULT NULL,
+    p_category TEXT DEFAULT NULL
+)
+RETURNS SETOF public.tickets
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_ticket public.tickets;
+    v_now TIMESTAMPTZ := NOW();
+BEGIN
+    SELECT * INTO v_ticket
+    FROM public.tickets t
+    WHERE t.status = 'new'
+      AND t.assigned_to IS NULL
+      AND (p_department_id IS NULL OR t.department_id = p_department_id)
+      AND (p_category IS NULL OR lower(t.category) = p_category)
+    ORDER BY
+        CASE t.priority
+            WHEN 'critical' THEN 0
+            WHEN 'high' THEN 1
+            WHEN 'medium' THEN 2
+            ELSE 3
+        END,
+        t.sla_accept_deadline ASC NULLS LAST,
+        t.created_at ASC
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    UPDATE public.tickets
+    SET status = 'accepted',
+        assigned_to = p_user_id,
+        first_response_at = COALESCE(first_response_at, v_now),
+        updated_at = v_now
+    WHERE id = v_ticket.id
+    RETURNING * INTO v_ticket;
+
+    INSERT INTO public.response_times (ticket_id, first_response_at, response_time_seconds, responder_id, response_type)
+    VALUES (
+        v_ticket.id,
+        v_now,
+        GREATEST(0, EXTRACT(EPOCH FROM (v_now - v_ticket.created_at)))::INTEGER,
+        p_user_id,
+        'human'
+    );
+
+    RETURN NEXT v_ticket;
+END;
+$$;
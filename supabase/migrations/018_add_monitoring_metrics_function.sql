@@ -0,0 +1,160 @@
+-- Агрегация метрик мониторинга на стороне БД (/api/admin/monitoring/metrics)
+-- Раньше эндпоинт выгружал все строки за период и считал в Python (с O(n·m) поиском тикетов);
+-- функция возвращает только числа в формате модели MonitoringMetrics
+
+CREATE INDEX IF NOT EXISTS idx_response_times_first_response ON public.response_times(first_response_at);
+
+CREATE OR REPLACE FUNCTION monitoring_metrics(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+WITH
+feedback AS (
+    SELECT
+        COALESCE(predicted_category, 'unknown') AS category,
+        COALESCE(predicted_department, 'unknown') AS department,
+        COALESCE(is_correct, FALSE) AS is_correct
+    FROM public.classification_feedback
+    WHERE feedback_at >= p_from AND feedback_at <= p_to
+),
+interactions AS (
+    SELECT
+        ticket_created IS NOT TRUE AS auto_resolved,
+        confidence,
+        response_time_ms,
+        -- Категория из сообщения, если не заполнена (те же ключевые слова, что были в Python)
+        COALESCE(NULLIF(category, ''), CASE
+            WHEN lower(message) ~ '(тариф|цена|стоимость|оплат|биллинг)' THEN 'billing'
+            WHEN lower(message) ~ '(интернет|сеть|подключ|скорост)' THEN 'network'
+            WHEN lower(message) ~ '(телефон|звонок)' THEN 'telephony'
+            WHEN lower(message) ~ '(тв|телевизор|канал)' THEN 'tv'
+            WHEN lower(message) ~ '(роутер|модем|оборудован)' THEN 'equipment'
+            ELSE 'other'
+        END) AS category
+    FROM public.chat_interactions
+    WHERE created_at >= p_from AND created_at <= p_to
+),
+tickets_in_range AS (
+    SELECT id, source, category
+    FROM public.tickets
+    WHERE created_at >= p_from AND created_at <= p_to
+),
+ticket_response_times AS (
+    SELECT ticket_id, response_time_seconds::FLOAT8 AS seconds
+    FROM public.response_times
+    WHERE first_response_at >= p_from AND first_response_at <= p_to
+),
+all_times AS (
+    SELECT seconds FROM ticket_response_times WHERE seconds IS NOT NULL AND seconds <> 0
+    UNION ALL
+    SELECT (response_time_ms / 1000.0)::FLOAT8 FROM interactions WHERE response_time_ms IS NOT NULL
+),
+ranked_times AS (
+    SELECT seconds, row_number() OVER (ORDER BY seconds) - 1 AS idx, count(*) OVER () AS n
+    FROM all_times
+),
+routing AS (
+    SELECT re.error_type, t.id AS ticket_id, t.category
+    FROM public.routing_errors re
+    LEFT JOIN tickets_in_range t ON t.id = re.ticket_id
+    WHERE re.routed_at >= p_from AND re.routed_at <= p_to
+),
+duplicates AS (
+    SELECT parent_ticket_id, source, category
+    FROM public.ticket_duplicates
+    WHERE created_at >= p_from AND created_at <= p_to
+)
+SELECT jsonb_build_object(
+    'classification_accuracy', (
+        SELECT jsonb_build_object(
+            'total_classifications', count(*),
+            'correct_classifications', count(*) FILTER (WHERE is_correct),
+            'accuracy_percentage', CASE WHEN count(*) > 0 THEN count(*) FILTER (WHERE is_correct) * 100.0 / count(*) ELSE 0 END,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, pct)
+                FROM (SELECT category, count(*) FILTER (WHERE is_correct) * 100.0 / count(*) AS pct FROM feedback GROUP BY category) c
+            ), '{}'::jsonb),
+            'by_department', COALESCE((
+                SELECT jsonb_object_agg(department, pct)
+                FROM (SELECT department, count(*) FILTER (WHERE is_correct) * 100.0 / count(*) AS pct FROM feedback GROUP BY department) d
+            ), '{}'::jsonb)
+        )
+        FROM feedback
+    ),
+    'auto_resolve_stats', (
+        SELECT jsonb_build_object(
+            'total_auto_resolved', count(*) FILTER (WHERE auto_resolved),
+            'total_tickets', count(*),
+            'auto_resolve_rate', CASE WHEN count(*) > 0 THEN count(*) FILTER (WHERE auto_resolved) * 100.0 / count(*) ELSE 0 END,
+            'avg_confidence', COALESCE(avg(confidence) FILTER (WHERE auto_resolved AND confidence IS NOT NULL AND confidence <> 0), 0),
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT category, count(*) AS total FROM interactions WHERE auto_resolved GROUP BY category) c
+            ), '{}'::jsonb)
+        )
+        FROM interactions
+    ),
+    'response_time_stats', (
+        SELECT jsonb_build_object(
+            'avg_response_time_seconds', COALESCE(avg(seconds), 0),
+            'median_response_time_seconds', COALESCE(max(seconds) FILTER (WHERE idx = n / 2), 0),
+            'p95_response_time_seconds', COALESCE(max(seconds) FILTER (WHERE idx = floor(n * 0.95)), 0),
+            'by_source', COALESCE((
+                SELECT jsonb_object_agg(source, avg_seconds)
+                FROM (
+                    SELECT
+                        COALESCE(t.source, 'unknown') AS source,
+                        COALESCE(avg(rt.seconds) FILTER (WHERE rt.seconds IS NOT NULL AND rt.seconds <> 0), 0) AS avg_seconds
+                    FROM ticket_response_times rt
+                    JOIN tickets_in_range t ON t.id = rt.ticket_id
+                    GROUP BY 1
+                ) s
+            ), '{}'::jsonb) || COALESCE((
+                SELECT jsonb_build_object('chat', avg(response_time_ms / 1000.0))
+                FROM interactions
+                WHERE response_time_ms IS NOT NULL
+                HAVING count(*) > 0
+            ), '{}'::jsonb),
+            'by_department', '{}'::jsonb
+        )
+        FROM ranked_times
+    ),
+    'routing_error_stats', (
+        SELECT jsonb_build_object(
+            'total_routing_errors', count(*),
+            'error_rate', CASE
+                WHEN (SELECT count(*) FROM tickets_in_range) > 0
+                THEN count(*) * 100.0 / (SELECT count(*) FROM tickets_in_range)
+                ELSE 0
+            END,
+            'by_error_type', COALESCE((
+                SELECT jsonb_object_agg(error_type, total)
+                FROM (SELECT COALESCE(error_type, 'unknown') AS error_type, count(*) AS total FROM routing GROUP BY 1) e
+            ), '{}'::jsonb),
+            'by_department', '{}'::jsonb,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT COALESCE(category, 'unknown') AS category, count(*) AS total FROM routing WHERE ticket_id IS NOT NULL GROUP BY 1) c
+            ), '{}'::jsonb)
+        )
+        FROM routing
+    ),
+    'duplicate_stats', (
+        SELECT jsonb_build_object(
+            'total_merged', count(*),
+            'parent_tickets', count(DISTINCT parent_ticket_id),
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT COALESCE(category, 'unknown') AS category, count(*) AS total FROM duplicates GROUP BY 1) c
+            ), '{}'::jsonb),
+            'by_source', COALESCE((
+                SELECT jsonb_object_agg(source, total)
+                FROM (SELECT COALESCE(source, 'unknown') AS source, count(*) AS total FROM duplicates GROUP BY 1) s
+            ), '{}'::jsonb)
+        )
+        FROM duplicates
+    ),
+    'tickets_created', (SELECT count(*) FROM tickets_in_range)
+);
+$$;
@@ -0,0 +1,612 @@
+-- Часовые и дневные агрегаты KPI (/api/admin/metrics, /api/admin/monitoring/metrics)
+-- Агрегаты поддерживаются триггерами: каждая вставка/изменение/удаление строки
+-- вычитает старый вклад и добавляет новый. Эндпоинты читают агрегаты за целые
+-- дни/часы и досчитывают по сырым строкам только неполные часы на краях периода,
+-- поэтому стоимость запроса не растёт с историей.
+
+CREATE TABLE IF NOT EXISTS public.kpi_rollups (
+    period TEXT NOT NULL CHECK (period IN ('hour', 'day')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+    channel TEXT NOT NULL,
+    category TEXT NOT NULL,
+    department TEXT NOT NULL,
+    interactions BIGINT NOT NULL DEFAULT 0,
+    auto_resolved BIGINT NOT NULL DEFAULT 0,
+    auto_confidence_count BIGINT NOT NULL DEFAULT 0,
+    auto_confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    chat_response_count BIGINT NOT NULL DEFAULT 0,
+    chat_response_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tickets_created BIGINT NOT NULL DEFAULT 0,
+    tickets_closed BIGINT NOT NULL DEFAULT 0,
+    ticket_response_count BIGINT NOT NULL DEFAULT 0,
+    ticket_response_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    feedback_total BIGINT NOT NULL DEFAULT 0,
+    feedback_correct BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, bucket_start, channel, category, department)
+);
+
+ALTER TABLE public.kpi_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Вклад одной строки исходной таблицы в агрегаты
+DROP TYPE IF EXISTS public.kpi_counters CASCADE;
+CREATE TYPE public.kpi_counters AS (
+    bucket_at TIMESTAMPTZ,
+    channel TEXT,
+    category TEXT,
+    department TEXT,
+    interactions BIGINT,
+    auto_resolved BIGINT,
+    auto_confidence_count BIGINT,
+    auto_confidence_sum DOUBLE PRECISION,
+    chat_response_count BIGINT,
+    chat_response_sum DOUBLE PRECISION,
+    tickets_created BIGINT,
+    tickets_closed BIGINT,
+    ticket_response_count BIGINT,
+    ticket_response_sum DOUBLE PRECISION,
+    feedback_total BIGINT,
+    feedback_correct BIGINT
+);
+
+-- Категория обращения по ключевым словам, если классификатор её не заполнил
+CREATE OR REPLACE FUNCTION kpi_message_category(p_message TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT CASE
+    WHEN lower(p_message) ~ '(тариф|цена|стоимость|оплат|биллинг)' THEN 'billing'
+    WHEN lower(p_message) ~ '(интернет|сеть|подключ|скорост)' THEN 'network'
+    WHEN lower(p_message) ~ '(телефон|звонок)' THEN 'telephony'
+    WHEN lower(p_message) ~ '(тв|телевизор|канал)' THEN 'tv'
+    WHEN lower(p_message) ~ '(роутер|модем|оборудован)' THEN 'equipment'
+    ELSE 'other'
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_counters_of(r public.chat_interactions)
+RETURNS public.kpi_counters
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    r.created_at,
+    'chat'::TEXT,
+    COALESCE(NULLIF(r.category, ''), kpi_message_category(r.message)),
+    COALESCE(NULLIF(r.department, ''), 'unknown'),
+    1::BIGINT,
+    (r.ticket_created IS NOT TRUE)::INT::BIGINT,
+    (r.ticket_created IS NOT TRUE AND COALESCE(r.confidence, 0) <> 0)::INT::BIGINT,
+    CASE WHEN r.ticket_created IS NOT TRUE THEN COALESCE(r.confidence, 0) ELSE 0 END,
+    (r.response_time_ms IS NOT NULL)::INT::BIGINT,
+    COALESCE(r.response_time_ms / 1000.0, 0)::DOUBLE PRECISION,
+    0::BIGINT, 0::BIGINT, 0::BIGINT, 0::DOUBLE PRECISION, 0::BIGINT, 0::BIGINT;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_counters_of(r public.tickets)
+RETURNS public.kpi_counters
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    r.created_at,
+    r.source,
+    COALESCE(r.category, 'unknown'),
+    COALESCE(r.department_id::TEXT, 'unknown'),
+    0::BIGINT, 0::BIGINT, 0::BIGINT, 0::DOUBLE PRECISION, 0::BIGINT, 0::DOUBLE PRECISION,
+    1::BIGINT,
+    (r.status IN ('resolved', 'auto_resolved', 'closed'))::INT::BIGINT,
+    0::BIGINT, 0::DOUBLE PRECISION, 0::BIGINT, 0::BIGINT;
+$$;
+
+-- Разрез ответа берётся из его тикета. При смене канала/категории/отдела тикета
+-- вклады его ответов переносятся (kpi_rollup_ticket_rekey), при удалении тикета
+-- вычитаются заранее (kpi_rollup_ticket_delete)
+CREATE OR REPLACE FUNCTION kpi_counters_of(r public.response_times, t public.tickets)
+RETURNS public.kpi_counters
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    r.first_response_at,
+    t.source,
+    COALESCE(t.category, 'unknown'),
+    COALESCE(t.department_id::TEXT, 'unknown'),
+    0::BIGINT, 0::BIGINT, 0::BIGINT, 0::DOUBLE PRECISION, 0::BIGINT, 0::DOUBLE PRECISION,
+    0::BIGINT, 0::BIGINT,
+    (COALESCE(r.response_time_seconds, 0) <> 0)::INT::BIGINT,
+    COALESCE(r.response_time_seconds, 0)::DOUBLE PRECISION,
+    0::BIGINT, 0::BIGINT;
+$$;
+
+-- Без тикета вклада нет
+CREATE OR REPLACE FUNCTION kpi_counters_of(r public.response_times)
+RETURNS public.kpi_counters
+LANGUAGE sql
+STABLE
+AS $$
+SELECT (kpi_counters_of(r, t)).*
+FROM public.tickets t
+WHERE t.id = r.ticket_id;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_counters_of(r public.classification_feedback)
+RETURNS public.kpi_counters
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    r.feedback_at,
+    'unknown'::TEXT,
+    COALESCE(r.predicted_category, 'unknown'),
+    COALESCE(r.predicted_department, 'unknown'),
+    0::BIGINT, 0::BIGINT, 0::BIGINT, 0::DOUBLE PRECISION, 0::BIGINT, 0::DOUBLE PRECISION,
+    0::BIGINT, 0::BIGINT, 0::BIGINT, 0::DOUBLE PRECISION,
+    1::BIGINT,
+    COALESCE(r.is_correct, FALSE)::INT::BIGINT;
+$$;
+
+-- Сырые вклады за полуинтервал [p_from, p_to) — для краёв периода и первичного заполнения
+CREATE OR REPLACE FUNCTION kpi_raw_counters(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS SETOF public.kpi_counters
+LANGUAGE sql
+STABLE
+AS $$
+SELECT c.* FROM public.chat_interactions ci, LATERAL kpi_counters_of(ci) c
+WHERE ci.created_at >= p_from AND ci.created_at < p_to
+UNION ALL
+SELECT c.* FROM public.tickets t, LATERAL kpi_counters_of(t) c
+WHERE t.created_at >= p_from AND t.created_at < p_to
+UNION ALL
+SELECT c.* FROM public.response_times rt, LATERAL kpi_counters_of(rt) c
+WHERE rt.first_response_at >= p_from AND rt.first_response_at < p_to
+UNION ALL
+SELECT c.* FROM public.classification_feedback cf, LATERAL kpi_counters_of(cf) c
+WHERE cf.feedback_at >= p_from AND cf.feedback_at < p_to;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_rollup_apply(c public.kpi_counters, p_sign INT)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF c.bucket_at IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO public.kpi_rollups AS k (
+        period, bucket_start, channel, category, department,
+        interactions, auto_resolved, auto_confidence_count, auto_confidence_sum,
+        chat_response_count, chat_response_sum, tickets_created, tickets_closed,
+        ticket_response_count, ticket_response_sum, feedback_total, feedback_correct
+    )
+    SELECT
+        p.period, date_trunc(p.period, c.bucket_at, 'UTC'), c.channel, c.category, c.department,
+        p_sign * c.interactions, p_sign * c.auto_resolved, p_sign * c.auto_confidence_count, p_sign * c.auto_confidence_sum,
+        p_sign * c.chat_response_count, p_sign * c.chat_response_sum, p_sign * c.tickets_created, p_sign * c.tickets_closed,
+        p_sign * c.ticket_response_count, p_sign * c.ticket_response_sum, p_sign * c.feedback_total, p_sign * c.feedback_correct
+    FROM (VALUES ('hour'), ('day')) AS p(period)
+    ON CONFLICT (period, bucket_start, channel, category, department) DO UPDATE SET
+        interactions = k.interactions + EXCLUDED.interactions,
+        auto_resolved = k.auto_resolved + EXCLUDED.auto_resolved,
+        auto_confidence_count = k.auto_confidence_count + EXCLUDED.auto_confidence_count,
+        auto_confidence_sum = k.auto_confidence_sum + EXCLUDED.auto_confidence_sum,
+        chat_response_count = k.chat_response_count + EXCLUDED.chat_response_count,
+        chat_response_sum = k.chat_response_sum + EXCLUDED.chat_response_sum,
+        tickets_created = k.tickets_created + EXCLUDED.tickets_created,
+        tickets_closed = k.tickets_closed + EXCLUDED.tickets_closed,
+        ticket_response_count = k.ticket_response_count + EXCLUDED.ticket_response_count,
+        ticket_response_sum = k.ticket_response_sum + EXCLUDED.ticket_response_sum,
+        feedback_total = k.feedback_total + EXCLUDED.feedback_total,
+        feedback_correct = k.feedback_correct + EXCLUDED.feedback_correct;
+END;
+$$;
+
+-- Агрегаты меняются только триггерами. Сами триггерные функции — SECURITY DEFINER,
+-- чтобы изменения строк под ролью authenticated продолжали обновлять агрегаты
+REVOKE EXECUTE ON FUNCTION kpi_rollup_apply(public.kpi_counters, int) FROM PUBLIC, anon, authenticated;
+
+-- Триггерная функция общая: plpgsql компилирует её отдельно для каждой таблицы,
+-- поэтому kpi_counters_of(OLD/NEW) выбирает нужную перегрузку
+CREATE OR REPLACE FUNCTION kpi_rollup_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_old public.kpi_counters;
+    v_new public.kpi_counters;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        v_old := kpi_counters_of(OLD);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        v_new := kpi_counters_of(NEW);
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND v_old IS NOT DISTINCT FROM v_new THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM kpi_rollup_apply(v_old, -1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM kpi_rollup_apply(v_new, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Ответы по тикету удаляются каскадом уже после самого тикета, когда разрез
+-- (канал/категория/отдел) не восстановить, поэтому вычитаем их до удаления
+CREATE OR REPLACE FUNCTION kpi_rollup_ticket_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM kpi_rollup_apply(c, -1)
+    FROM public.response_times rt, LATERAL kpi_counters_of(rt) c
+    WHERE rt.ticket_id = OLD.id;
+    RETURN OLD;
+END;
+$$;
+
+-- Смена канала/категории/отдела тикета (в том числе SET NULL при удалении отдела)
+-- переносит вклады его ответов из старого разреза в новый
+CREATE OR REPLACE FUNCTION kpi_rollup_ticket_rekey()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM kpi_rollup_apply(kpi_counters_of(rt, OLD), -1), kpi_rollup_apply(kpi_counters_of(rt, NEW), 1)
+    FROM public.response_times rt
+    WHERE rt.ticket_id = NEW.id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS kpi_rollup_chat_interactions ON public.chat_interactions;
+CREATE TRIGGER kpi_rollup_chat_interactions
+    AFTER INSERT OR DELETE OR UPDATE OF created_at, ticket_created, confidence, response_time_ms, category, department, message
+    ON public.chat_interactions
+    FOR EACH ROW
+    EXECUTE FUNCTION kpi_rollup_trigger();
+
+DROP TRIGGER IF EXISTS kpi_rollup_tickets ON public.tickets;
+CREATE TRIGGER kpi_rollup_tickets
+    AFTER INSERT OR DELETE OR UPDATE OF created_at, source, category, department_id, status
+    ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION kpi_rollup_trigger();
+
+DROP TRIGGER IF EXISTS kpi_rollup_ticket_delete ON public.tickets;
+CREATE TRIGGER kpi_rollup_ticket_delete
+    BEFORE DELETE ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION kpi_rollup_ticket_delete();
+
+DROP TRIGGER IF EXISTS kpi_rollup_ticket_rekey ON public.tickets;
+CREATE TRIGGER kpi_rollup_ticket_rekey
+    AFTER UPDATE OF source, category, department_id ON public.tickets
+    FOR EACH ROW
+    WHEN (OLD.source IS DISTINCT FROM NEW.source
+          OR OLD.category IS DISTINCT FROM NEW.category
+          OR OLD.department_id IS DISTINCT FROM NEW.department_id)
+    EXECUTE FUNCTION kpi_rollup_ticket_rekey();
+
+DROP TRIGGER IF EXISTS kpi_rollup_response_times ON public.response_times;
+CREATE TRIGGER kpi_rollup_response_times
+    AFTER INSERT OR DELETE OR UPDATE OF ticket_id, first_response_at, response_time_seconds
+    ON public.response_times
+    FOR EACH ROW
+    EXECUTE FUNCTION kpi_rollup_trigger();
+
+DROP TRIGGER IF EXISTS kpi_rollup_classification_feedback ON public.classification_feedback;
+CREATE TRIGGER kpi_rollup_classification_feedback
+    AFTER INSERT OR DELETE OR UPDATE OF feedback_at, predicted_category, predicted_department, is_correct
+    ON public.classification_feedback
+    FOR EACH ROW
+    EXECUTE FUNCTION kpi_rollup_trigger();
+
+-- Первичное заполнение. Триггеры созданы выше в той же транзакции и держат блокировку
+-- на запись, так что строки, вставленные параллельно, не потеряются и не задвоятся
+TRUNCATE public.kpi_rollups;
+INSERT INTO public.kpi_rollups (
+    period, bucket_start, channel, category, department,
+    interactions, auto_resolved, auto_confidence_count, auto_confidence_sum,
+    chat_response_count, chat_response_sum, tickets_created, tickets_closed,
+    ticket_response_count, ticket_response_sum, feedback_total, feedback_correct
+)
+SELECT
+    p.period, date_trunc(p.period, c.bucket_at, 'UTC'), c.channel, c.category, c.department,
+    sum(c.interactions), sum(c.auto_resolved), sum(c.auto_confidence_count), sum(c.auto_confidence_sum),
+    sum(c.chat_response_count), sum(c.chat_response_sum), sum(c.tickets_created), sum(c.tickets_closed),
+    sum(c.ticket_response_count), sum(c.ticket_response_sum), sum(c.feedback_total), sum(c.feedback_correct)
+FROM kpi_raw_counters('-infinity', 'infinity') c
+CROSS JOIN (VALUES ('hour'), ('day')) AS p(period)
+WHERE c.bucket_at IS NOT NULL
+GROUP BY 1, 2, 3, 4, 5;
+
+CREATE OR REPLACE FUNCTION kpi_bucket_ceil(p_period TEXT, p_at TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT CASE
+    WHEN date_trunc(p_period, p_at, 'UTC') = p_at THEN p_at
+    ELSE date_trunc(p_period, p_at, 'UTC') + ('1 ' || p_period)::INTERVAL
+END;
+$$;
+
+-- Сводка KPI за [p_from, p_to] по разрезам канал/категория/отдел:
+-- целые дни из дневных агрегатов, целые часы на краях из часовых, остаток — из сырых строк
+CREATE OR REPLACE FUNCTION kpi_summary(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS TABLE (
+    channel TEXT,
+    category TEXT,
+    department TEXT,
+    interactions BIGINT,
+    auto_resolved BIGINT,
+    auto_confidence_count BIGINT,
+    auto_confidence_sum DOUBLE PRECISION,
+    chat_response_count BIGINT,
+    chat_response_sum DOUBLE PRECISION,
+    tickets_created BIGINT,
+    tickets_closed BIGINT,
+    ticket_response_count BIGINT,
+    ticket_response_sum DOUBLE PRECISION,
+    feedback_total BIGINT,
+    feedback_correct BIGINT
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_to TIMESTAMPTZ := p_to + INTERVAL '1 microsecond';
+    v_hour_from TIMESTAMPTZ := kpi_bucket_ceil('hour', p_from);
+    v_hour_to TIMESTAMPTZ := date_trunc('hour', v_to, 'UTC');
+    v_day_from TIMESTAMPTZ := kpi_bucket_ceil('day', p_from);
+    v_day_to TIMESTAMPTZ := date_trunc('day', v_to, 'UTC');
+BEGIN
+    IF v_hour_from >= v_hour_to THEN
+        v_hour_from := v_to;
+        v_hour_to := v_to;
+    END IF;
+    IF v_day_from >= v_day_to THEN
+        v_day_from := v_hour_to;
+        v_day_to := v_hour_to;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        s.channel, s.category, s.department,
+        sum(s.interactions)::BIGINT, sum(s.auto_resolved)::BIGINT,
+        sum(s.auto_confidence_count)::BIGINT, sum(s.auto_confidence_sum)::DOUBLE PRECISION,
+        sum(s.chat_response_count)::BIGINT, sum(s.chat_response_sum)::DOUBLE PRECISION,
+        sum(s.tickets_created)::BIGINT, sum(s.tickets_closed)::BIGINT,
+        sum(s.ticket_response_count)::BIGINT, sum(s.ticket_response_sum)::DOUBLE PRECISION,
+        sum(s.feedback_total)::BIGINT, sum(s.feedback_correct)::BIGINT
+    FROM (
+        SELECT
+            k.channel, k.category, k.department,
+            k.interactions, k.auto_resolved, k.auto_confidence_count, k.auto_confidence_sum,
+            k.chat_response_count, k.chat_response_sum, k.tickets_created, k.tickets_closed,
+            k.ticket_response_count, k.ticket_response_sum, k.feedback_total, k.feedback_correct
+        FROM public.kpi_rollups k
+        WHERE (k.period = 'day' AND k.bucket_start >= v_day_from AND k.bucket_start < v_day_to)
+           OR (k.period = 'hour' AND k.bucket_start >= v_hour_from AND k.bucket_start < v_day_from)
+           OR (k.period = 'hour' AND k.bucket_start >= v_day_to AND k.bucket_start < v_hour_to)
+        UNION ALL
+        SELECT
+            r.channel, r.category, r.department,
+            r.interactions, r.auto_resolved, r.auto_confidence_count, r.auto_confidence_sum,
+            r.chat_response_count, r.chat_response_sum, r.tickets_created, r.tickets_closed,
+            r.ticket_response_count, r.ticket_response_sum, r.feedback_total, r.feedback_correct
+        FROM kpi_raw_counters(p_from, v_hour_from) r
+        UNION ALL
+        SELECT
+            r.channel, r.category, r.department,
+            r.interactions, r.auto_resolved, r.auto_confidence_count, r.auto_confidence_sum,
+            r.chat_response_count, r.chat_response_sum, r.tickets_created, r.tickets_closed,
+            r.ticket_response_count, r.ticket_response_sum, r.feedback_total, r.feedback_correct
+        FROM kpi_raw_counters(v_hour_to, v_to) r
+    ) s
+    GROUP BY s.channel, s.category, s.department;
+END;
+$$;
+
+-- Итоги за период одной строкой: суммирование на стороне БД, а не по строкам
+-- kpi_summary в приложении (PostgREST обрезает ответ до max-rows)
+CREATE OR REPLACE FUNCTION kpi_totals(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS TABLE (
+    interactions BIGINT,
+    auto_resolved BIGINT,
+    auto_confidence_count BIGINT,
+    auto_confidence_sum DOUBLE PRECISION,
+    chat_response_count BIGINT,
+    chat_response_sum DOUBLE PRECISION,
+    tickets_created BIGINT,
+    tickets_closed BIGINT,
+    ticket_response_count BIGINT,
+    ticket_response_sum DOUBLE PRECISION,
+    feedback_total BIGINT,
+    feedback_correct BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+    COALESCE(sum(s.interactions), 0)::BIGINT,
+    COALESCE(sum(s.auto_resolved), 0)::BIGINT,
+    COALESCE(sum(s.auto_confidence_count), 0)::BIGINT,
+    COALESCE(sum(s.auto_confidence_sum), 0)::DOUBLE PRECISION,
+    COALESCE(sum(s.chat_response_count), 0)::BIGINT,
+    COALESCE(sum(s.chat_response_sum), 0)::DOUBLE PRECISION,
+    COALESCE(sum(s.tickets_created), 0)::BIGINT,
+    COALESCE(sum(s.tickets_closed), 0)::BIGINT,
+    COALESCE(sum(s.ticket_response_count), 0)::BIGINT,
+    COALESCE(sum(s.ticket_response_sum), 0)::DOUBLE PRECISION,
+    COALESCE(sum(s.feedback_total), 0)::BIGINT,
+    COALESCE(sum(s.feedback_correct), 0)::BIGINT
+FROM kpi_summary(p_from, p_to) s;
+$$;
+
+-- Метрики мониторинга: счётчики и средние из kpi_summary;
+-- медиана/p95 и разбивки ошибок маршрутизации/дубликатов пока по сырым строкам
+CREATE OR REPLACE FUNCTION monitoring_metrics(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+WITH
+summary AS (
+    SELECT * FROM kpi_summary(p_from, p_to)
+),
+totals AS (
+    SELECT
+        COALESCE(sum(interactions), 0) AS interactions,
+        COALESCE(sum(auto_resolved), 0) AS auto_resolved,
+        COALESCE(sum(auto_confidence_count), 0) AS auto_confidence_count,
+        COALESCE(sum(auto_confidence_sum), 0) AS auto_confidence_sum,
+        COALESCE(sum(chat_response_count), 0) AS chat_response_count,
+        COALESCE(sum(chat_response_sum), 0) AS chat_response_sum,
+        COALESCE(sum(tickets_created), 0) AS tickets_created,
+        COALESCE(sum(ticket_response_count), 0) AS ticket_response_count,
+        COALESCE(sum(ticket_response_sum), 0) AS ticket_response_sum,
+        COALESCE(sum(feedback_total), 0) AS feedback_total,
+        COALESCE(sum(feedback_correct), 0) AS feedback_correct
+    FROM summary
+),
+all_times AS (
+    SELECT response_time_seconds::FLOAT8 AS seconds
+    FROM public.response_times
+    WHERE first_response_at >= p_from AND first_response_at <= p_to
+      AND response_time_seconds IS NOT NULL AND response_time_seconds <> 0
+    UNION ALL
+    SELECT (response_time_ms / 1000.0)::FLOAT8
+    FROM public.chat_interactions
+    WHERE created_at >= p_from AND created_at <= p_to AND response_time_ms IS NOT NULL
+),
+ranked_times AS (
+    SELECT seconds, row_number() OVER (ORDER BY seconds) - 1 AS idx, count(*) OVER () AS n
+    FROM all_times
+),
+-- Как в 018: разбивка по категориям только по тикетам, созданным в периоде
+routing AS (
+    SELECT re.error_type, t.id AS ticket_id, t.category
+    FROM public.routing_errors re
+    LEFT JOIN public.tickets t ON t.id = re.ticket_id AND t.created_at >= p_from AND t.created_at <= p_to
+    WHERE re.routed_at >= p_from AND re.routed_at <= p_to
+),
+duplicates AS (
+    SELECT parent_ticket_id, source, category
+    FROM public.ticket_duplicates
+    WHERE created_at >= p_from AND created_at <= p_to
+)
+SELECT jsonb_build_object(
+    'classification_accuracy', (
+        SELECT jsonb_build_object(
+            'total_classifications', feedback_total,
+            'correct_classifications', feedback_correct,
+            'accuracy_percentage', CASE WHEN feedback_total > 0 THEN feedback_correct * 100.0 / feedback_total ELSE 0 END,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, pct)
+                FROM (
+                    SELECT category, sum(feedback_correct) * 100.0 / sum(feedback_total) AS pct
+                    FROM summary GROUP BY category HAVING sum(feedback_total) > 0
+                ) c
+            ), '{}'::jsonb),
+            'by_department', COALESCE((
+                SELECT jsonb_object_agg(department, pct)
+                FROM (
+                    SELECT department, sum(feedback_correct) * 100.0 / sum(feedback_total) AS pct
+                    FROM summary GROUP BY department HAVING sum(feedback_total) > 0
+                ) d
+            ), '{}'::jsonb)
+        )
+        FROM totals
+    ),
+    'auto_resolve_stats', (
+        SELECT jsonb_build_object(
+            'total_auto_resolved', auto_resolved,
+            'total_tickets', interactions,
+            'auto_resolve_rate', CASE WHEN interactions > 0 THEN auto_resolved * 100.0 / interactions ELSE 0 END,
+            'avg_confidence', CASE WHEN auto_confidence_count > 0 THEN auto_confidence_sum / auto_confidence_count ELSE 0 END,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT category, sum(auto_resolved) AS total FROM summary GROUP BY category HAVING sum(auto_resolved) > 0) c
+            ), '{}'::jsonb)
+        )
+        FROM totals
+    ),
+    'response_time_stats', (
+        SELECT jsonb_build_object(
+            'avg_response_time_seconds', CASE
+                WHEN ticket_response_count + chat_response_count > 0
+                THEN (ticket_response_sum + chat_response_sum) / (ticket_response_count + chat_response_count)
+                ELSE 0
+            END,
+            'median_response_time_seconds', COALESCE((SELECT max(seconds) FILTER (WHERE idx = n / 2) FROM ranked_times), 0),
+            'p95_response_time_seconds', COALESCE((SELECT max(seconds) FILTER (WHERE idx = floor(n * 0.95)) FROM ranked_times), 0),
+            -- В отличие от 018, учитываются все ответы периода, а не только по тикетам,
+            -- созданным в нём: агрегаты привязаны ко времени ответа, как и общее среднее
+            'by_source', COALESCE((
+                SELECT jsonb_object_agg(channel, avg_seconds)
+                FROM (
+                    SELECT channel, sum(ticket_response_sum) / sum(ticket_response_count) AS avg_seconds
+                    FROM summary GROUP BY channel HAVING sum(ticket_response_count) > 0
+                ) s
+            ), '{}'::jsonb) || CASE
+                WHEN chat_response_count > 0 THEN jsonb_build_object('chat', chat_response_sum / chat_response_count)
+                ELSE '{}'::jsonb
+            END,
+            'by_department', '{}'::jsonb
+        )
+        FROM totals
+    ),
+    'routing_error_stats', (
+        SELECT jsonb_build_object(
+            'total_routing_errors', count(*),
+            'error_rate', CASE
+                WHEN (SELECT tickets_created FROM totals) > 0
+                THEN count(*) * 100.0 / (SELECT tickets_created FROM totals)
+                ELSE 0
+            END,
+            'by_error_type', COALESCE((
+                SELECT jsonb_object_agg(error_type, total)
+                FROM (SELECT COALESCE(error_type, 'unknown') AS error_type, count(*) AS total FROM routing GROUP BY 1) e
+            ), '{}'::jsonb),
+            'by_department', '{}'::jsonb,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT COALESCE(category, 'unknown') AS category, count(*) AS total FROM routing WHERE ticket_id IS NOT NULL GROUP BY 1) c
+            ), '{}'::jsonb)
+        )
+        FROM routing
+    ),
+    'duplicate_stats', (
+        SELECT jsonb_build_object(
+            'total_merged', count(*),
+            'parent_tickets', count(DISTINCT parent_ticket_id),
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT COALESCE(category, 'unknown') AS category, count(*) AS total FROM duplicates GROUP BY 1) c
+            ), '{}'::jsonb),
+            'by_source', COALESCE((
+                SELECT jsonb_object_agg(source, total)
+                FROM (SELECT COALESCE(source, 'unknown') AS source, count(*) AS total FROM duplicates GROUP BY 1) s
+            ), '{}'::jsonb)
+        )
+        FROM duplicates
+    ),
+    'tickets_created', (SELECT tickets_created FROM totals)
+);
+$$;
@@ -0,0 +1,508 @@
+-- Скетчи задержек для медианы/p95 в /api/admin/monitoring/metrics
+-- Раньше перцентили считались сортировкой всех времён ответа за период.
+-- Теперь на каждый час/день и источник хранится лог-гистограмма (как в DDSketch):
+-- корзина i покрывает (1мс·γ^(i-2), 1мс·γ^(i-1)], γ = 1.01/0.99, что даёт относительную
+-- погрешность квантиля не больше 1%. Скетчи складываются поэлементно, поэтому любой
+-- период собирается из дневных/часовых скетчей плюс сырые строки неполных часов на краях.
+
+-- Границы частей периода [p_from, p_to]: целые дни [day_from, day_to),
+-- целые часы [hour_from, day_from) и [day_to, hour_to), сырые строки в остатке до range_to
+CREATE OR REPLACE FUNCTION kpi_range_bounds(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS TABLE (
+    hour_from TIMESTAMPTZ,
+    day_from TIMESTAMPTZ,
+    day_to TIMESTAMPTZ,
+    hour_to TIMESTAMPTZ,
+    range_to TIMESTAMPTZ
+)
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+    v_to TIMESTAMPTZ := p_to + INTERVAL '1 microsecond';
+BEGIN
+    range_to := v_to;
+    hour_from := kpi_bucket_ceil('hour', p_from);
+    hour_to := date_trunc('hour', v_to, 'UTC');
+    day_from := kpi_bucket_ceil('day', p_from);
+    day_to := date_trunc('day', v_to, 'UTC');
+
+    IF hour_from >= hour_to THEN
+        hour_from := v_to;
+        hour_to := v_to;
+    END IF;
+    IF day_from >= day_to THEN
+        day_from := hour_to;
+        day_to := hour_to;
+    END IF;
+    RETURN NEXT;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_summary(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS TABLE (
+    channel TEXT,
+    category TEXT,
+    department TEXT,
+    interactions BIGINT,
+    auto_resolved BIGINT,
+    auto_confidence_count BIGINT,
+    auto_confidence_sum DOUBLE PRECISION,
+    chat_response_count BIGINT,
+    chat_response_sum DOUBLE PRECISION,
+    tickets_created BIGINT,
+    tickets_closed BIGINT,
+    ticket_response_count BIGINT,
+    ticket_response_sum DOUBLE PRECISION,
+    feedback_total BIGINT,
+    feedback_correct BIGINT
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    b RECORD;
+BEGIN
+    SELECT * INTO b FROM kpi_range_bounds(p_from, p_to);
+
+    RETURN QUERY
+    SELECT
+        s.channel, s.category, s.department,
+        sum(s.interactions)::BIGINT, sum(s.auto_resolved)::BIGINT,
+        sum(s.auto_confidence_count)::BIGINT, sum(s.auto_confidence_sum)::DOUBLE PRECISION,
+        sum(s.chat_response_count)::BIGINT, sum(s.chat_response_sum)::DOUBLE PRECISION,
+        sum(s.tickets_created)::BIGINT, sum(s.tickets_closed)::BIGINT,
+        sum(s.ticket_response_count)::BIGINT, sum(s.ticket_response_sum)::DOUBLE PRECISION,
+        sum(s.feedback_total)::BIGINT, sum(s.feedback_correct)::BIGINT
+    FROM (
+        SELECT
+            k.channel, k.category, k.department,
+            k.interactions, k.auto_resolved, k.auto_confidence_count, k.auto_confidence_sum,
+            k.chat_response_count, k.chat_response_sum, k.tickets_created, k.tickets_closed,
+            k.ticket_response_count, k.ticket_response_sum, k.feedback_total, k.feedback_correct
+        FROM public.kpi_rollups k
+        WHERE (k.period = 'day' AND k.bucket_start >= b.day_from AND k.bucket_start < b.day_to)
+           OR (k.period = 'hour' AND k.bucket_start >= b.hour_from AND k.bucket_start < b.day_from)
+           OR (k.period = 'hour' AND k.bucket_start >= b.day_to AND k.bucket_start < b.hour_to)
+        UNION ALL
+        SELECT
+            r.channel, r.category, r.department,
+            r.interactions, r.auto_resolved, r.auto_confidence_count, r.auto_confidence_sum,
+            r.chat_response_count, r.chat_response_sum, r.tickets_created, r.tickets_closed,
+            r.ticket_response_count, r.ticket_response_sum, r.feedback_total, r.feedback_correct
+        FROM kpi_raw_counters(p_from, b.hour_from) r
+        UNION ALL
+        SELECT
+            r.channel, r.category, r.department,
+            r.interactions, r.auto_resolved, r.auto_confidence_count, r.auto_confidence_sum,
+            r.chat_response_count, r.chat_response_sum, r.tickets_created, r.tickets_closed,
+            r.ticket_response_count, r.ticket_response_sum, r.feedback_total, r.feedback_correct
+        FROM kpi_raw_counters(b.hour_to, b.range_to) r
+    ) s
+    GROUP BY s.channel, s.category, s.department;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS public.latency_sketches (
+    period TEXT NOT NULL CHECK (period IN ('hour', 'day')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+    source TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    bins INTEGER[] NOT NULL DEFAULT '{}',
+    PRIMARY KEY (period, bucket_start, source)
+);
+
+ALTER TABLE public.latency_sketches ENABLE ROW LEVEL SECURITY;
+
+DROP TYPE IF EXISTS public.latency_sample CASCADE;
+CREATE TYPE public.latency_sample AS (
+    bucket_at TIMESTAMPTZ,
+    source TEXT,
+    seconds DOUBLE PRECISION
+);
+
+CREATE OR REPLACE FUNCTION latency_sketch_bin(p_seconds DOUBLE PRECISION)
+RETURNS INT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT CASE
+    WHEN p_seconds <= 0.001 THEN 1
+    ELSE 1 + ceil(ln(p_seconds / 0.001) / ln(1.01 / 0.99))::INT
+END;
+$$;
+
+-- Представитель корзины: середина по относительной погрешности
+CREATE OR REPLACE FUNCTION latency_sketch_value(p_bin INT)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT CASE
+    WHEN p_bin <= 1 THEN 0.001
+    ELSE 0.001 * 2 * power(1.01 / 0.99, p_bin - 1) / (1.01 / 0.99 + 1)
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION latency_sample_of(r public.chat_interactions)
+RETURNS public.latency_sample
+LANGUAGE sql
+STABLE
+AS $$
+SELECT r.created_at, 'chat'::TEXT, (r.response_time_ms / 1000.0)::DOUBLE PRECISION;
+$$;
+
+-- Нулевые времена ответа по тикетам не учитываются, как и раньше.
+-- Источник берётся из тикета; при его смене скетчи переносятся (latency_sketch_ticket_rekey)
+CREATE OR REPLACE FUNCTION latency_sample_of(r public.response_times, t public.tickets)
+RETURNS public.latency_sample
+LANGUAGE sql
+STABLE
+AS $$
+SELECT r.first_response_at, t.source, NULLIF(r.response_time_seconds, 0)::DOUBLE PRECISION;
+$$;
+
+CREATE OR REPLACE FUNCTION latency_sample_of(r public.response_times)
+RETURNS public.latency_sample
+LANGUAGE sql
+STABLE
+AS $$
+SELECT (latency_sample_of(r, t)).*
+FROM public.tickets t
+WHERE t.id = r.ticket_id;
+$$;
+
+CREATE OR REPLACE FUNCTION latency_raw_samples(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS SETOF public.latency_sample
+LANGUAGE sql
+STABLE
+AS $$
+SELECT s.* FROM public.chat_interactions ci, LATERAL latency_sample_of(ci) s
+WHERE ci.created_at >= p_from AND ci.created_at < p_to AND s.seconds IS NOT NULL
+UNION ALL
+SELECT s.* FROM public.response_times rt, LATERAL latency_sample_of(rt) s
+WHERE rt.first_response_at >= p_from AND rt.first_response_at < p_to AND s.seconds IS NOT NULL;
+$$;
+
+CREATE OR REPLACE FUNCTION latency_sketch_apply(s public.latency_sample, p_sign INT)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_bin INT;
+BEGIN
+    IF s.bucket_at IS NULL OR s.seconds IS NULL THEN
+        RETURN;
+    END IF;
+    v_bin := latency_sketch_bin(s.seconds);
+
+    INSERT INTO public.latency_sketches AS l (period, bucket_start, source, count, bins)
+    SELECT p.period, date_trunc(p.period, s.bucket_at, 'UTC'), s.source, p_sign, array_fill(0, ARRAY[v_bin - 1]) || p_sign
+    FROM (VALUES ('hour'), ('day')) AS p(period)
+    ON CONFLICT (period, bucket_start, source) DO UPDATE SET
+        count = l.count + EXCLUDED.count,
+        bins[v_bin] = COALESCE(l.bins[v_bin], 0) + p_sign;
+END;
+$$;
+
+-- Как и kpi_rollup_apply: вызывается только из триггеров (SECURITY DEFINER)
+REVOKE EXECUTE ON FUNCTION latency_sketch_apply(public.latency_sample, int) FROM PUBLIC, anon, authenticated;
+
+CREATE OR REPLACE FUNCTION latency_sketch_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_old public.latency_sample;
+    v_new public.latency_sample;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        v_old := latency_sample_of(OLD);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        v_new := latency_sample_of(NEW);
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND v_old IS NOT DISTINCT FROM v_new THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM latency_sketch_apply(v_old, -1);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM latency_sketch_apply(v_new, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Как и для kpi_rollups: ответы по удаляемому тикету вычитаются до каскада
+CREATE OR REPLACE FUNCTION latency_sketch_ticket_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM latency_sketch_apply(s, -1)
+    FROM public.response_times rt, LATERAL latency_sample_of(rt) s
+    WHERE rt.ticket_id = OLD.id;
+    RETURN OLD;
+END;
+$$;
+
+-- Смена источника тикета переносит его ответы в скетч нового источника
+CREATE OR REPLACE FUNCTION latency_sketch_ticket_rekey()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM latency_sketch_apply(latency_sample_of(rt, OLD), -1), latency_sketch_apply(latency_sample_of(rt, NEW), 1)
+    FROM public.response_times rt
+    WHERE rt.ticket_id = NEW.id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS latency_sketch_chat_interactions ON public.chat_interactions;
+CREATE TRIGGER latency_sketch_chat_interactions
+    AFTER INSERT OR DELETE OR UPDATE OF created_at, response_time_ms
+    ON public.chat_interactions
+    FOR EACH ROW
+    EXECUTE FUNCTION latency_sketch_trigger();
+
+DROP TRIGGER IF EXISTS latency_sketch_response_times ON public.response_times;
+CREATE TRIGGER latency_sketch_response_times
+    AFTER INSERT OR DELETE OR UPDATE OF ticket_id, first_response_at, response_time_seconds
+    ON public.response_times
+    FOR EACH ROW
+    EXECUTE FUNCTION latency_sketch_trigger();
+
+DROP TRIGGER IF EXISTS latency_sketch_ticket_delete ON public.tickets;
+CREATE TRIGGER latency_sketch_ticket_delete
+    BEFORE DELETE ON public.tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION latency_sketch_ticket_delete();
+
+DROP TRIGGER IF EXISTS latency_sketch_ticket_rekey ON public.tickets;
+CREATE TRIGGER latency_sketch_ticket_rekey
+    AFTER UPDATE OF source ON public.tickets
+    FOR EACH ROW
+    WHEN (OLD.source IS DISTINCT FROM NEW.source)
+    EXECUTE FUNCTION latency_sketch_ticket_rekey();
+
+-- Первичное заполнение (триггеры уже держат блокировку на запись, см. 019)
+TRUNCATE public.latency_sketches;
+DO $$
+BEGIN
+    PERFORM latency_sketch_apply(s, 1) FROM latency_raw_samples('-infinity', 'infinity') s;
+END;
+$$;
+
+-- Объединённая гистограмма за [p_from, p_to]: (корзина, число значений)
+CREATE OR REPLACE FUNCTION latency_histogram(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ, p_source TEXT DEFAULT NULL)
+RETURNS TABLE (bin INT, count BIGINT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    b RECORD;
+BEGIN
+    SELECT * INTO b FROM kpi_range_bounds(p_from, p_to);
+
+    RETURN QUERY
+    SELECT h.bin, sum(h.count)::BIGINT
+    FROM (
+        SELECT u.bin::INT AS bin, u.count::BIGINT AS count
+        FROM public.latency_sketches l, unnest(l.bins) WITH ORDINALITY AS u(count, bin)
+        WHERE (p_source IS NULL OR l.source = p_source)
+          AND ((l.period = 'day' AND l.bucket_start >= b.day_from AND l.bucket_start < b.day_to)
+            OR (l.period = 'hour' AND l.bucket_start >= b.hour_from AND l.bucket_start < b.day_from)
+            OR (l.period = 'hour' AND l.bucket_start >= b.day_to AND l.bucket_start < b.hour_to))
+        UNION ALL
+        SELECT latency_sketch_bin(s.seconds), 1::BIGINT
+        FROM latency_raw_samples(p_from, b.hour_from) s
+        WHERE p_source IS NULL OR s.source = p_source
+        UNION ALL
+        SELECT latency_sketch_bin(s.seconds), 1::BIGINT
+        FROM latency_raw_samples(b.hour_to, b.range_to) s
+        WHERE p_source IS NULL OR s.source = p_source
+    ) h
+    GROUP BY h.bin
+    HAVING sum(h.count) > 0;
+END;
+$$;
+
+-- Квантили с той же индексацией, что была при сортировке списка: значение с номером floor(n·q),
+-- но не дальше последнего (иначе q = 1.0 давал 0 вместо максимума)
+CREATE OR REPLACE FUNCTION latency_quantiles(
+    p_from TIMESTAMPTZ,
+    p_to TIMESTAMPTZ,
+    p_quantiles DOUBLE PRECISION[],
+    p_source TEXT DEFAULT NULL
+)
+RETURNS DOUBLE PRECISION[]
+LANGUAGE sql
+STABLE
+AS $$
+WITH cumulative AS (
+    SELECT bin, sum(count) OVER (ORDER BY bin) AS running, sum(count) OVER () AS n
+    FROM latency_histogram(p_from, p_to, p_source)
+)
+SELECT array_agg(
+    COALESCE((
+        SELECT latency_sketch_value(min(c.bin))
+        FROM cumulative c
+        WHERE c.running > LEAST(floor(c.n * q.quantile), c.n - 1)
+    ), 0)
+    ORDER BY q.position
+)
+FROM unnest(p_quantiles) WITH ORDINALITY AS q(quantile, position);
+$$;
+
+-- Метрики мониторинга: медиана/p95 теперь из скетчей
+CREATE OR REPLACE FUNCTION monitoring_metrics(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+WITH
+summary AS (
+    SELECT * FROM kpi_summary(p_from, p_to)
+),
+totals AS (
+    SELECT
+        COALESCE(sum(interactions), 0) AS interactions,
+        COALESCE(sum(auto_resolved), 0) AS auto_resolved,
+        COALESCE(sum(auto_confidence_count), 0) AS auto_confidence_count,
+        COALESCE(sum(auto_confidence_sum), 0) AS auto_confidence_sum,
+        COALESCE(sum(chat_response_count), 0) AS chat_response_count,
+        COALESCE(sum(chat_response_sum), 0) AS chat_response_sum,
+        COALESCE(sum(tickets_created), 0) AS tickets_created,
+        COALESCE(sum(ticket_response_count), 0) AS ticket_response_count,
+        COALESCE(sum(ticket_response_sum), 0) AS ticket_response_sum,
+        COALESCE(sum(feedback_total), 0) AS feedback_total,
+        COALESCE(sum(feedback_correct), 0) AS feedback_correct
+    FROM summary
+),
+quantiles AS (
+    SELECT latency_quantiles(p_from, p_to, ARRAY[0.5, 0.95]) AS seconds
+),
+-- Как в 018: разбивка по категориям только по тикетам, созданным в периоде
+routing AS (
+    SELECT re.error_type, t.id AS ticket_id, t.category
+    FROM public.routing_errors re
+    LEFT JOIN public.tickets t ON t.id = re.ticket_id AND t.created_at >= p_from AND t.created_at <= p_to
+    WHERE re.routed_at >= p_from AND re.routed_at <= p_to
+),
+duplicates AS (
+    SELECT parent_ticket_id, source, category
+    FROM public.ticket_duplicates
+    WHERE created_at >= p_from AND created_at <= p_to
+)
+SELECT jsonb_build_object(
+    'classification_accuracy', (
+        SELECT jsonb_build_object(
+            'total_classifications', feedback_total,
+            'correct_classifications', feedback_correct,
+            'accuracy_percentage', CASE WHEN feedback_total > 0 THEN feedback_correct * 100.0 / feedback_total ELSE 0 END,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, pct)
+                FROM (
+                    SELECT category, sum(feedback_correct) * 100.0 / sum(feedback_total) AS pct
+                    FROM summary GROUP BY category HAVING sum(feedback_total) > 0
+                ) c
+            ), '{}'::jsonb),
+            'by_department', COALESCE((
+                SELECT jsonb_object_agg(department, pct)
+                FROM (
+                    SELECT department, sum(feedback_correct) * 100.0 / sum(feedback_total) AS pct
+                    FROM summary GROUP BY department HAVING sum(feedback_total) > 0
+                ) d
+            ), '{}'::jsonb)
+        )
+        FROM totals
+    ),
+    'auto_resolve_stats', (
+        SELECT jsonb_build_object(
+            'total_auto_resolved', auto_resolved,
+            'total_tickets', interactions,
+            'auto_resolve_rate', CASE WHEN interactions > 0 THEN auto_resolved * 100.0 / interactions ELSE 0 END,
+            'avg_confidence', CASE WHEN auto_confidence_count > 0 THEN auto_confidence_sum / auto_confidence_count ELSE 0 END,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT category, sum(auto_resolved) AS total FROM summary GROUP BY category HAVING sum(auto_resolved) > 0) c
+            ), '{}'::jsonb)
+        )
+        FROM totals
+    ),
+    'response_time_stats', (
+        SELECT jsonb_build_object(
+            'avg_response_time_seconds', CASE
+                WHEN ticket_response_count + chat_response_count > 0
+                THEN (ticket_response_sum + chat_response_sum) / (ticket_response_count + chat_response_count)
+                ELSE 0
+            END,
+            'median_response_time_seconds', (SELECT seconds[1] FROM quantiles),
+            'p95_response_time_seconds', (SELECT seconds[2] FROM quantiles),
+            -- В отличие от 018, учитываются все ответы периода, а не только по тикетам,
+            -- созданным в нём: агрегаты привязаны ко времени ответа, как и общее среднее
+            'by_source', COALESCE((
+                SELECT jsonb_object_agg(channel, avg_seconds)
+                FROM (
+                    SELECT channel, sum(ticket_response_sum) / sum(ticket_response_count) AS avg_seconds
+                    FROM summary GROUP BY channel HAVING sum(ticket_response_count) > 0
+                ) s
+            ), '{}'::jsonb) || CASE
+                WHEN chat_response_count > 0 THEN jsonb_build_object('chat', chat_response_sum / chat_response_count)
+                ELSE '{}'::jsonb
+            END,
+            'by_department', '{}'::jsonb
+        )
+        FROM totals
+    ),
+    'routing_error_stats', (
+        SELECT jsonb_build_object(
+            'total_routing_errors', count(*),
+            'error_rate', CASE
+                WHEN (SELECT tickets_created FROM totals) > 0
+                THEN count(*) * 100.0 / (SELECT tickets_created FROM totals)
+                ELSE 0
+            END,
+            'by_error_type', COALESCE((
+                SELECT jsonb_object_agg(error_type, total)
+                FROM (SELECT COALESCE(error_type, 'unknown') AS error_type, count(*) AS total FROM routing GROUP BY 1) e
+            ), '{}'::jsonb),
+            'by_department', '{}'::jsonb,
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT COALESCE(category, 'unknown') AS category, count(*) AS total FROM routing WHERE ticket_id IS NOT NULL GROUP BY 1) c
+            ), '{}'::jsonb)
+        )
+        FROM routing
+    ),
+    'duplicate_stats', (
+        SELECT jsonb_build_object(
+            'total_merged', count(*),
+            'parent_tickets', count(DISTINCT parent_ticket_id),
+            'by_category', COALESCE((
+                SELECT jsonb_object_agg(category, total)
+                FROM (SELECT COALESCE(category, 'unknown') AS category, count(*) AS total FROM duplicates GROUP BY 1) c
+            ), '{}'::jsonb),
+            'by_source', COALESCE((
+                SELECT jsonb_object_agg(source, total)
+                FROM (SELECT COALESCE(source, 'unknown') AS source, count(*) AS total FROM duplicates GROUP BY 1) s
+            ), '{}'::jsonb)
+        )
+        FROM duplicates
+    ),
+    'tickets_created', (SELECT tickets_created FROM totals)
+);
+$$;
@@ -0,0 +1,6 @@
+-- Идентификатор трассировки (OpenTelemetry trace id) для разбора медленных ответов чата
+-- По нему находятся спаны этапов: embedding, match_documents, completion, создание тикета, сохранение
+
+ALTER TABLE public.chat_interactions ADD COLUMN IF NOT EXISTS trace_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_chat_interactions_trace_id ON public.chat_interactions(trace_id) WHERE trace_id IS NOT NULL;
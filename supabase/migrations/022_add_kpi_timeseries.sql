@@ -0,0 +1,186 @@
+-- Временные ряды KPI для графиков (/api/admin/monitoring/timeseries)
+-- Интервалы: 5m, 1h, 1d, 1w. Часовые и более крупные точки собираются из kpi_rollups
+-- и latency_sketches (сырые строки только на неполных краях периода), 5-минутные — из
+-- сырых строк. Длинные периоды прореживаются на стороне API выбором более крупного интервала.
+
+-- Начало корзины интервала для момента времени (UTC)
+CREATE OR REPLACE FUNCTION kpi_series_bucket(p_interval TEXT, p_at TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT CASE p_interval
+    WHEN '5m' THEN date_bin(INTERVAL '5 minutes', p_at, TIMESTAMPTZ '2000-01-01 00:00:00+00')
+    WHEN '1h' THEN date_trunc('hour', p_at, 'UTC')
+    WHEN '1d' THEN date_trunc('day', p_at, 'UTC')
+    WHEN '1w' THEN date_trunc('week', p_at, 'UTC')
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_series_step(p_interval TEXT)
+RETURNS INTERVAL
+LANGUAGE sql
+IMMUTABLE
+AS $$
+SELECT CASE p_interval
+    WHEN '5m' THEN INTERVAL '5 minutes'
+    WHEN '1h' THEN INTERVAL '1 hour'
+    WHEN '1d' THEN INTERVAL '1 day'
+    WHEN '1w' THEN INTERVAL '7 days'
+END;
+$$;
+
+-- Источники за [p_from, p_to] с меткой времени: дневные агрегаты (кроме интервала 1h и 5m),
+-- часовые агрегаты на оставшихся целых часах, сырые вклады на краях
+CREATE OR REPLACE FUNCTION kpi_series_counters(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ, p_interval TEXT)
+RETURNS SETOF public.kpi_counters
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    b RECORD;
+BEGIN
+    SELECT * INTO b FROM kpi_range_bounds(p_from, p_to);
+
+    IF p_interval = '5m' THEN
+        RETURN QUERY SELECT * FROM kpi_raw_counters(p_from, b.range_to);
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        k.bucket_start, k.channel, k.category, k.department,
+        k.interactions, k.auto_resolved, k.auto_confidence_count, k.auto_confidence_sum,
+        k.chat_response_count, k.chat_response_sum, k.tickets_created, k.tickets_closed,
+        k.ticket_response_count, k.ticket_response_sum, k.feedback_total, k.feedback_correct
+    FROM public.kpi_rollups k
+    WHERE (p_interval <> '1h' AND k.period = 'day' AND k.bucket_start >= b.day_from AND k.bucket_start < b.day_to)
+       OR (k.period = 'hour' AND k.bucket_start >= b.hour_from AND k.bucket_start < b.hour_to
+           AND (p_interval = '1h' OR k.bucket_start < b.day_from OR k.bucket_start >= b.day_to))
+    UNION ALL
+    SELECT * FROM kpi_raw_counters(p_from, b.hour_from)
+    UNION ALL
+    SELECT * FROM kpi_raw_counters(b.hour_to, b.range_to);
+END;
+$$;
+
+-- Гистограммы задержек по корзинам интервала: (начало корзины, корзина скетча, число значений)
+CREATE OR REPLACE FUNCTION latency_series_histogram(p_from TIMESTAMPTZ, p_to TIMESTAMPTZ, p_interval TEXT)
+RETURNS TABLE (bucket_start TIMESTAMPTZ, bin INT, count BIGINT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    b RECORD;
+BEGIN
+    SELECT * INTO b FROM kpi_range_bounds(p_from, p_to);
+
+    IF p_interval = '5m' THEN
+        RETURN QUERY
+        SELECT kpi_series_bucket(p_interval, s.bucket_at), latency_sketch_bin(s.seconds), count(*)::BIGINT
+        FROM latency_raw_samples(p_from, b.range_to) s
+        GROUP BY 1, 2;
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT h.bucket_start, h.bin, sum(h.count)::BIGINT
+    FROM (
+        SELECT kpi_series_bucket(p_interval, l.bucket_start) AS bucket_start, u.bin::INT AS bin, u.count::BIGINT AS count
+        FROM public.latency_sketches l, unnest(l.bins) WITH ORDINALITY AS u(count, bin)
+        WHERE u.count <> 0
+          AND ((p_interval <> '1h' AND l.period = 'day' AND l.bucket_start >= b.day_from AND l.bucket_start < b.day_to)
+            OR (l.period = 'hour' AND l.bucket_start >= b.hour_from AND l.bucket_start < b.hour_to
+                AND (p_interval = '1h' OR l.bucket_start < b.day_from OR l.bucket_start >= b.day_to)))
+        UNION ALL
+        SELECT kpi_series_bucket(p_interval, s.bucket_at), latency_sketch_bin(s.seconds), 1::BIGINT
+        FROM latency_raw_samples(p_from, b.hour_from) s
+        UNION ALL
+        SELECT kpi_series_bucket(p_interval, s.bucket_at), latency_sketch_bin(s.seconds), 1::BIGINT
+        FROM latency_raw_samples(b.hour_to, b.range_to) s
+    ) h
+    GROUP BY h.bucket_start, h.bin
+    HAVING sum(h.count) > 0;
+END;
+$$;
+
+-- Точки ряда за [p_from, p_to], включая пустые корзины; квантили — как в latency_quantiles
+CREATE OR REPLACE FUNCTION kpi_timeseries(
+    p_from TIMESTAMPTZ,
+    p_to TIMESTAMPTZ,
+    p_interval TEXT,
+    p_quantiles DOUBLE PRECISION[] DEFAULT ARRAY[0.5, 0.95]
+)
+RETURNS TABLE (
+    bucket_start TIMESTAMPTZ,
+    interactions BIGINT,
+    auto_resolved BIGINT,
+    chat_response_count BIGINT,
+    chat_response_sum DOUBLE PRECISION,
+    tickets_created BIGINT,
+    tickets_closed BIGINT,
+    ticket_response_count BIGINT,
+    ticket_response_sum DOUBLE PRECISION,
+    response_quantiles DOUBLE PRECISION[]
+)
+LANGUAGE sql
+STABLE
+AS $$
+WITH
+buckets AS (
+    SELECT generate_series(
+        kpi_series_bucket(p_interval, p_from),
+        kpi_series_bucket(p_interval, p_to),
+        kpi_series_step(p_interval)
+    ) AS bucket_start
+),
+counters AS (
+    SELECT
+        kpi_series_bucket(p_interval, c.bucket_at) AS bucket_start,
+        sum(c.interactions) AS interactions,
+        sum(c.auto_resolved) AS auto_resolved,
+        sum(c.chat_response_count) AS chat_response_count,
+        sum(c.chat_response_sum) AS chat_response_sum,
+        sum(c.tickets_created) AS tickets_created,
+        sum(c.tickets_closed) AS tickets_closed,
+        sum(c.ticket_response_count) AS ticket_response_count,
+        sum(c.ticket_response_sum) AS ticket_response_sum
+    FROM kpi_series_counters(p_from, p_to, p_interval) c
+    GROUP BY 1
+),
+cumulative AS (
+    SELECT
+        h.bucket_start, h.bin,
+        sum(h.count) OVER (PARTITION BY h.bucket_start ORDER BY h.bin) AS running,
+        sum(h.count) OVER (PARTITION BY h.bucket_start) AS n
+    FROM latency_series_histogram(p_from, p_to, p_interval) h
+),
+-- Первая корзина, где накопленное число превышает ранг; один проход вместо подзапроса на точку
+ranked AS (
+    SELECT DISTINCT ON (x.bucket_start, q.position) x.bucket_start, q.position, x.bin
+    FROM cumulative x
+    CROSS JOIN unnest(p_quantiles) WITH ORDINALITY AS q(quantile, position)
+    WHERE x.running > LEAST(floor(x.n * q.quantile), x.n - 1)
+    ORDER BY x.bucket_start, q.position, x.bin
+),
+quantiles AS (
+    SELECT r.bucket_start, array_agg(latency_sketch_value(r.bin) ORDER BY r.position) AS seconds
+    FROM ranked r
+    GROUP BY r.bucket_start
+)
+SELECT
+    b.bucket_start,
+    COALESCE(c.interactions, 0)::BIGINT,
+    COALESCE(c.auto_resolved, 0)::BIGINT,
+    COALESCE(c.chat_response_count, 0)::BIGINT,
+    COALESCE(c.chat_response_sum, 0)::DOUBLE PRECISION,
+    COALESCE(c.tickets_created, 0)::BIGINT,
+    COALESCE(c.tickets_closed, 0)::BIGINT,
+    COALESCE(c.ticket_response_count, 0)::BIGINT,
+    COALESCE(c.ticket_response_sum, 0)::DOUBLE PRECISION,
+    q.seconds
+FROM buckets b
+LEFT JOIN counters c ON c.bucket_start = b.bucket_start
+LEFT JOIN quantiles q ON q.bucket_start = b.bucket_start
+ORDER BY b.bucket_start;
+$$;
@@ -0,0 +1,10 @@
+-- Строки с ticket_created = NULL метрики считают авторешёнными (IS NOT TRUE),
+-- а список /auto-resolved и частичный индекс idx_chat_interactions_auto_resolve
+-- видят только FALSE. Приводим NULL к FALSE и запрещаем его дальше
+UPDATE public.chat_interactions
+SET ticket_created = FALSE
+WHERE ticket_created IS NULL;
+
+ALTER TABLE public.chat_interactions
+ALTER COLUMN ticket_created SET DEFAULT FALSE,
+ALTER COLUMN ticket_created SET NOT NULL;
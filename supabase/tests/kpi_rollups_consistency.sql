@@ -0,0 +1,131 @@
+-- Проверка согласованности агрегатов KPI с сырыми строками (019_add_kpi_rollups.sql,
+-- 020_add_latency_sketches.sql). После каждого шага часовые и дневные kpi_rollups
+-- должны совпадать с kpi_raw_counters('-infinity', 'infinity'), а latency_sketches —
+-- с latency_raw_samples('-infinity', 'infinity'). Все изменения откатываются.
+--
+-- psql -v ON_ERROR_STOP=1 -f supabase/tests/kpi_rollups_consistency.sql
+
+BEGIN;
+
+CREATE FUNCTION pg_temp.kpi_rollup_drift(p_period TEXT)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+WITH
+expected AS (
+    SELECT
+        date_trunc(p_period, c.bucket_at, 'UTC') AS bucket_start, c.channel, c.category, c.department,
+        sum(c.interactions) AS interactions, sum(c.auto_resolved) AS auto_resolved,
+        sum(c.auto_confidence_count) AS auto_confidence_count, sum(c.auto_confidence_sum) AS auto_confidence_sum,
+        sum(c.chat_response_count) AS chat_response_count, sum(c.chat_response_sum) AS chat_response_sum,
+        sum(c.tickets_created) AS tickets_created, sum(c.tickets_closed) AS tickets_closed,
+        sum(c.ticket_response_count) AS ticket_response_count, sum(c.ticket_response_sum) AS ticket_response_sum,
+        sum(c.feedback_total) AS feedback_total, sum(c.feedback_correct) AS feedback_correct
+    FROM kpi_raw_counters('-infinity', 'infinity') c
+    WHERE c.bucket_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+),
+actual AS (
+    SELECT * FROM public.kpi_rollups WHERE period = p_period
+)
+SELECT count(*)
+FROM expected e
+FULL JOIN actual a USING (bucket_start, channel, category, department)
+WHERE COALESCE(e.interactions, 0) <> COALESCE(a.interactions, 0)
+   OR COALESCE(e.auto_resolved, 0) <> COALESCE(a.auto_resolved, 0)
+   OR COALESCE(e.auto_confidence_count, 0) <> COALESCE(a.auto_confidence_count, 0)
+   OR abs(COALESCE(e.auto_confidence_sum, 0) - COALESCE(a.auto_confidence_sum, 0)) > 1e-6
+   OR COALESCE(e.chat_response_count, 0) <> COALESCE(a.chat_response_count, 0)
+   OR abs(COALESCE(e.chat_response_sum, 0) - COALESCE(a.chat_response_sum, 0)) > 1e-6
+   OR COALESCE(e.tickets_created, 0) <> COALESCE(a.tickets_created, 0)
+   OR COALESCE(e.tickets_closed, 0) <> COALESCE(a.tickets_closed, 0)
+   OR COALESCE(e.ticket_response_count, 0) <> COALESCE(a.ticket_response_count, 0)
+   OR abs(COALESCE(e.ticket_response_sum, 0) - COALESCE(a.ticket_response_sum, 0)) > 1e-6
+   OR COALESCE(e.feedback_total, 0) <> COALESCE(a.feedback_total, 0)
+   OR COALESCE(e.feedback_correct, 0) <> COALESCE(a.feedback_correct, 0);
+$$;
+
+CREATE FUNCTION pg_temp.latency_sketch_drift(p_period TEXT)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+WITH
+expected AS (
+    SELECT date_trunc(p_period, s.bucket_at, 'UTC') AS bucket_start, s.source, latency_sketch_bin(s.seconds) AS bin, count(*) AS count
+    FROM latency_raw_samples('-infinity', 'infinity') s
+    GROUP BY 1, 2, 3
+),
+actual AS (
+    SELECT l.bucket_start, l.source, u.bin::INT AS bin, u.count::BIGINT AS count
+    FROM public.latency_sketches l, unnest(l.bins) WITH ORDINALITY AS u(count, bin)
+    WHERE l.period = p_period AND u.count <> 0
+),
+totals AS (
+    SELECT l.bucket_start, l.source
+    FROM public.latency_sketches l
+    LEFT JOIN (
+        SELECT bucket_start, source, sum(count) AS count FROM expected GROUP BY 1, 2
+    ) e USING (bucket_start, source)
+    WHERE l.period = p_period AND l.count <> COALESCE(e.count, 0)
+)
+SELECT (
+    SELECT count(*)
+    FROM expected e
+    FULL JOIN actual a USING (bucket_start, source, bin)
+    WHERE COALESCE(e.count, 0) <> COALESCE(a.count, 0)
+) + (SELECT count(*) FROM totals);
+$$;
+
+CREATE FUNCTION pg_temp.assert_consistent(p_step TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_hour BIGINT := pg_temp.kpi_rollup_drift('hour');
+    v_day BIGINT := pg_temp.kpi_rollup_drift('day');
+    v_sketch_hour BIGINT := pg_temp.latency_sketch_drift('hour');
+    v_sketch_day BIGINT := pg_temp.latency_sketch_drift('day');
+BEGIN
+    IF v_hour <> 0 OR v_day <> 0 THEN
+        RAISE EXCEPTION 'kpi_rollups drift after "%": % hourly, % daily groups differ', p_step, v_hour, v_day;
+    END IF;
+    IF v_sketch_hour <> 0 OR v_sketch_day <> 0 THEN
+        RAISE EXCEPTION 'latency_sketches drift after "%": % hourly, % daily bins differ', p_step, v_sketch_hour, v_sketch_day;
+    END IF;
+    RAISE NOTICE 'ok: %', p_step;
+END;
+$$;
+
+INSERT INTO public.departments (id, name) VALUES
+    ('00000000-0000-4000-8000-00000000d001', 'kpi_test_department_a'),
+    ('00000000-0000-4000-8000-00000000d002', 'kpi_test_department_b');
+
+INSERT INTO public.tickets (id, source, subject, description, category, department_id, created_at)
+VALUES (
+    '00000000-0000-4000-8000-00000000a001', 'email', 'kpi test', 'kpi test', 'billing',
+    '00000000-0000-4000-8000-00000000d001', NOW() - INTERVAL '2 days'
+);
+
+INSERT INTO public.response_times (ticket_id, first_response_at, response_time_seconds, response_type) VALUES
+    ('00000000-0000-4000-8000-00000000a001', NOW() - INTERVAL '2 days' + INTERVAL '1 hour', 120, 'human'),
+    ('00000000-0000-4000-8000-00000000a001', NOW() - INTERVAL '1 day', 300, 'human');
+
+SELECT pg_temp.assert_consistent('insert');
+
+UPDATE public.tickets SET category = 'network' WHERE id = '00000000-0000-4000-8000-00000000a001';
+SELECT pg_temp.assert_consistent('category change');
+
+UPDATE public.tickets SET source = 'telegram' WHERE id = '00000000-0000-4000-8000-00000000a001';
+SELECT pg_temp.assert_consistent('source change');
+
+UPDATE public.tickets SET department_id = '00000000-0000-4000-8000-00000000d002' WHERE id = '00000000-0000-4000-8000-00000000a001';
+SELECT pg_temp.assert_consistent('reroute');
+
+-- ON DELETE SET NULL на tickets.department_id
+DELETE FROM public.departments WHERE id = '00000000-0000-4000-8000-00000000d002';
+SELECT pg_temp.assert_consistent('department delete');
+
+DELETE FROM public.tickets WHERE id = '00000000-0000-4000-8000-00000000a001';
+SELECT pg_temp.assert_consistent('ticket delete');
+
+ROLLBACK;